@@ -0,0 +1,102 @@
+"""
+ASGI request validation middleware driven by generated openapi specs.
+Requests are validated and counted as in the WSGI middleware
+"""
+import time
+
+from . import middleware
+
+
+class AsgiValidationMiddleware():
+    """
+    ASGI middleware validating requests against generated specs
+    """
+    def __init__(self, app, specfiles, sample_rate=1.0, prefix=True):
+        """
+        Wrap ASGI app
+        """
+        self.app = app
+        self.validator = middleware.RequestValidator(specfiles,
+                                                     sample_rate, prefix)
+
+    async def __call__(self, scope, receive, send):
+        """
+        Validate request and call wrapped app
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.time()
+        try:
+            key, pathparams = self.validator.route(scope['method'],
+                                                   scope['path'])
+        except middleware.RequestError as err:
+            await self.reject(send, err)
+            return
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        operation = self.validator.operations[key]
+        validated = self.validator.sampled()
+        validation_time = 0.0
+        if validated:
+            body = b''
+            more_body = True
+            while more_body:
+                message = await receive()
+                body += message.get('body', b'')
+                more_body = message.get('more_body', False)
+            receive = _replay(body, receive)
+            mediatype = ''
+            for name, value in scope.get('headers', []):
+                if name == b'content-type':
+                    mediatype = value.decode('latin-1').split(';')[0]
+            try:
+                self.validator.validate(
+                    operation,
+                    pathparams,
+                    scope.get('query_string', b'').decode('latin-1'),
+                    mediatype.strip(),
+                    body)
+            except middleware.RequestError as err:
+                elapsed = time.time() - start
+                self.validator.record(key, elapsed, True, True, elapsed)
+                await self.reject(send, err)
+                return
+            validation_time = time.time() - start
+        await self.app(scope, receive, send)
+        self.validator.record(key,
+                              time.time() - start,
+                              validated,
+                              False,
+                              validation_time)
+
+    async def reject(self, send, err):
+        """
+        Send error response
+        """
+        body = middleware.error_body(err.status, err.message)
+        await send({
+            'type': 'http.response.start',
+            'status': err.status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def _replay(body, receive):
+    """
+    Receive callable replaying the consumed request body
+    """
+    replayed = []
+
+    async def replay():
+        """
+        Return body once, then wait on the original channel
+        """
+        if replayed:
+            return await receive()
+        replayed.append(True)
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+    return replay
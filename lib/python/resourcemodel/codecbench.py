@@ -0,0 +1,54 @@
+"""
+Benchmark media type codecs with generated resource instances,
+checking round trip fidelity against the resource schema
+"""
+import logging
+import os
+import sys
+
+from . import datagen
+from . import mediacodecs
+from . import specdiff
+from . import validators
+
+_LOG = logging.getLogger(__name__)
+
+
+def main(args):
+    """
+    Main function of codecs command
+    """
+    specs = specdiff.generate_specs(args.basedir, [args.lone], None)
+    spec = next(iter(specs.values()))
+    openapidir = os.path.join(args.basedir, 'apischemas', 'openapi')
+    specvalidators = validators.get_validators(spec, openapidir)
+    resourcename = spec['info']['title']
+    validator = specvalidators.compile_schema(
+        {'$ref': '#/components/schemas/' + resourcename})
+    schemafile = os.path.join(args.basedir, 'apischemas', 'rschemas',
+                              args.lone)
+    generator = datagen.ResourceGenerator(datagen.load_resource(schemafile),
+                                          os.path.dirname(schemafile),
+                                          seed=args.seed)
+    instances = list()
+    for _, batch in generator.batches(args.count):
+        instances.extend(batch)
+    names = ['json'] + [n for n in args.codecs.split(',') if n != 'json']
+    try:
+        results = mediacodecs.benchmark(instances, names, validator,
+                                        not args.reference)
+    except mediacodecs.CodecError as err:
+        sys.exit(str(err))
+    jsonbytes = results[0]['bytes'] or 1
+    failed = False
+    for result in results:
+        print('{codec:8} {bytes:>12} bytes {ratio:7.1%}  '
+              'encode {encode_seconds:7.3f}s  '
+              'decode {decode_seconds:7.3f}s  '
+              'mismatches {mismatches}  invalid {invalid}'.format(
+                  ratio=result['bytes'] / jsonbytes, **result))
+        if result['mismatches'] or result['invalid']:
+            failed = True
+    if failed:
+        _LOG.error('round trip failed for %s', args.lone)
+        sys.exit(1)
@@ -0,0 +1,207 @@
+"""
+Generate request corpus from generated openapi specs for benchmarking
+"""
+import json
+import logging
+import random
+import sys
+# pylint: disable=E0611,E0401
+from urllib.parse import quote, urlencode
+
+from . import router
+from . import samples
+from . import utils
+from . import validators
+
+_LOG = logging.getLogger(__name__)
+
+
+def parse_mix(mix):
+    """
+    Parse weights like GET=3,put=1,todo_post_v3_0_1=0.5
+    keyed by http method, in any case, or operationId
+    """
+    weights = dict()
+    if not mix:
+        return weights
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name.lower() in utils.HTTP_METHODS:
+            name = name.lower()
+        weights[name] = float(weight)
+    return weights
+
+
+def serialize_parameter(value, parameter):
+    """
+    Serialize parameter value in simple or form style
+    """
+    if isinstance(value, dict):
+        if parameter.explode:
+            parts = ['{0}={1}'.format(key, _text(item))
+                     for key, item in value.items()]
+        else:
+            parts = []
+            for key, item in value.items():
+                parts.extend([key, _text(item)])
+        return ','.join(parts)
+    if isinstance(value, list):
+        return ','.join(_text(item) for item in value)
+    return _text(value)
+
+
+def _text(value):
+    """
+    Text form of a primitive value
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+class OperationTemplate():
+    """
+    Request template of an operation
+    """
+    def __init__(self, base, operation):
+        """
+        Initialize template from compiled operation
+        """
+        self.operation = operation
+        self.operationid = operation.operationid
+        self.method = operation.method.upper()
+        self.path = base + operation.path
+        self.pathparameters = [p for p in operation.parameters
+                               if p.location == 'path']
+        self.queryparameters = [p for p in operation.parameters
+                                if p.location == 'query']
+        self.mediatype = None
+        self.bodyschema = None
+        for mediatype in operation.body:
+            if self.mediatype is None or mediatype.endswith('json'):
+                self.mediatype = mediatype
+        if self.mediatype is not None:
+            self.bodyschema = operation.body[self.mediatype].schema
+
+
+class CorpusGenerator():
+    """
+    Stream of request records for the operations of specs
+    """
+    def __init__(self, specfiles, count=10, mix=None, seed=None,
+                 keys=1000, prefix=True):
+        """
+        Initialize generator.
+        count is the number of records per operation of weight 1,
+        keys is the number of distinct values of path parameters
+        """
+        self.random = random.Random(seed)
+        self.keys = keys
+        self.templates = list()
+        weights = parse_mix(mix)
+        unknown = set(weights) - set(utils.HTTP_METHODS)
+        for specfile in specfiles:
+            specvalidators = validators.load_validators(specfile)
+            generator = samples.SampleGenerator(specvalidators,
+                                                self.random.random(),
+                                                optional_rate=0.5)
+            base = ''
+            servers = specvalidators.spec.get('servers')
+            if prefix and servers:
+                base = servers[0]['url'].rstrip('/')
+            for operation in specvalidators.operations.values():
+                unknown.discard(operation.operationid)
+                default = 0.0 if weights else 1.0
+                weight = weights.get(operation.operationid,
+                                     weights.get(operation.method, default))
+                total = int(round(count * weight))
+                if total > 0:
+                    self.templates.append(
+                        [OperationTemplate(base, operation),
+                         generator,
+                         total])
+        if unknown:
+            raise ValueError('{0} in mix is neither an http method nor an '
+                             'operationId'.format(', '.join(sorted(unknown))))
+
+    def record(self, template, generator):
+        """
+        Request record for an operation
+        """
+        path = template.path
+        for parameter in template.pathparameters:
+            index = self.random.randrange(self.keys)
+            value = generator.sample_key(parameter.schema, index)
+            path = path.replace(
+                '{' + parameter.name + '}',
+                quote(serialize_parameter(value, parameter), safe=',='))
+        query = dict()
+        for parameter in template.queryparameters:
+            if parameter.name == '_cursor':
+                continue
+            if not parameter.required and self.random.random() < 0.5:
+                continue
+            value = generator.sample(parameter.schema)
+            query[parameter.name] = serialize_parameter(value, parameter)
+        record = {
+            'operationId': template.operationid,
+            'method': template.method,
+            'path': path,
+            'query': query,
+            'url': path + ('?' + urlencode(query) if query else '')
+        }
+        if template.bodyschema is not None:
+            record['headers'] = {'Content-Type': template.mediatype}
+            record['body'] = generator.sample(template.bodyschema)
+        return record
+
+    def __iter__(self):
+        """
+        Interleave operations in random order rounds,
+        only the remaining counts are kept in memory
+        """
+        remaining = list(self.templates)
+        counts = [t[2] for t in remaining]
+        while remaining:
+            order = list(range(len(remaining)))
+            self.random.shuffle(order)
+            for i in order:
+                template, generator, _ = remaining[i]
+                counts[i] -= 1
+                yield self.record(template, generator)
+            alive = [i for i in range(len(remaining)) if counts[i] > 0]
+            remaining = [remaining[i] for i in alive]
+            counts = [counts[i] for i in alive]
+
+
+def write_corpus(records, outfile):
+    """
+    Write records as json lines
+    """
+    written = 0
+    for record in records:
+        outfile.write(json.dumps(record, ensure_ascii=False))
+        outfile.write('\n')
+        written += 1
+    return written
+
+
+def main(args):
+    """
+    Main function of corpus command
+    """
+    try:
+        generator = CorpusGenerator(router.expand_specs(args.specs),
+                                    count=args.count,
+                                    mix=args.mix,
+                                    seed=args.seed,
+                                    keys=args.keys)
+    except ValueError as err:
+        sys.exit('Invalid --mix: {0}'.format(err))
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            written = write_corpus(generator, outfile)
+        _LOG.info('Wrote %d requests to %s', written, args.output)
+    else:
+        write_corpus(generator, sys.stdout)
@@ -0,0 +1,644 @@
+"""
+Bulk generator of resource instances valid against the resource schema.
+Values are generated column by column for a batch of instances,
+with numpy when it is installed
+"""
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+
+import yaml
+from jsonschema import RefResolver
+
+from . import refcache
+from . import samples
+from . import specdiff
+from . import validators
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_LOG = logging.getLogger(__name__)
+
+
+class PythonRandom():
+    """
+    Batches of random values with the random module
+    """
+    def __init__(self, seed=None):
+        """
+        Initialize random generator
+        """
+        self.random = random.Random(seed)
+        self.scalar = self.random
+
+    def integers(self, low, high, count):
+        """
+        Integers in [low, high]
+        """
+        randint = self.random.randint
+        return [randint(low, high) for _ in range(count)]
+
+    def uniform(self, low, high, count):
+        """
+        Floats in [low, high)
+        """
+        uniform = self.random.uniform
+        return [uniform(low, high) for _ in range(count)]
+
+    def flags(self, rate, count):
+        """
+        Booleans which are True with probability rate
+        """
+        rnd = self.random.random
+        return [rnd() < rate for _ in range(count)]
+
+    def strings(self, length, count):
+        """
+        Lowercase strings of given length
+        """
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        choice = self.random.choice
+        return [''.join(choice(letters) for _ in range(length))
+                for _ in range(count)]
+
+
+class NumpyRandom():
+    """
+    Batches of random values with numpy
+    """
+    def __init__(self, seed=None):
+        """
+        Initialize random generator, scalar is used
+        for values which are not generated in batches
+        """
+        self.random = numpy.random.default_rng(seed)
+        self.scalar = random.Random(seed)
+
+    def integers(self, low, high, count):
+        """
+        Integers in [low, high]
+        """
+        return self.random.integers(low, high + 1, count).tolist()
+
+    def uniform(self, low, high, count):
+        """
+        Floats in [low, high)
+        """
+        return self.random.uniform(low, high, count).tolist()
+
+    def flags(self, rate, count):
+        """
+        Booleans which are True with probability rate
+        """
+        return (self.random.random(count) < rate).tolist()
+
+    def strings(self, length, count):
+        """
+        Lowercase strings of given length
+        """
+        if not length or not count:
+            return [''] * count
+        letters = self.random.integers(97, 123, (count, length),
+                                       dtype=numpy.uint8)
+        return letters.view('S{0}'.format(length)).ravel().astype(
+            'U').tolist()
+
+
+def get_random(seed=None, usenumpy=True):
+    """
+    Random batch generator, numpy backed if available
+    """
+    if usenumpy and numpy is not None:
+        return NumpyRandom(seed)
+    return PythonRandom(seed)
+
+
+class ConstColumn():
+    """
+    Same value for every instance
+    """
+    def __init__(self, value):
+        """
+        Initialize column of value
+        """
+        self.value = value
+
+    def generate(self, _rnd, count):
+        """
+        Column of count values
+        """
+        return [self.value] * count
+
+
+class EnumColumn():
+    """
+    Values picked from enum
+    """
+    def __init__(self, values):
+        """
+        Initialize column of enum values
+        """
+        self.values = values
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        values = self.values
+        return [values[i] for i in rnd.integers(0, len(values) - 1, count)]
+
+
+class IntegerColumn():
+    """
+    Integers within minimum and maximum
+    """
+    def __init__(self, schema):
+        """
+        Initialize column of an integer schema
+        """
+        self.low, self.high = samples.bounds(schema, 0, 1000)
+        self.low = int(self.low)
+        self.high = int(self.high)
+        self.step = _step(schema, self.low, self.high, True)
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        if self.step is None:
+            return rnd.integers(self.low, self.high, count)
+        step = int(self.step)
+        return [k * step for k in rnd.integers(
+            int(math.ceil(self.low / step)),
+            int(math.floor(self.high / step)), count)]
+
+
+class NumberColumn():
+    """
+    Floats within minimum and maximum
+    """
+    def __init__(self, schema):
+        """
+        Initialize column of a number schema
+        """
+        self.low, self.high = samples.bounds(schema, 0.0, 1000.0)
+        self.step = _step(schema, self.low, self.high, False)
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        if self.step is None:
+            return rnd.uniform(self.low, self.high, count)
+        low = int(math.ceil(self.low / self.step))
+        high = int(math.floor(self.high / self.step))
+        return [_multiple(k, self.step, low, high)
+                for k in rnd.integers(low, high, count)]
+
+
+def _step(schema, low, high, integral):
+    """
+    multipleOf of schema, None if there is no multiple
+    within [low, high] and the keyword is ignored
+    """
+    step = schema.get('multipleOf')
+    if step is None:
+        return None
+    if step <= 0 or (integral and step != int(step)) or \
+            math.ceil(low / step) > math.floor(high / step):
+        _LOG.warning('multipleOf %s -- not supported within [%s, %s], '
+                     'values may not be multiples', step, low, high)
+        return None
+    return step
+
+
+def _multiple(k, step, low, high):
+    """
+    Float multiple of step near k * step, rounding of float
+    multiples may fail a validator which divides by step
+    """
+    for offset in range(8):
+        candidate = low + (k - low + offset) % (high - low + 1)
+        value = candidate * step
+        quotient = value / step
+        if quotient == int(quotient):
+            return value
+    return k * step
+
+
+class BooleanColumn():
+    """
+    Random booleans
+    """
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        return rnd.flags(0.5, count)
+
+
+class StringColumn():
+    """
+    Random strings within minLength and maxLength
+    """
+    def __init__(self, schema):
+        """
+        Initialize column of a string schema
+        """
+        low = schema.get('minLength', 1)
+        self.length = max(low, min(schema.get('maxLength', 8), 8))
+        self.pattern = schema.get('pattern')
+        self.bounds = (schema.get('minLength', 0), schema.get('maxLength'))
+        self.example = None
+        if self.pattern is not None:
+            self.example = samples.sample_pattern(
+                self.pattern, random.Random(0), *self.bounds)
+            if self.example is None:
+                _LOG.warning('%s -- pattern is not supported, strings '
+                             'may not match it', self.pattern)
+                self.pattern = None
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        if self.pattern is None:
+            return rnd.strings(self.length, count)
+        values = list()
+        for _ in range(count):
+            value = samples.sample_pattern(self.pattern, rnd.scalar,
+                                           *self.bounds)
+            values.append(self.example if value is None else value)
+        return values
+
+
+class ArrayColumn():
+    """
+    Arrays with items of a child column
+    """
+    def __init__(self, items, schema):
+        """
+        Initialize column of an array schema, items is the item column
+        """
+        self.items = items
+        self.low = schema.get('minItems', 0)
+        self.high = max(self.low, min(schema.get('maxItems', 3),
+                                      self.low + 3))
+        self.unique = schema.get('uniqueItems', False)
+
+    def lengths(self, rnd, count):
+        """
+        Number of items of each array
+        """
+        return rnd.integers(self.low, self.high, count)
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        lengths = self.lengths(rnd, count)
+        flat = self.items.generate(rnd, sum(lengths))
+        arrays = _split(flat, lengths)
+        if self.unique:
+            arrays = [self.distinct(rnd, array) for array in arrays]
+        return arrays
+
+    def distinct(self, rnd, array, tries=10):
+        """
+        Drop repeated items, items are generated again
+        until the array has its length back
+        """
+        length = len(array)
+        seen = set()
+        result = list()
+        for _ in range(tries):
+            for item in array:
+                key = json.dumps(item, sort_keys=True)
+                if key not in seen and len(result) < length:
+                    seen.add(key)
+                    result.append(item)
+            if len(result) >= length:
+                break
+            array = self.items.generate(rnd, length)
+        return result
+
+
+class PropertyListColumn(ArrayColumn):
+    """
+    Rows of a propertylist, key fields are unique within a row
+    """
+    def __init__(self, items, schema, keys):
+        """
+        Initialize column of a propertylist schema,
+        keys is list of (name, schema) of the key fields
+        """
+        super(PropertyListColumn, self).__init__(items, schema)
+        self.keys = keys
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        rows = super(PropertyListColumn, self).generate(rnd, count)
+        keys = [(keyname, [samples.key_value(keyschema, position)
+                           for position in range(self.high)])
+                for keyname, keyschema in self.keys]
+        for row in rows:
+            for position, item in enumerate(row):
+                for keyname, values in keys:
+                    item[keyname] = values[position]
+        return rows
+
+
+class ObjectColumn():
+    """
+    Objects with a column per property
+    """
+    def __init__(self, properties, optional_rate):
+        """
+        properties is list of (name, column, required)
+        """
+        self.properties = properties
+        self.optional_rate = optional_rate
+
+    def generate(self, rnd, count):
+        """
+        Column of count values
+        """
+        rows = [dict() for _ in range(count)]
+        for name, column, required in self.properties:
+            values = column.generate(rnd, count)
+            if required or self.optional_rate >= 1.0:
+                for row, value in zip(rows, values):
+                    row[name] = value
+                continue
+            present = rnd.flags(self.optional_rate, count)
+            for row, value, flag in zip(rows, values, present):
+                if flag:
+                    row[name] = value
+        return rows
+
+
+def _split(flat, lengths):
+    """
+    Split flat column into lists of given lengths
+    """
+    offsets = itertools.accumulate(lengths)
+    start = 0
+    result = list()
+    for end in offsets:
+        result.append(flat[start:end])
+        start = end
+    return result
+
+
+class ResourceGenerator():
+    """
+    Compile resource schema into columns once and generate
+    batches of instances
+    """
+    # R0913: Too many arguments
+    # pylint: disable=R0913
+    def __init__(self, resourcedef, basedir, seed=None,
+                 optional_rate=0.7, maxdepth=6, usenumpy=True):
+        """
+        Initialize generator, basedir is the directory
+        of the schema file used to resolve common/ references
+        """
+        self.resourcedef = resourcedef
+        base = "file://{0}/".format(os.path.abspath(basedir))
+        handlers = refcache.handlers()
+        self.resolver = RefResolver(base_uri=base,
+                                    referrer=resourcedef,
+                                    handlers=handlers)
+        self.optional_rate = optional_rate
+        self.maxdepth = maxdepth
+        self.random = get_random(seed, usenumpy)
+        self.keyschema = self.lookup(resourcedef.get('key', {}))
+        self.column = self.compile(resourcedef, 0)
+
+    def resolve(self, schema):
+        """
+        Follow $ref, returns schema and the scopes pushed
+        """
+        scopes = 0
+        while isinstance(schema, dict) and '$ref' in schema:
+            url, schema = self.resolver.resolve(schema['$ref'])
+            self.resolver.push_scope(url)
+            scopes += 1
+        return schema, scopes
+
+    def lookup(self, schema):
+        """
+        Follow $ref of a schema which is not compiled,
+        no scope is left pushed
+        """
+        schema, scopes = self.resolve(schema)
+        for _ in range(scopes):
+            self.resolver.pop_scope()
+        return schema
+
+    def compile(self, schema, depth):
+        """
+        Column generating values of schema
+        """
+        schema, scopes = self.resolve(schema)
+        try:
+            return self._compile(schema, depth)
+        finally:
+            for _ in range(scopes):
+                self.resolver.pop_scope()
+
+    def _compile(self, schema, depth):
+        """
+        Column of a resolved schema
+        """
+        # R0911: Too many return statements
+        # R0912: Too many branches
+        # pylint: disable=R0911,R0912
+        if 'enum' in schema:
+            return EnumColumn(schema['enum'])
+        if 'default' in schema:
+            return ConstColumn(schema['default'])
+        for keyword in ['oneOf', 'anyOf', 'allOf']:
+            if keyword in schema and 'type' not in schema:
+                return self.compile(schema[keyword][0], depth)
+        stype = schema.get('type')
+        if stype is None:
+            stype = 'object' if 'properties' in schema else 'string'
+        if stype in ['object', 'mutablehash']:
+            required = schema.get('required', [])
+            properties = list()
+            for name, propschema in schema.get('properties', {}).items():
+                if depth >= self.maxdepth and name not in required:
+                    continue
+                properties.append((name,
+                                   self.compile(propschema, depth + 1),
+                                   name in required))
+            return ObjectColumn(properties, self.optional_rate)
+        if stype == 'propertylist':
+            items, scopes = self.resolve(schema['items'])
+            try:
+                keys = [(k, self.lookup(items['properties'][k]))
+                        for k in schema['key']]
+                column = self._compile(items, depth + 1)
+            finally:
+                for _ in range(scopes):
+                    self.resolver.pop_scope()
+            plist = PropertyListColumn(column, schema, keys)
+            enums = [len(k[1]['enum']) for k in keys if 'enum' in k[1]]
+            if enums:
+                plist.high = min(plist.high, *enums)
+                plist.low = min(plist.low, plist.high)
+            return plist
+        if stype == 'array':
+            if depth >= self.maxdepth:
+                return ConstColumn([])
+            return ArrayColumn(self.compile(schema.get('items', {}),
+                                            depth + 1),
+                               schema)
+        if stype == 'integer':
+            return IntegerColumn(schema)
+        if stype == 'number':
+            return NumberColumn(schema)
+        if stype == 'boolean':
+            return BooleanColumn()
+        if schema.get('format') in samples.FORMATS:
+            return ConstColumn(samples.FORMATS[schema['format']])
+        return StringColumn(schema)
+
+    def batches(self, count, batchsize=10000, start=0):
+        """
+        Generate count instances in batches of
+        (primary keys, instances)
+        """
+        generated = 0
+        while generated < count:
+            size = min(batchsize, count - generated)
+            keys = [samples.key_value(self.keyschema, start + generated + i)
+                    for i in range(size)]
+            yield keys, self.column.generate(self.random, size)
+            generated += size
+
+
+def write_instances(batches, outfile):
+    """
+    Write instances as json lines with their primary key
+    """
+    written = 0
+    dumps = json.dumps
+    for keys, instances in batches:
+        outfile.write(''.join(
+            dumps({'primary_key': key, 'body': instance}) + '\n'
+            for key, instance in zip(keys, instances)))
+        written += len(keys)
+    return written
+
+
+class BatchChecker():
+    """
+    Validate batches of primary keys and instances
+    with compiled validators of the generated spec
+    """
+    def __init__(self, keyvalidator, validator, maxlogged=10):
+        """
+        Initialize checker, the errors of the first
+        maxlogged invalid instances are logged
+        """
+        self.keyvalidator = keyvalidator
+        self.validator = validator
+        self.maxlogged = maxlogged
+        self.invalid = 0
+
+    def check(self, batches):
+        """
+        Pass batches through, counting invalid instances
+        """
+        for keys, instances in batches:
+            for key, instance in zip(keys, instances):
+                errors = list(self.keyvalidator.iter_errors(key))
+                errors.extend(self.validator.iter_errors(instance))
+                if not errors:
+                    continue
+                if self.invalid < self.maxlogged:
+                    _LOG.error('%s -- invalid instance, %s',
+                               json.dumps(key), errors[0].message)
+                self.invalid += 1
+            yield keys, instances
+
+
+def spec_validators(schemafile):
+    """
+    Compiled validators of the primary key and of the resource
+    in the spec generated from schemafile, which is in the
+    apischemas/rschemas directory of a family
+    """
+    schemadir = os.path.dirname(os.path.abspath(schemafile))
+    apidir = os.path.dirname(schemadir)
+    if os.path.basename(schemadir) != 'rschemas' or \
+            os.path.basename(apidir) != 'apischemas':
+        sys.exit('{0} is not in apischemas/rschemas of a family, '
+                 'it can not be validated'.format(schemafile))
+    specs = specdiff.generate_specs(os.path.dirname(apidir),
+                                    [os.path.basename(schemafile)])
+    spec = next(iter(specs.values()))
+    specvalidators = validators.get_validators(
+        spec, os.path.join(apidir, 'openapi'))
+    schemas = '#/components/schemas/'
+    return (specvalidators.compile_schema({'$ref': schemas + 'primary_key'}),
+            specvalidators.compile_schema(
+                {'$ref': schemas + spec['info']['title']}))
+
+
+def load_resource(schemafile):
+    """
+    Load resource schema which has instances
+    """
+    with open(schemafile) as fh:
+        try:
+            resourcedef = yaml.safe_load(fh.read())
+        except yaml.YAMLError as err:
+            sys.exit("Yaml Error in {0}: {1}".format(schemafile, err))
+    if resourcedef.get('rpconly'):
+        sys.exit("{0} is rpconly, it has no instances".format(schemafile))
+    return resourcedef
+
+
+def main(args):
+    """
+    Main function of datagen command
+    """
+    if args.infile:
+        schemafile = args.infile
+    else:
+        if not args.basedir or not args.lone:
+            sys.exit('Enter infile or basedir and lone')
+        schemafile = os.path.join(args.basedir, 'apischemas',
+                                  'rschemas', args.lone)
+    resourcedef = load_resource(schemafile)
+    generator = ResourceGenerator(resourcedef,
+                                  os.path.dirname(schemafile),
+                                  seed=args.seed,
+                                  optional_rate=args.optional_rate)
+    batches = generator.batches(args.count, args.batch_size)
+    checker = None
+    if args.validate:
+        checker = BatchChecker(*spec_validators(schemafile))
+        batches = checker.check(batches)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            written = write_instances(batches, outfile)
+        _LOG.info('Wrote %d instances to %s', written, args.output)
+    else:
+        write_instances(batches, sys.stdout)
+    if checker is not None and checker.invalid:
+        _LOG.error('%d instances are invalid against the generated spec',
+                   checker.invalid)
+        sys.exit(1)
@@ -0,0 +1,129 @@
+"""
+Artifacts emitted from the spec object built once per resource:
+openapi3 specs, standalone jsonschema bundles and a route file
+"""
+import json
+import logging
+import os
+
+from . import router
+
+_LOG = logging.getLogger(__name__)
+JSONSCHEMA_DRAFT = 'http://json-schema.org/draft-04/schema#'
+
+
+class OpenapiEmitter():
+    """
+    Write the openapi 3.0 spec
+    """
+    def emit(self, specobj):
+        """
+        Emit artifact of a built spec object
+        """
+        specobj.write()
+
+    def finish(self):
+        """
+        Emit artifacts of all resources
+        """
+
+
+class JsonschemaEmitter():
+    """
+    Write a jsonschema bundle of each resource, the resource schema
+    with the component schemas as definitions
+    """
+    def __init__(self, outdir):
+        """
+        Initialize emitter writing to outdir
+        """
+        self.outdir = outdir
+
+    def emit(self, specobj):
+        """
+        Emit artifact of a built spec object
+        """
+        if not os.path.isdir(self.outdir):
+            os.makedirs(self.outdir)
+        filename = os.path.join(self.outdir,
+                                os.path.basename(specobj.specfile) + '.json')
+        with open(filename, 'w') as outfile:
+            outfile.write(json.dumps(jsonschema_bundle(specobj.openapi),
+                                     indent=4,
+                                     sort_keys=True,
+                                     ensure_ascii=False))
+        _LOG.info('Successfully created jsonschema file %s', filename)
+
+    def finish(self):
+        """
+        Emit artifacts of all resources
+        """
+
+
+class RoutesEmitter():
+    """
+    Compile the paths of all resources into one route file
+    """
+    def __init__(self, filename):
+        """
+        Initialize emitter writing the route file filename
+        """
+        self.filename = filename
+        self.router = router.Router()
+        self.specs = 0
+
+    def emit(self, specobj):
+        """
+        Emit artifact of a built spec object
+        """
+        self.router.add_spec(specobj.openapi,
+                             os.path.basename(specobj.specfile))
+        self.specs += 1
+
+    def finish(self):
+        """
+        Emit artifacts of all resources
+        """
+        if not self.specs:
+            return
+        self.router.dump(self.filename)
+        _LOG.info('Compiled %d routes of %d specs to %s',
+                  len(self.router.routes), self.specs, self.filename)
+
+
+def jsonschema_bundle(openapi):
+    """
+    Standalone jsonschema of the resource of a spec
+    """
+    title = openapi['info']['title']
+    schemas = json.loads(json.dumps(
+        openapi['components']['schemas']).replace(
+            '"#/components/schemas/', '"#/definitions/'))
+    bundle = dict(schemas.get(title, {}))
+    bundle['$schema'] = JSONSCHEMA_DRAFT
+    bundle['title'] = title
+    bundle['definitions'] = schemas
+    return bundle
+
+
+def get_emitters(names, openapidir, routesfile=None):
+    """
+    Emitters of comma separated names, openapi3, jsonschema or routes.
+    jsonschema bundles and the route file are written next to openapidir
+    """
+    emitters = list()
+    basedir = os.path.dirname(os.path.abspath(openapidir))
+    for name in names.split(','):
+        name = name.strip()
+        if name == 'openapi3':
+            emitters.append(OpenapiEmitter())
+        elif name == 'jsonschema':
+            emitters.append(
+                JsonschemaEmitter(os.path.join(basedir, 'jsonschema')))
+        elif name == 'routes':
+            emitters.append(RoutesEmitter(
+                routesfile or os.path.join(basedir, 'routes.json')))
+        else:
+            raise ValueError('{0} is not an emitter, use openapi3, '
+                             'jsonschema or routes'.format(name))
+    return emitters
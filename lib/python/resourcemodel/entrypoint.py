@@ -4,21 +4,199 @@ Script to create openapi spec from resource schema
 import argparse
 import logging
 
+from . import codecbench
+from . import corpus
+from . import datagen
+from . import mockserver
 from . import openapiconverter
+from . import refcache
+from . import router
+from . import specdiff
+from . import utils
 
 _LOG = logging.getLogger(__name__)
 
 
+def add_diff_parser(subparsers):
+    """
+    Arguments of diff command
+    """
+    parser = subparsers.add_parser(
+        'diff',
+        help='compare generated specs')
+    parser.add_argument('old',
+                        help='old spec file or openapi directory')
+    parser.add_argument('new', nargs='?',
+                        help='new spec file or openapi directory')
+    parser.add_argument('-b', '--basedir', required=False,
+                        help='basedir of family to generate new specs')
+    parser.add_argument('-l', '--lones', required=False,
+                        help='comma separated resource names')
+    parser.add_argument('-m', '--module', required=False,
+                        help='Module used for creating spec')
+    parser.add_argument('--outfmt', required=False,
+                        default='text',
+                        help='text or json')
+    parser.add_argument('--fail-on-breaking', action='store_true',
+                        help='exit with error on breaking changes')
+    parser.set_defaults(func=specdiff.main)
+
+
+def add_routes_parser(subparsers):
+    """
+    Arguments of routes command
+    """
+    parser = subparsers.add_parser(
+        'routes',
+        help='compile paths of generated specs into a route file')
+    parser.add_argument('specs', nargs='+',
+                        help='spec files or openapi directories')
+    parser.add_argument('-o', '--output', required=True,
+                        help='route file, gzip compressed if it ends in .gz')
+    parser.add_argument('--noprefix', action='store_true',
+                        help='do not prefix paths with the servers url')
+    parser.set_defaults(func=router.main)
+
+
+def add_mock_parser(subparsers):
+    """
+    Arguments of mock command
+    """
+    parser = subparsers.add_parser(
+        'mock',
+        help='serve mock responses for generated specs')
+    parser.add_argument('specs', nargs='+',
+                        help='spec files or openapi directories')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='listen address')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='listen port')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of synthesized responses')
+    parser.add_argument('--canned', required=False,
+                        help='json file of responses keyed by operationId')
+    parser.add_argument('--collection-size', type=int, default=100,
+                        help='number of keys paged by get all operations')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='injected latency in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='random latency variation in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503,
+                        help='http status of injected errors')
+    parser.set_defaults(func=mockserver.main)
+
+
+def add_corpus_parser(subparsers):
+    """
+    Arguments of corpus command
+    """
+    parser = subparsers.add_parser(
+        'corpus',
+        help='generate request corpus as json lines')
+    parser.add_argument('specs', nargs='+',
+                        help='spec files or openapi directories')
+    parser.add_argument('-n', '--count', type=int, default=10,
+                        help='requests per operation of weight 1')
+    parser.add_argument('--mix', required=False,
+                        help='weights by method or operationId, '
+                             'eg get=7,put=2,post=1')
+    parser.add_argument('--keys', type=int, default=1000,
+                        help='distinct values of path parameters')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for reproducible corpus')
+    parser.add_argument('-o', '--output', required=False,
+                        help='output file, stdout if not given')
+    parser.set_defaults(func=corpus.main)
+
+
+def add_datagen_parser(subparsers):
+    """
+    Arguments of datagen command
+    """
+    parser = subparsers.add_parser(
+        'datagen',
+        help='generate resource instances as json lines')
+    parser.add_argument('-b', '--basedir', required=False,
+                        help='basedir of family')
+    parser.add_argument('-l', '--lone', required=False,
+                        help='resource name')
+    parser.add_argument('--infile', required=False,
+                        help='full path of schema file')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='number of instances')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='instances generated per batch')
+    parser.add_argument('--optional-rate', type=float, default=0.7,
+                        help='fraction of optional properties set')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for reproducible instances')
+    parser.add_argument('--validate', action='store_true',
+                        help='validate every batch against the '
+                             'generated spec, slower')
+    parser.add_argument('-o', '--output', required=False,
+                        help='output file, stdout if not given')
+    parser.set_defaults(func=datagen.main)
+
+
+def add_codecs_parser(subparsers):
+    """
+    Arguments of codecs command
+    """
+    parser = subparsers.add_parser(
+        'codecs',
+        help='benchmark media type codecs with generated instances')
+    parser.add_argument('-b', '--basedir', required=True,
+                        help='basedir of family')
+    parser.add_argument('-l', '--lone', required=True,
+                        help='resource name')
+    parser.add_argument('--codecs', default='msgpack,cbor',
+                        help='comma separated codecs compared with json')
+    parser.add_argument('-n', '--count', type=int, default=10000,
+                        help='number of instances')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of generated instances')
+    parser.add_argument('--reference', action='store_true',
+                        help='use the reference codecs even if msgpack '
+                             'or cbor2 is installed')
+    parser.set_defaults(func=codecbench.main)
+
+
+def add_vendor_parser(subparsers):
+    """
+    Arguments of vendor command
+    """
+    parser = subparsers.add_parser(
+        'vendor',
+        help='fetch http references into the reference cache')
+    parser.add_argument('urls', nargs='*',
+                        help='urls of references')
+    parser.add_argument('-b', '--basedir', required=False,
+                        help='basedir of family, vendor the http '
+                             'references of its schemas')
+    parser.add_argument('-l', '--lones', required=False,
+                        help='comma separated resource names, '
+                             'all resources if not given')
+    parser.set_defaults(func=refcache.main)
+
+
 def convert_to_openapispec():
     """
     convert resource schema to
     openapi 3.0 specification
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument('-b', '--basedir', required=True,
-                        help='basedir of family')
-    parser.add_argument('-l', '--lones', required=True,
+    parser.add_argument('-b', '--basedir', required=False,
+                        help='basedir of family, comma separated '
+                             'basedirs to build several families')
+    parser.add_argument('-l', '--lones', required=False,
                         help='comma separated resource names')
+    parser.add_argument('--manifest', required=False,
+                        help='yaml file of families to build, each '
+                             'with basedir and optional lones and family')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes building families')
     parser.add_argument('--outfmt', required=False,
                         default='json',
                         help='yaml or json')
@@ -28,9 +206,45 @@ def convert_to_openapispec():
                         help='full path of schema file')
     parser.add_argument('-m', '--module', required=False,
                         help='Module used for creating spec')
+    parser.add_argument('--emit', required=False,
+                        default='openapi3',
+                        help='comma separated artifacts of each resource, '
+                             'openapi3, jsonschema or routes')
+    parser.add_argument('--routes', required=False,
+                        help='route file of --emit routes, default '
+                             'routes.json next to the openapi directory')
+    parser.add_argument('--ref-cache', required=False,
+                        help='cache directory of http references, default '
+                             '$' + refcache.CACHE_ENV +
+                             ' or ~/.cache/resourcemodel/refs')
+    parser.add_argument('--ref-ttl', type=int, default=refcache.DEFAULT_TTL,
+                        help='seconds cached http references are used '
+                             'before revalidation')
+    parser.add_argument('--ref-concurrency', type=int,
+                        default=refcache.DEFAULT_CONCURRENCY,
+                        help='concurrent requests of http references')
+    parser.add_argument('--offline', action='store_true',
+                        help='resolve http references from the cache only')
+    subparsers = parser.add_subparsers(dest='command')
+    add_diff_parser(subparsers)
+    add_routes_parser(subparsers)
+    add_mock_parser(subparsers)
+    add_corpus_parser(subparsers)
+    add_datagen_parser(subparsers)
+    add_codecs_parser(subparsers)
+    add_vendor_parser(subparsers)
     args = parser.parse_args()
-    log_format = '[%(filename)s:%(lineno)d]' \
-                 '[%(levelname)s]: %(message)s'
-    logging.basicConfig(format=log_format,
+    if not args.command and not args.manifest and \
+            not (args.basedir and args.lones):
+        parser.error('the following arguments are required: '
+                     '-b/--basedir, -l/--lones or --manifest')
+    logging.basicConfig(format=utils.LOG_FORMAT,
                         level=logging.INFO)
+    refcache.configure(args.ref_cache,
+                       args.ref_ttl,
+                       args.offline,
+                       concurrency=args.ref_concurrency)
+    if args.command:
+        args.func(args)
+        return
     openapiconverter.main(args)
@@ -0,0 +1,349 @@
+"""
+Typed intermediate representation of resource schemas.
+A resource schema is parsed once, with references resolved and fields
+validated, into compact nodes which generators walk instead of
+re-inspecting the raw schema
+"""
+import logging
+
+from . import utils
+
+_LOG = logging.getLogger(__name__)
+SCALAR_TYPES = ['string', 'boolean', 'number', 'integer']
+
+
+class Property():
+    """
+    Property of a resource, kind is scalar, combined, object,
+    mutablehash, propertylist or array.
+    properties are the child properties of objects, mutablehashes
+    and propertylist rows, keys the key fields of propertylist rows
+    and items the item of arrays
+    """
+    __slots__ = ('name', 'kind', 'schema', 'required', 'properties',
+                 'keys', 'items')
+
+    def __init__(self, name, kind, schema, required=False):
+        """
+        Initialize property without children
+        """
+        self.name = name
+        self.kind = kind
+        self.schema = schema
+        self.required = required
+        self.properties = ()
+        self.keys = ()
+        self.items = None
+
+    def __repr__(self):
+        return 'Property({0!r}, {1!r})'.format(self.name, self.kind)
+
+
+class PropertyListKey():
+    """
+    Key field of the rows of a propertylist
+    """
+    __slots__ = ('name', 'schema')
+
+    def __init__(self, name, schema):
+        """
+        Initialize key field
+        """
+        self.name = name
+        self.schema = schema
+
+    def __repr__(self):
+        return 'PropertyListKey({0!r})'.format(self.name)
+
+
+class RpcVerb():
+    """
+    Rpc verb with jsonschema compatible request and response
+    """
+    __slots__ = ('name', 'request', 'response', 'isasync')
+
+    def __init__(self, name, request, response, isasync=False):
+        """
+        Initialize rpc verb
+        """
+        self.name = name
+        self.request = request
+        self.response = response
+        self.isasync = isasync
+
+    def __repr__(self):
+        return 'RpcVerb({0!r})'.format(self.name)
+
+
+class SearchParam():
+    """
+    Search query parameter of the get all operation
+    """
+    __slots__ = ('name', 'schema', 'description')
+
+    def __init__(self, name, schema, description=None):
+        """
+        Initialize search parameter
+        """
+        self.name = name
+        self.schema = schema
+        self.description = description
+
+    def __repr__(self):
+        return 'SearchParam({0!r})'.format(self.name)
+
+
+class Resource():
+    """
+    Resource schema, error is 1 if the schema has errors
+    """
+    __slots__ = ('name', 'version', 'description', 'key', 'rpconly',
+                 'properties', 'required', 'rpc', 'search', 'options',
+                 'error')
+
+    def __init__(self, name, version, description, key, rpconly=False):
+        """
+        Initialize resource without properties
+        """
+        self.name = name
+        self.version = version
+        self.description = description
+        self.key = key
+        self.rpconly = rpconly
+        self.properties = ()
+        self.required = ()
+        self.rpc = ()
+        self.search = ()
+        self.options = dict()
+        self.error = 0
+
+    def __repr__(self):
+        return 'Resource({0!r})'.format(self.name)
+
+    def walk(self, properties=None, prefix=()):
+        """
+        Yield (path, property) of all properties depth first,
+        path is the tuple of property names
+        """
+        if properties is None:
+            properties = self.properties
+        for prop in properties:
+            path = prefix + (prop.name,)
+            yield path, prop
+            children = prop.properties
+            if prop.items is not None:
+                children = prop.items.properties
+            for child in self.walk(children, path):
+                yield child
+
+    def find(self, path):
+        """
+        Property of a dotted path, None if missing
+        """
+        properties = self.properties
+        prop = None
+        for name in path.split('.'):
+            prop = next((p for p in properties if p.name == name), None)
+            if prop is None:
+                return None
+            properties = prop.properties
+            if prop.items is not None:
+                properties = prop.items.properties
+        return prop
+
+
+class Builder():
+    """
+    Build the representation of a resource schema,
+    errors are logged like the generators do
+    """
+    def __init__(self, resolver, schemafile):
+        """
+        Initialize builder of the resource schema in schemafile
+        """
+        self.resolver = resolver
+        self.schemafile = schemafile
+        self.error = 0
+
+    def build(self, resourcedef):
+        """
+        Resource of a resource schema
+        """
+        resource = Resource(resourcedef.get('name'),
+                            resourcedef.get('version'),
+                            resourcedef.get('description'),
+                            resourcedef.get('key'),
+                            bool(resourcedef.get('rpconly')))
+        resource.required = tuple(resourcedef.get('required', []))
+        resource.properties = self.properties(
+            resourcedef.get('properties', {}), resource.required)
+        resource.rpc = self.rpc(resourcedef.get('rpc', []))
+        resource.search = self.search(resourcedef.get('search', []))
+        resource.options = dict((k, resourcedef[k])
+                                for k in utils.RESOURCE_OPTIONS
+                                if k in resourcedef)
+        resource.error = self.error
+        return resource
+
+    def properties(self, propdict, required):
+        """
+        Properties sorted by name
+        """
+        result = list()
+        for propname in sorted(propdict):
+            prop = self.property(propname, propdict[propname],
+                                 propname in required)
+            if prop is not None:
+                result.append(prop)
+        return tuple(result)
+
+    def resolve(self, propname, propval):
+        """
+        Resolve references of a property schema, None on error
+        """
+        propval = utils.resolve_reference(self.resolver, propname,
+                                          propval, self.schemafile)
+        if propval == 1:
+            self.error = 1
+            return None
+        return propval
+
+    def property(self, propname, propval, required):
+        """
+        Property of a property schema, None on error
+        """
+        # R0911: Too many return statements
+        # R0912: Too many branches
+        # pylint: disable=R0911,R0912
+        if utils.check_property_name(propname, self.schemafile):
+            self.error = 1
+            return None
+        propval = self.resolve(propname, propval)
+        if propval is None:
+            return None
+        if utils.check_property_types(propname, propval, self.schemafile):
+            self.error = 1
+            return None
+        if 'type' not in propval:
+            if 'enum' in propval:
+                return Property(propname, 'scalar', propval, required)
+            return Property(propname, 'combined', propval, required)
+        kind = propval['type']
+        if 'enum' in propval or kind in SCALAR_TYPES:
+            return Property(propname, 'scalar', propval, required)
+        prop = Property(propname, kind, propval, required)
+        if kind in ['object', 'mutablehash']:
+            if utils.validate_object_field(propname, propval,
+                                           self.schemafile):
+                self.error = 1
+                return None
+            prop.properties = self.properties(propval['properties'],
+                                              propval.get('required', []))
+        elif kind == 'array':
+            if utils.validate_array_field(self.resolver, propname, propval,
+                                          self.schemafile):
+                self.error = 1
+                return None
+            prop.items = self.items(propname, propval['items'])
+        elif kind == 'propertylist':
+            if utils.validate_propertylist_field(self.resolver, propname,
+                                                 propval, self.schemafile):
+                self.error = 1
+                return None
+            itemval = self.resolve(propname, propval['items'])
+            if itemval is None:
+                return None
+            keys = list()
+            for k in propval['key']:
+                if k not in itemval['properties']:
+                    msg = '%s -- is not defined in the properties: %s and %r'
+                    _LOG.error(msg, k, propname, itemval['properties'])
+                    self.error = 1
+                    return None
+                keys.append(PropertyListKey(k, itemval['properties'][k]))
+            prop.keys = tuple(keys)
+            prop.properties = self.properties(itemval['properties'],
+                                              itemval.get('required', []))
+        return prop
+
+    def items(self, propname, itemval):
+        """
+        Item of an array, validated by validate_array_field
+        """
+        itemval = self.resolve(propname, itemval)
+        if itemval is None:
+            return None
+        kind = itemval.get('type', 'scalar')
+        if 'enum' in itemval or kind in SCALAR_TYPES:
+            kind = 'scalar'
+        item = Property(propname, kind, itemval, True)
+        if kind == 'object' and 'properties' in itemval:
+            item.properties = self.properties(itemval['properties'],
+                                              itemval.get('required', []))
+        return item
+
+    def rpc(self, rpcdefs):
+        """
+        Rpc verbs of the rpc section
+        """
+        if not isinstance(rpcdefs, list):
+            msg = 'rpc field should be a list in schema %s'
+            _LOG.error(msg, self.schemafile)
+            self.error = 1
+            return ()
+        verbs = list()
+        for rpcdef in rpcdefs:
+            for verb, val in rpcdef.items():
+                if utils.check_rpc_definition(verb, val, self.schemafile):
+                    self.error = 1
+                    continue
+                request = utils.jsonschema_compat(val['request'])
+                response = utils.jsonschema_compat(val['response'])
+                if utils.check_jsonschema(request, self.schemafile) or \
+                        utils.check_jsonschema(response, self.schemafile):
+                    self.error = 1
+                    continue
+                verbs.append(RpcVerb(verb, request, response,
+                                     bool(val.get('async'))))
+        return tuple(verbs)
+
+    def search(self, searchdefs):
+        """
+        Search parameters of the search section
+        """
+        if not isinstance(searchdefs, list):
+            msg = 'search field should be a list in schema %s'
+            _LOG.error(msg, self.schemafile)
+            self.error = 1
+            return ()
+        params = list()
+        for search_by in searchdefs:
+            if 'name' not in search_by:
+                msg = 'search -- name field missing in search schema file%s'
+                _LOG.error(msg, self.schemafile)
+                self.error = 1
+                continue
+            if search_by['name'] in ['pk', 'body']:
+                msg = '%s -- reserved keyword in search schema file %s'
+                _LOG.error(msg, search_by['name'], self.schemafile)
+                self.error = 1
+                continue
+            if 'schema' not in search_by:
+                msg = '%s -- schema field missing in search schema file %s'
+                _LOG.error(msg, search_by['name'], self.schemafile)
+                self.error = 1
+                continue
+            if utils.check_jsonschema(search_by['schema'], self.schemafile):
+                self.error = 1
+                continue
+            params.append(SearchParam(search_by['name'],
+                                      search_by['schema'],
+                                      search_by.get('description')))
+        return tuple(params)
+
+
+def build(resourcedef, resolver, schemafile):
+    """
+    Typed representation of a resource schema
+    """
+    return Builder(resolver, schemafile).build(resourcedef)
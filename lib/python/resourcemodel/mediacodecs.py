@@ -0,0 +1,443 @@
+"""
+Reference codecs of the binary media types of generated specs.
+Values are limited to the json data model: null, booleans,
+integers up to 64 bits, floats, strings, arrays and string keyed maps
+"""
+import collections
+import json
+import math
+import struct
+import time
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+Codec = collections.namedtuple('Codec', ['name', 'encode', 'decode'])
+
+
+class CodecError(ValueError):
+    """
+    Value can not be encoded or decoded
+    """
+
+
+def _check_key(key):
+    """
+    Map keys are strings in the json data model
+    """
+    if not isinstance(key, str):
+        raise CodecError('map key {0!r} is not a string'.format(key))
+
+
+def msgpack_encode(value):
+    """
+    Encode value to msgpack
+    """
+    parts = list()
+    _msgpack_pack(value, parts.append)
+    return b''.join(parts)
+
+
+def _msgpack_pack(value, write):
+    """
+    Write msgpack encoding of value
+    """
+    # R0912: Too many branches
+    # pylint: disable=R0912
+    if value is None:
+        write(b'\xc0')
+    elif value is True:
+        write(b'\xc3')
+    elif value is False:
+        write(b'\xc2')
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            write(struct.pack('B', value))
+        elif -32 <= value < 0:
+            write(struct.pack('b', value))
+        elif 0 <= value <= 0xffffffffffffffff:
+            for fmt, code in [('>B', 0xcc), ('>H', 0xcd),
+                              ('>I', 0xce), ('>Q', 0xcf)]:
+                if value < 1 << (8 * struct.calcsize(fmt)):
+                    write(struct.pack('B', code) + struct.pack(fmt, value))
+                    break
+        elif -0x8000000000000000 <= value < 0:
+            for fmt, code in [('>b', 0xd0), ('>h', 0xd1),
+                              ('>i', 0xd2), ('>q', 0xd3)]:
+                if value >= -(1 << (8 * struct.calcsize(fmt) - 1)):
+                    write(struct.pack('B', code) + struct.pack(fmt, value))
+                    break
+        else:
+            raise CodecError('integer {0} out of 64 bit range'.format(value))
+    elif isinstance(value, float):
+        write(b'\xcb' + struct.pack('>d', value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        _msgpack_head(len(data), 0xa0, 32, [0xd9, 0xda, 0xdb], write)
+        write(data)
+    elif isinstance(value, (list, tuple)):
+        _msgpack_head(len(value), 0x90, 16, [None, 0xdc, 0xdd], write)
+        for item in value:
+            _msgpack_pack(item, write)
+    elif isinstance(value, dict):
+        _msgpack_head(len(value), 0x80, 16, [None, 0xde, 0xdf], write)
+        for key, item in value.items():
+            _check_key(key)
+            _msgpack_pack(key, write)
+            _msgpack_pack(item, write)
+    else:
+        raise CodecError('{0} is not a json type'.format(type(value)))
+
+
+def _msgpack_head(length, fixcode, fixlimit, codes, write):
+    """
+    Write type and length of a msgpack str, array or map,
+    codes are the 8, 16 and 32 bit length type codes
+    """
+    if length < fixlimit:
+        write(struct.pack('B', fixcode | length))
+        return
+    for fmt, code in zip(['>B', '>H', '>I'], codes):
+        if code is not None and length < 1 << (8 * struct.calcsize(fmt)):
+            write(struct.pack('B', code) + struct.pack(fmt, length))
+            return
+    raise CodecError('length {0} too large'.format(length))
+
+
+class _Reader():
+    """
+    Read position in encoded bytes
+    """
+    def __init__(self, data):
+        """
+        Initialize reader at the start of data
+        """
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read(self, size):
+        """
+        Next size bytes
+        """
+        end = self.pos + size
+        if end > len(self.data):
+            raise CodecError('truncated data')
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def unpack(self, fmt):
+        """
+        Next struct value
+        """
+        return struct.unpack(fmt, self.read(struct.calcsize(fmt)))[0]
+
+    def done(self):
+        """
+        Check all bytes are consumed
+        """
+        if self.pos != len(self.data):
+            raise CodecError('extra data after value')
+
+
+_MSGPACK_FIXED = {
+    0xca: '>f', 0xcb: '>d',
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'
+}
+_MSGPACK_LENGTH = {
+    0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+    0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+    0xde: ('>H', 'map'), 0xdf: ('>I', 'map')
+}
+
+
+def msgpack_decode(data):
+    """
+    Decode msgpack to value
+    """
+    reader = _Reader(data)
+    value = _msgpack_unpack(reader)
+    reader.done()
+    return value
+
+
+def _msgpack_unpack(reader):
+    """
+    Read next msgpack value
+    """
+    # R0911: Too many return statements
+    # R0912: Too many branches
+    # pylint: disable=R0911,R0912
+    code = reader.unpack('B')
+    if code < 0x80:
+        return code
+    if code >= 0xe0:
+        return code - 0x100
+    if code == 0xc0:
+        return None
+    if code == 0xc2:
+        return False
+    if code == 0xc3:
+        return True
+    if code in _MSGPACK_FIXED:
+        return reader.unpack(_MSGPACK_FIXED[code])
+    if 0xa0 <= code <= 0xbf:
+        kind, length = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, length = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, length = 'map', code & 0x0f
+    elif code in _MSGPACK_LENGTH:
+        fmt, kind = _MSGPACK_LENGTH[code]
+        length = reader.unpack(fmt)
+    else:
+        raise CodecError('unsupported msgpack type 0x{0:02x}'.format(code))
+    if kind == 'str':
+        return _text(reader.read(length))
+    if kind == 'array':
+        return [_msgpack_unpack(reader) for _ in range(length)]
+    value = dict()
+    for _ in range(length):
+        key = _msgpack_unpack(reader)
+        _check_key(key)
+        value[key] = _msgpack_unpack(reader)
+    return value
+
+
+def _text(chunk):
+    """
+    Decode utf-8 string
+    """
+    try:
+        return bytes(chunk).decode('utf-8')
+    except UnicodeDecodeError as err:
+        raise CodecError(str(err)) from err
+
+
+def cbor_encode(value):
+    """
+    Encode value to cbor
+    """
+    parts = list()
+    _cbor_pack(value, parts.append)
+    return b''.join(parts)
+
+
+def _cbor_head(major, argument, write):
+    """
+    Write major type and argument of a cbor data item
+    """
+    if argument < 24:
+        write(struct.pack('B', major << 5 | argument))
+        return
+    for fmt, info in [('>B', 24), ('>H', 25), ('>I', 26), ('>Q', 27)]:
+        if argument < 1 << (8 * struct.calcsize(fmt)):
+            write(struct.pack('B', major << 5 | info) +
+                  struct.pack(fmt, argument))
+            return
+    raise CodecError('integer {0} out of 64 bit range'.format(argument))
+
+
+def _cbor_pack(value, write):
+    """
+    Write cbor encoding of value
+    """
+    # R0912: Too many branches
+    # pylint: disable=R0912
+    if value is None:
+        write(b'\xf6')
+    elif value is True:
+        write(b'\xf5')
+    elif value is False:
+        write(b'\xf4')
+    elif isinstance(value, int):
+        if value >= 0:
+            _cbor_head(0, value, write)
+        else:
+            _cbor_head(1, -1 - value, write)
+    elif isinstance(value, float):
+        write(b'\xfb' + struct.pack('>d', value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        _cbor_head(3, len(data), write)
+        write(data)
+    elif isinstance(value, (list, tuple)):
+        _cbor_head(4, len(value), write)
+        for item in value:
+            _cbor_pack(item, write)
+    elif isinstance(value, dict):
+        _cbor_head(5, len(value), write)
+        for key, item in value.items():
+            _check_key(key)
+            _cbor_pack(key, write)
+            _cbor_pack(item, write)
+    else:
+        raise CodecError('{0} is not a json type'.format(type(value)))
+
+
+_CBOR_ARGUMENT = {24: '>B', 25: '>H', 26: '>I', 27: '>Q'}
+_CBOR_SIMPLE = {20: False, 21: True, 22: None}
+_CBOR_FLOAT = {26: '>f', 27: '>d'}
+
+
+def cbor_decode(data):
+    """
+    Decode cbor to value
+    """
+    reader = _Reader(data)
+    value = _cbor_unpack(reader)
+    reader.done()
+    return value
+
+
+def _half(bits):
+    """
+    Decode half precision float, struct has no 'e' format before 3.6
+    """
+    exponent = (bits >> 10) & 0x1f
+    fraction = bits & 0x3ff
+    if exponent == 0:
+        value = math.ldexp(fraction, -24)
+    elif exponent == 0x1f:
+        value = float('nan') if fraction else float('inf')
+    else:
+        value = math.ldexp(fraction + 0x400, exponent - 25)
+    return -value if bits & 0x8000 else value
+
+
+def _cbor_unpack(reader):
+    """
+    Read next cbor data item
+    """
+    # R0911: Too many return statements
+    # R0912: Too many branches
+    # pylint: disable=R0911,R0912
+    initial = reader.unpack('B')
+    major, info = initial >> 5, initial & 0x1f
+    if major == 7:
+        if info in _CBOR_SIMPLE:
+            return _CBOR_SIMPLE[info]
+        if info == 25:
+            return _half(reader.unpack('>H'))
+        if info in _CBOR_FLOAT:
+            return reader.unpack(_CBOR_FLOAT[info])
+        raise CodecError('unsupported cbor simple value {0}'.format(info))
+    if info < 24:
+        argument = info
+    elif info in _CBOR_ARGUMENT:
+        argument = reader.unpack(_CBOR_ARGUMENT[info])
+    else:
+        raise CodecError('unsupported cbor length {0}'.format(info))
+    if major == 0:
+        return argument
+    if major == 1:
+        return -1 - argument
+    if major == 3:
+        return _text(reader.read(argument))
+    if major == 4:
+        return [_cbor_unpack(reader) for _ in range(argument)]
+    if major == 5:
+        value = dict()
+        for _ in range(argument):
+            key = _cbor_unpack(reader)
+            _check_key(key)
+            value[key] = _cbor_unpack(reader)
+        return value
+    raise CodecError('unsupported cbor major type {0}'.format(major))
+
+
+def json_encode(value):
+    """
+    Encode value to json
+    """
+    return json.dumps(value, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def json_decode(data):
+    """
+    Decode json to value
+    """
+    try:
+        return json.loads(bytes(data).decode('utf-8'))
+    except ValueError as err:
+        raise CodecError(str(err)) from err
+
+
+CODECS = {
+    'json': Codec('json', json_encode, json_decode),
+    'msgpack': Codec('msgpack', msgpack_encode, msgpack_decode),
+    'cbor': Codec('cbor', cbor_encode, cbor_decode)
+}
+
+
+def get_codec(name, native=True):
+    """
+    Codec of a media type suffix, None if unknown.
+    native uses the msgpack or cbor2 package when installed
+    """
+    if native and name == 'msgpack' and msgpack is not None:
+        return Codec(name,
+                     lambda v: msgpack.packb(v, use_bin_type=True),
+                     lambda d: msgpack.unpackb(d, raw=False))
+    if native and name == 'cbor' and cbor2 is not None:
+        return Codec(name, cbor2.dumps, cbor2.loads)
+    return CODECS.get(name)
+
+
+def identical(first, second):
+    """
+    Compare values including their json types,
+    so 1, 1.0 and True differ
+    """
+    if type(first) is not type(second):  # pylint: disable=C0123
+        return False
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(
+            identical(v, second[k]) for k, v in first.items())
+    if isinstance(first, list):
+        return len(first) == len(second) and all(
+            identical(a, b) for a, b in zip(first, second))
+    return first == second
+
+
+def benchmark(instances, names, validator=None, native=True):
+    """
+    Encode and decode instances with each codec,
+    report size, timings, round trip mismatches and
+    decoded instances invalid against validator
+    """
+    results = list()
+    for name in names:
+        codec = get_codec(name, native)
+        if codec is None:
+            raise CodecError('unknown codec {0}'.format(name))
+        start = time.perf_counter()
+        encoded = [codec.encode(value) for value in instances]
+        encodetime = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = [codec.decode(data) for data in encoded]
+        decodetime = time.perf_counter() - start
+        mismatches = sum(1 for value, result in zip(instances, decoded)
+                         if not identical(value, result))
+        invalid = 0
+        if validator is not None:
+            invalid = sum(1 for result in decoded
+                          if not validator.is_valid(result))
+        results.append({
+            'codec': name,
+            'instances': len(instances),
+            'bytes': sum(len(data) for data in encoded),
+            'encode_seconds': encodetime,
+            'decode_seconds': decodetime,
+            'mismatches': mismatches,
+            'invalid': invalid
+        })
+    return results
@@ -0,0 +1,337 @@
+"""
+WSGI request validation middleware driven by generated openapi specs.
+The ASGI middleware is in asgimiddleware, which needs python 3.5
+"""
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+# pylint: disable=E0611,E0401
+from urllib.parse import parse_qs, unquote
+
+import yaml
+# pylint:W0611 Unused import jsonschema
+import jsonschema  # pylint: disable=W0611
+
+from . import mediacodecs
+from . import router
+from . import validators
+
+_LOG = logging.getLogger(__name__)
+
+
+class OperationStats():
+    """
+    Request and latency counters of an operation
+    """
+    def __init__(self):
+        """
+        Initialize counters
+        """
+        self.count = 0
+        self.validated = 0
+        self.rejected = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.validation_time = 0.0
+
+    def to_dict(self):
+        """
+        Dictionary form of the counters
+        """
+        return {
+            'count': self.count,
+            'validated': self.validated,
+            'rejected': self.rejected,
+            'total_time': self.total_time,
+            'max_time': self.max_time,
+            'mean_time': self.total_time / self.count if self.count else 0.0,
+            'validation_time': self.validation_time
+        }
+
+
+class RequestError(Exception):
+    """
+    Request does not match the spec
+    """
+    def __init__(self, status, message):
+        """
+        Initialize error with http status
+        """
+        super(RequestError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+def coerce_value(value, schema):
+    """
+    Convert string value of a parameter to the type of its schema,
+    invalid values are left to the validator
+    """
+    stype = schema.get('type')
+    try:
+        if stype == 'integer':
+            return int(value)
+        if stype == 'number':
+            return float(value)
+    except ValueError:
+        return value
+    if stype == 'boolean' and value in ['true', 'false']:
+        return value == 'true'
+    return value
+
+
+def deserialize_parameter(raw, parameter):
+    """
+    Deserialize simple and form style parameters
+    """
+    schema = parameter.schema
+    stype = schema.get('type')
+    if stype is None and 'properties' in schema:
+        stype = 'object'
+    if stype == 'array':
+        if raw == '':
+            return []
+        items = schema.get('items', {})
+        return [coerce_value(v, items) for v in raw.split(',')]
+    if stype == 'object':
+        parts = raw.split(',')
+        if parameter.explode:
+            pairs = [p.split('=', 1) for p in parts]
+        else:
+            pairs = zip(parts[0::2], parts[1::2])
+        properties = schema.get('properties', {})
+        value = dict()
+        for pair in pairs:
+            if len(pair) != 2:
+                raise RequestError(
+                    400, '{0} -- invalid value {1}'.format(
+                        parameter.name, raw))
+            value[pair[0]] = coerce_value(pair[1],
+                                          properties.get(pair[0], {}))
+        return value
+    return coerce_value(raw, schema)
+
+
+def load_body(body, mediatype):
+    """
+    Decode request body by media type
+    """
+    if mediatype.endswith('json'):
+        return json.loads(body.decode('utf-8'))
+    if mediatype.endswith('yaml'):
+        return yaml.safe_load(body.decode('utf-8'))
+    codec = mediacodecs.get_codec(mediatype.rpartition('+')[2])
+    if codec is None:
+        raise RequestError(415,
+                           'unsupported media type {0}'.format(mediatype))
+    return codec.decode(body)
+
+
+class RequestValidator():
+    """
+    Match requests to operations of generated specs and
+    validate them with precompiled validators
+    """
+    def __init__(self, specfiles, sample_rate=1.0, prefix=True):
+        """
+        Load specs and compile validators.
+        sample_rate is the fraction of requests validated,
+        prefix strips the servers url of each spec from paths
+        """
+        self.sample_rate = sample_rate
+        self.router = router.Router()
+        self.operations = dict()
+        self.stats = dict()
+        self._lock = threading.Lock()
+        for specfile in specfiles:
+            specvalidators = validators.load_validators(specfile)
+            specname = os.path.basename(specfile)
+            self.router.add_spec(specvalidators.spec, specname, prefix)
+            for operation in specvalidators.operations.values():
+                key = (specname, operation.operationid)
+                self.operations[key] = operation
+                self.stats[key] = OperationStats()
+
+    def route(self, method, path):
+        """
+        Return (specname, operationid) and raw path parameters
+        of request, operationids repeat across specs
+        """
+        route, pathparams = self.router.match(method, path)
+        if route is None:
+            if self.router.lookup(path)[0] is not None:
+                raise RequestError(405, 'method not allowed')
+            return None, None
+        return (route[3], route[0]), pathparams
+
+    def match(self, method, path):
+        """
+        Return operation and raw path parameters of request
+        """
+        key, pathparams = self.route(method, path)
+        if key is None:
+            return None, None
+        return self.operations[key], pathparams
+
+    def sampled(self):
+        """
+        Decide if the request is validated
+        """
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def validate(self, operation, pathparams, querystring,
+                 mediatype, body):
+        """
+        Validate parameters and body of a matched request
+        """
+        # R0912: Too many branches
+        # pylint: disable=R0912
+        query = parse_qs(querystring, keep_blank_values=True)
+        for parameter in operation.parameters:
+            if parameter.location == 'path':
+                raw = pathparams.get(parameter.name)
+                if raw is not None:
+                    raw = unquote(raw)
+            elif parameter.location == 'query':
+                raw = query.get(parameter.name, [None])[0]
+            else:
+                continue
+            if raw is None:
+                if parameter.required:
+                    raise RequestError(
+                        400, '{0} -- missing parameter'.format(
+                            parameter.name))
+                continue
+            _check(parameter.validator,
+                   deserialize_parameter(raw, parameter),
+                   parameter.name)
+        if not body:
+            if operation.bodyrequired:
+                raise RequestError(400, 'missing request body')
+            return
+        if not operation.body:
+            return
+        validator = operation.body_validator(mediatype)
+        if validator is None:
+            raise RequestError(
+                415, 'unsupported media type {0}'.format(mediatype))
+        try:
+            value = load_body(body, mediatype)
+        except ValueError as err:
+            raise RequestError(400, 'invalid body: {0}'.format(err)) from err
+        except yaml.YAMLError as err:
+            raise RequestError(400, 'invalid body: {0}'.format(err)) from err
+        _check(validator, value, 'body')
+
+    def record(self, key, elapsed, validated,
+               rejected, validation_time):
+        """
+        Update latency counters of an operation,
+        key is (specname, operationid)
+        """
+        with self._lock:
+            stats = self.stats[key]
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            if validated:
+                stats.validated += 1
+                stats.validation_time += validation_time
+            if rejected:
+                stats.rejected += 1
+
+    def snapshot(self):
+        """
+        Copy of the counters of all operations
+        keyed by (specname, operationid)
+        """
+        with self._lock:
+            return dict((key, stats.to_dict())
+                        for key, stats in self.stats.items())
+
+
+def _check(validator, value, name):
+    """
+    Run compiled validator and convert the first error
+    """
+    for error in validator.iter_errors(value):
+        raise RequestError(400, '{0} -- {1}'.format(name, error.message))
+
+
+def error_body(status, message):
+    """
+    Json body of an error response
+    """
+    return json.dumps({'status': status, 'error': message}).encode('utf-8')
+
+
+_REASONS = {
+    400: 'Bad Request',
+    405: 'Method Not Allowed',
+    415: 'Unsupported Media Type'
+}
+
+
+class ValidationMiddleware():
+    """
+    WSGI middleware validating requests against generated specs
+    """
+    def __init__(self, app, specfiles, sample_rate=1.0, prefix=True):
+        """
+        Wrap WSGI app
+        """
+        self.app = app
+        self.validator = RequestValidator(specfiles, sample_rate, prefix)
+
+    def __call__(self, environ, start_response):
+        """
+        Validate request and call wrapped app
+        """
+        start = time.time()
+        try:
+            key, pathparams = self.validator.route(
+                environ['REQUEST_METHOD'], environ.get('PATH_INFO', ''))
+        except RequestError as err:
+            return self.reject(start_response, err)
+        if key is None:
+            return self.app(environ, start_response)
+        operation = self.validator.operations[key]
+        validated = self.validator.sampled()
+        validation_time = 0.0
+        if validated:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            body = environ['wsgi.input'].read(length) if length else b''
+            environ['wsgi.input'] = io.BytesIO(body)
+            mediatype = environ.get('CONTENT_TYPE', '').split(';')[0]
+            try:
+                self.validator.validate(operation,
+                                        pathparams,
+                                        environ.get('QUERY_STRING', ''),
+                                        mediatype.strip(),
+                                        body)
+            except RequestError as err:
+                elapsed = time.time() - start
+                self.validator.record(key, elapsed, True, True, elapsed)
+                return self.reject(start_response, err)
+            validation_time = time.time() - start
+        result = self.app(environ, start_response)
+        self.validator.record(key,
+                              time.time() - start,
+                              validated,
+                              False,
+                              validation_time)
+        return result
+
+    def reject(self, start_response, err):
+        """
+        Send error response
+        """
+        body = error_body(err.status, err.message)
+        start_response('{0} {1}'.format(err.status, _REASONS[err.status]),
+                       [('Content-Type', 'application/json'),
+                        ('Content-Length', str(len(body)))])
+        return [body]
@@ -0,0 +1,448 @@
+"""
+Asyncio mock server answering the operations of generated openapi specs
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+# pylint: disable=E0611,E0401
+from urllib.parse import parse_qs, urlencode
+
+from . import router
+from . import samples
+from . import utils
+from . import validators
+
+_LOG = logging.getLogger(__name__)
+# bound of serialized pages kept per get-all operation
+_MAX_PAGES = 10000
+_REASONS = {
+    200: 'OK', 201: 'Created', 202: 'Accepted', 204: 'No Content',
+    400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    429: 'Too Many Requests', 500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+
+def http_response(status, body=b'', mediatype='application/json',
+                  headers=None):
+    """
+    Serialized http/1.1 response
+    """
+    lines = ['HTTP/1.1 {0} {1}'.format(status,
+                                       _REASONS.get(status, 'Unknown'))]
+    if body:
+        lines.append('Content-Type: ' + mediatype)
+    lines.append('Content-Length: {0}'.format(len(body)))
+    for name, value in (headers or []):
+        lines.append('{0}: {1}'.format(name, value))
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def _json_mediatype(content):
+    """
+    Prefer the json media type of a content section
+    """
+    for mediatype in content:
+        if mediatype.endswith('json'):
+            return mediatype
+    return next(iter(content), 'application/json')
+
+
+class MockOperation():
+    """
+    Canned response of an operation
+    """
+    def __init__(self, status, body, mediatype):
+        """
+        Initialize canned response
+        """
+        self.status = status
+        self.mediatype = mediatype
+        self.response = http_response(status, body, mediatype)
+        # get-all operations page through keys
+        self.keys = None
+        self.limit = 20
+        self.maxlimit = None
+        self.keyset = False
+        self.full = None
+        self.elements = None
+        self.extra = dict()
+        self.pages = dict()
+
+    # R0913: Too many arguments
+    # pylint: disable=R0913
+    def paginate(self, keys, limitschema, keyset=False, full=None,
+                 elements=None, extra=None):
+        """
+        Answer with pages of keys and _links cursors,
+        and _page keyset cursor metadata if keyset.
+        full are the elements of pages with _view=full, elements
+        the elements of pages which are not keys, eg rows, and
+        extra the other properties of every page
+        """
+        self.keys = keys
+        self.keyset = keyset
+        self.full = full
+        self.elements = elements
+        self.extra = extra or dict()
+        self.limit = limitschema.get('default', self.limit)
+        self.maxlimit = limitschema.get('maximum')
+
+    def page(self, path, querystring):
+        """
+        Serialized page of keys for _cursor and _limit
+        """
+        query = parse_qs(querystring)
+        try:
+            offset = int(query.get('_cursor', ['0'])[0])
+            limit = int(query.get('_limit', [self.limit])[0])
+        except ValueError:
+            return http_response(400)
+        view = query.get('_view', ['keys'])[0]
+        elements = self.keys
+        if self.elements is not None:
+            elements = self.elements
+        if view == 'full' and self.full is not None:
+            elements = self.full
+        else:
+            view = None
+        if self.maxlimit is not None:
+            limit = min(limit, self.maxlimit)
+        limit = max(limit, 1)
+        offset = max(offset, 0)
+        cachekey = (path, offset, limit, view)
+        if cachekey not in self.pages:
+            if len(self.pages) >= _MAX_PAGES:
+                self.pages.clear()
+            links = {'_self': {'href': _href(path, offset, limit, view)}}
+            if offset + limit < len(self.keys):
+                links['_next'] = {
+                    'href': _href(path, offset + limit, limit, view)}
+            if offset > 0:
+                links['_prev'] = {
+                    'href': _href(path, max(offset - limit, 0), limit,
+                                  view)}
+            page = dict(self.extra)
+            page['_elem'] = elements[offset:offset + limit]
+            page['_links'] = links
+            if self.keyset:
+                page['_page'] = {
+                    'limit': limit,
+                    'has_more': '_next' in links
+                }
+                if page['_elem']:
+                    page['_page']['last_key'] = self.keys[
+                        min(offset + limit, len(self.keys)) - 1]
+                if '_next' in links:
+                    page['_page']['next_cursor'] = str(offset + limit)
+            body = json.dumps(page).encode('utf-8')
+            self.pages[cachekey] = http_response(self.status,
+                                                 body,
+                                                 self.mediatype)
+        return self.pages[cachekey]
+
+
+def _href(path, offset, limit, view=None):
+    """
+    Link to a page
+    """
+    query = [('_cursor', offset), ('_limit', limit)]
+    if view:
+        query.append(('_view', view))
+    return path + '?' + urlencode(query)
+
+
+class MockServer():
+    """
+    Canned or synthesized responses for every operation of specs
+    """
+    def __init__(self, specfiles, seed=None, collection_size=100,
+                 canned=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, prefix=True):
+        """
+        Load specs and build responses.
+        canned maps operationId, or (specname, operationId) for an
+        operation of one spec, to {'status': ..., 'body': ...},
+        latency and jitter are in seconds
+        """
+        self.router = router.Router()
+        self.operations = dict()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_response = http_response(
+            error_status,
+            json.dumps({'status': error_status}).encode('utf-8'))
+        self.notfound = http_response(404)
+        self.notallowed = http_response(405)
+        self.random = random.Random(seed)
+        canned = canned or dict()
+        for specfile in specfiles:
+            specvalidators = validators.load_validators(specfile)
+            specname = os.path.basename(specfile)
+            generator = samples.SampleGenerator(specvalidators, seed)
+            self.router.add_spec(specvalidators.spec, specname, prefix)
+            for pathitem in specvalidators.spec['paths'].values():
+                for method, operation in pathitem.items():
+                    if method not in utils.HTTP_METHODS:
+                        continue
+                    opid = operation.get('operationId')
+                    self.operations[(specname, opid)] = self.build(
+                        specvalidators,
+                        generator,
+                        operation,
+                        canned.get((specname, opid), canned.get(opid)),
+                        collection_size)
+
+    def build(self, specvalidators, generator, operation,
+              canned, collection_size):
+        """
+        Build canned response of an operation
+        """
+        # R0911: Too many return statements
+        # R0912: Too many branches
+        # pylint: disable=R0911,R0912
+        if canned:
+            return MockOperation(canned.get('status', 200),
+                                 json.dumps(canned.get('body')).encode(
+                                     'utf-8'),
+                                 canned.get('mediatype',
+                                            'application/json'))
+        responses = operation.get('responses', {})
+        statuses = sorted(s for s in responses if str(s).startswith('2'))
+        if not statuses:
+            return MockOperation(204, b'', 'application/json')
+        # prefer a success response with a body
+        status = statuses[0]
+        for candidate in statuses:
+            response = specvalidators.dereference(responses[candidate])
+            if response.get('content'):
+                status = candidate
+                break
+        response = specvalidators.dereference(responses[status])
+        content = response.get('content', {})
+        if not content:
+            return MockOperation(int(status), b'', 'application/json')
+        mediatype = _json_mediatype(content)
+        schema = generator.resolve(content[mediatype].get('schema', {}))
+        properties = schema.get('properties', {})
+        if '_elem' in properties and '_links' in properties:
+            mock = MockOperation(int(status), b'', mediatype)
+            items = properties['_elem'].get('items', {})
+            fullitems = None
+            if 'anyOf' in items:
+                # keys or full resources with _view=full
+                items, fullitems = items['anyOf'][:2]
+            elements = None
+            if items != _primary_key(specvalidators):
+                # rows or change records, keyset paged by their key
+                elements = [generator.sample(items)
+                            for _ in range(collection_size)]
+                page = generator.resolve(properties.get('_page', {}))
+                items = page.get('properties', {}).get('last_key', {})
+            keys = [generator.sample_key(items, i)
+                    for i in range(collection_size)]
+            full = None
+            if fullitems is not None:
+                full = list()
+                for key in keys:
+                    element = generator.sample(fullitems)
+                    element['primary_key'] = key
+                    full.append(element)
+            extra = dict((k, generator.sample(properties[k]))
+                         for k in schema.get('required', [])
+                         if k not in ['_elem', '_links', '_page'])
+            mock.paginate(keys,
+                          _limit_schema(specvalidators, operation),
+                          '_page' in properties,
+                          full,
+                          elements,
+                          extra)
+            return mock
+        if mediatype == utils.EVENT_STREAM_CONTENT:
+            events = list()
+            for index in range(collection_size):
+                event = generator.sample(schema)
+                events.append('id: {0}\nevent: {1}\ndata: {2}\n\n'.format(
+                    index, event.get('event', 'message'),
+                    json.dumps(event.get('data'))))
+            return MockOperation(int(status), ''.join(events).encode('utf-8'),
+                                 mediatype)
+        if mediatype == utils.NDJSON_CONTENT:
+            body = ''.join(json.dumps(generator.sample(schema)) + '\n'
+                           for _ in range(collection_size)).encode('utf-8')
+            return MockOperation(int(status), body, mediatype)
+        body = json.dumps(generator.sample(schema)).encode('utf-8')
+        return MockOperation(int(status), body, mediatype)
+
+    def respond(self, method, target):
+        """
+        Serialized response for request method and target
+        """
+        path, _, querystring = target.partition('?')
+        route, _ = self.router.match(method, path)
+        if route is None:
+            if self.router.lookup(path)[0] is not None:
+                return self.notallowed
+            return self.notfound
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_response
+        mock = self.operations[(route[3], route[0])]
+        if mock.keys is not None:
+            return mock.page(path, querystring)
+        return mock.response
+
+    def delay(self):
+        """
+        Injected latency of a response in seconds
+        """
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.random.uniform(self.latency - self.jitter,
+                                            self.latency + self.jitter))
+
+
+def _primary_key(specvalidators):
+    """
+    Dereferenced primary key schema of a spec
+    """
+    schemas = specvalidators.spec.get('components', {}).get('schemas', {})
+    return specvalidators.dereference(schemas.get('primary_key', {}))
+
+
+def _limit_schema(specvalidators, operation):
+    """
+    Schema of the _limit parameter of a get-all operation
+    """
+    for parameter in operation.get('parameters', []):
+        parameter = specvalidators.dereference(parameter)
+        if parameter.get('name') == '_limit':
+            return parameter.get('schema', {})
+    return {}
+
+
+class MockProtocol(asyncio.Protocol):
+    """
+    Minimal http/1.1 protocol with keep-alive and pipelining
+    """
+    def __init__(self, server):
+        """
+        Initialize connection
+        """
+        self.server = server
+        self.transport = None
+        self.buffer = b''
+        self.loop = asyncio.get_event_loop()
+        self.sendtime = 0.0
+
+    def connection_made(self, transport):
+        """
+        Keep transport of the connection
+        """
+        self.transport = transport
+
+    def data_received(self, data):
+        """
+        Parse complete requests from the buffer and answer them
+        """
+        self.buffer += data
+        while True:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                return
+            head = self.buffer[:end].decode('latin-1')
+            lines = head.split('\r\n')
+            length = 0
+            close = False
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                name = name.strip().lower()
+                if name == 'content-length' and value.strip().isdigit():
+                    length = int(value.strip())
+                elif name == 'connection':
+                    close = value.strip().lower() == 'close'
+            if len(self.buffer) < end + 4 + length:
+                return
+            self.buffer = self.buffer[end + 4 + length:]
+            parts = lines[0].split(' ')
+            if len(parts) != 3:
+                self.send(http_response(400), True)
+                return
+            self.send(self.server.respond(parts[0], parts[1]), close)
+            if close:
+                return
+
+    def send(self, response, close):
+        """
+        Write response, delayed by the injected latency
+        keeping the order of pipelined requests
+        """
+        delay = self.server.delay()
+        if not delay:
+            self.transport.write(response)
+            if close:
+                self.transport.close()
+            return
+        now = self.loop.time()
+        self.sendtime = max(self.sendtime, now + delay)
+        self.loop.call_at(self.sendtime, self.write, response, close)
+
+    def write(self, response, close):
+        """
+        Write delayed response
+        """
+        if self.transport.is_closing():
+            return
+        self.transport.write(response)
+        if close:
+            self.transport.close()
+
+
+def serve(mockserver, host='127.0.0.1', port=8080):
+    """
+    Run mock server until interrupted
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server = loop.run_until_complete(loop.create_server(
+        lambda: MockProtocol(mockserver), host, port))
+    _LOG.info('Mock server listening on %s:%d with %d operations',
+              host, port, len(mockserver.operations))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+def canned_responses(canned):
+    """
+    Canned responses of a json file, keys <specname>/<operationId>
+    are for the operation of one spec
+    """
+    return dict((tuple(key.split('/', 1)) if '/' in key else key, response)
+                for key, response in canned.items())
+
+
+def main(args):
+    """
+    Main function of mock command
+    """
+    canned = None
+    if args.canned:
+        with open(args.canned) as fh:
+            canned = canned_responses(json.load(fh))
+    mockserver = MockServer(router.expand_specs(args.specs),
+                            seed=args.seed,
+                            collection_size=args.collection_size,
+                            canned=canned,
+                            latency=args.latency / 1000.0,
+                            jitter=args.jitter / 1000.0,
+                            error_rate=args.error_rate,
+                            error_status=args.error_status)
+    serve(mockserver, args.host, args.port)
@@ -1,16 +1,17 @@
 """
 create openapi spec from resource schema
 """
+import concurrent.futures
 import copy
 import errno
-import imp
 import logging
 import os
-import re
 import sys
 
 import yaml
-from . import openapiv3
+from . import emitters
+from . import plugins
+from . import refcache
 from . import utils
 
 _LOG = logging.getLogger(__name__)
@@ -19,30 +20,16 @@ _EXIT_STATUS = 0
 
 def load_class_from_module(modulefile, major_version):
     """
-    Load module file
+    Load generator class of major version from module file
     """
-    openapispec_class = None
-    modulebasepath = os.path.dirname(modulefile)
-    sys.path.append(modulebasepath)
-    inputmodule = os.path.splitext(modulefile)[0]
-    modulename = os.path.basename(inputmodule)
-    regex = re.compile(r'^openapi(v[0-9]+)$')
-    result = regex.match(modulename)
-    module_version = result.groups()[0]
-    if major_version == module_version:
-        modulespec = imp.find_module(modulename)
-        module = imp.load_module(modulename, *modulespec)
-        classname = 'Version' + module_version.upper()
-        openapispec_class = getattr(module, classname)
-    return openapispec_class
+    return plugins.get_generator(major_version, modulefile)
 
 
-def main(args):
+def create_openapi_global(family):
     """
-    Main function
+    Create the skeleton shared by every spec of a family
     """
     openapiglobal = dict()
-    family = utils.get_family(args.basedir)
     openapiglobal['servers'] = [
         {"url": "/" + family, "description": family}]
     openapiglobal['openapi'] = '3.0.0'
@@ -52,31 +39,192 @@ def main(args):
     openapiglobal['components']['schemas'] = dict()
     info = dict()
     openapiglobal['info'] = info
+    return openapiglobal
+
+
+def main(args):
+    """
+    Main function
+    """
     if args.infile and not args.outdir:
         sys.exit('Enter infile and outdir')
-    if args.outdir:
-        openapidir = args.outdir
+    if args.manifest or ',' in args.basedir:
+        if args.infile or args.outdir or args.routes:
+            sys.exit('--infile, --outdir and --routes need a single family')
+        if args.manifest:
+            families = load_manifest(args.manifest)
+        else:
+            families = [{'basedir': basedir,
+                         'lones': args.lones.split(',')}
+                        for basedir in args.basedir.split(',')]
+        sys.exit(build_families(families,
+                                args.outfmt,
+                                args.module,
+                                args.emit,
+                                args.jobs))
+    status = build_family(args.basedir,
+                          args.lones.split(','),
+                          args.outfmt,
+                          args.module,
+                          args.emit,
+                          args.routes,
+                          args.outdir,
+                          args.infile)
+    if args.infile:
+        return
+    sys.exit(status)
+
+
+def load_manifest(manifestfile):
+    """
+    Families of a manifest yaml file, a list of families
+    with basedir, optional lones and optional family name.
+    Relative basedirs are relative to the manifest
+    """
+    try:
+        with open(manifestfile) as fh:
+            manifest = yaml.safe_load(fh.read())
+    except (OSError, yaml.YAMLError) as err:
+        sys.exit("Error in manifest {0}: {1}".format(manifestfile, err))
+    if isinstance(manifest, dict):
+        manifest = manifest.get('families')
+    if not isinstance(manifest, list):
+        sys.exit('families should be a list in manifest {0}'.format(
+            manifestfile))
+    families = list()
+    manifestdir = os.path.dirname(os.path.abspath(manifestfile))
+    for familydef in manifest:
+        if not isinstance(familydef, dict) or 'basedir' not in familydef:
+            sys.exit('basedir missing in {0} in manifest {1}'.format(
+                familydef, manifestfile))
+        familydef = dict(familydef)
+        familydef['basedir'] = os.path.join(manifestdir,
+                                            familydef['basedir'])
+        if isinstance(familydef.get('lones'), str):
+            familydef['lones'] = familydef['lones'].split(',')
+        families.append(familydef)
+    return families
+
+
+def build_families(families, outfmt, inputmodule=None, emit='openapi3',
+                   jobs=1):
+    """
+    Build several families in one invocation, returns the exit status.
+    Families are scheduled on a pool of jobs worker processes, each
+    worker shares its caches across the families it builds
+    """
+    status = 0
+    if jobs > 1 and len(families) > 1:
+        settings = (refcache.get_cache().settings(),
+                    logging.getLogger().getEffectiveLevel())
+        with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(_build_family_def,
+                                   familydef,
+                                   outfmt,
+                                   inputmodule,
+                                   emit,
+                                   settings) for familydef in families]
+            for future in futures:
+                status |= future.result()
+        return status
+    for familydef in families:
+        status |= _build_family_def(familydef, outfmt, inputmodule, emit)
+    return status
+
+
+def _build_family_def(familydef, outfmt, inputmodule, emit, settings=None):
+    """
+    Build a family of a manifest, a fatal error of the family
+    fails the family but not the other families.
+    settings are the reference cache settings and log level
+    of the parent process, set up in worker processes
+    """
+    if settings is not None:
+        _setup_worker(*settings)
+    try:
+        return build_family(familydef['basedir'],
+                            familydef.get('lones'),
+                            outfmt,
+                            inputmodule,
+                            emit,
+                            family=familydef.get('family'))
+    except SystemExit as err:
+        _LOG.error('%s -- %s', familydef['basedir'], err)
+        return 1
+
+
+def _setup_worker(refsettings, loglevel):
+    """
+    Configure logging and the reference cache of a worker process
+    like its parent, workers started with spawn or forkserver
+    do not inherit them
+    """
+    logging.basicConfig(format=utils.LOG_FORMAT, level=loglevel)
+    if refcache.get_cache().settings() != refsettings:
+        refcache.configure(**refsettings)
+
+
+def resource_schemas(schemadir):
+    """
+    Names of all resource schemas in schemadir
+    """
+    if not os.path.isdir(schemadir):
+        return []
+    return sorted(name for name in os.listdir(schemadir)
+                  if not name.startswith('.') and
+                  os.path.isfile(os.path.join(schemadir, name)))
+
+
+def build_family(basedir, lones, outfmt, inputmodule=None, emit='openapi3',
+                 routesfile=None, outdir=None, infile=None, family=None):
+    """
+    Create the openapi specs of the lones of the family in basedir,
+    all resource schemas of the family if lones is None.
+    Returns the exit status
+    """
+    # R0912: Too many branches
+    # R0913: Too many arguments
+    # pylint: disable=R0912,R0913
+    # W0603(global-statement
+    # pylint: disable=W0603
+    global _EXIT_STATUS
+    _EXIT_STATUS = 0
+    if family is None:
+        family = utils.get_family(basedir)
+    defaults = utils.get_family_defaults(basedir)
+    openapiglobal = create_openapi_global(family)
+    if outdir:
+        openapidir = outdir
     else:
-        openapidir = os.path.join(args.basedir, 'apischemas', 'openapi')
+        openapidir = os.path.join(basedir, 'apischemas', 'openapi')
         try:
             os.makedirs(openapidir)
         except OSError as err:
             if err.errno != errno.EEXIST:
                 raise
-    utils.dump_file_to_openapidir(args.basedir, openapidir, args.infile)
-    if args.infile:
+    utils.dump_file_to_openapidir(basedir, openapidir, infile)
+    try:
+        artifacts = emitters.get_emitters(emit, openapidir, routesfile)
+    except ValueError as err:
+        sys.exit(str(err))
+    if infile:
         openapi = dict()
         openapi = copy.deepcopy(openapiglobal)
         create_openapi_spec(openapi,
-                            args.infile,
+                            infile,
                             openapidir,
                             family,
-                            args.outfmt,
-                            args.module)
-        return
-    schemadir = os.path.join(args.basedir, 'apischemas', 'rschemas')
-    lones_list = args.lones.split(',')
-    for lone in lones_list:
+                            outfmt,
+                            inputmodule,
+                            defaults,
+                            artifacts)
+        for emitter in artifacts:
+            emitter.finish()
+        return _EXIT_STATUS
+    schemadir = os.path.join(basedir, 'apischemas', 'rschemas')
+    if lones is None:
+        lones = resource_schemas(schemadir)
+    for lone in lones:
         schemafile = os.path.join(schemadir, lone)
         if os.path.isfile(schemafile):
             openapi = dict()
@@ -85,31 +233,73 @@ def main(args):
                                 schemafile,
                                 openapidir,
                                 family,
-                                args.outfmt,
-                                args.module)
+                                outfmt,
+                                inputmodule,
+                                defaults,
+                                artifacts)
         else:
             _LOG.error('%s -- Resource does not exist', lone)
-            # W0603(global-statement
-            # pylint: disable=W0603
-            global _EXIT_STATUS
             _EXIT_STATUS = 1
-    sys.exit(_EXIT_STATUS)
+    for emitter in artifacts:
+        emitter.finish()
+    return _EXIT_STATUS
 
 
 def create_openapi_spec(openapi, schemafile, openapidir,
-                        family, outfmt, inputmodule=None):
+                        family, outfmt, inputmodule=None, defaults=None,
+                        artifacts=None):
+    """
+    Create openapi spec for each lone, artifacts are the
+    emitters of the spec object, by default the openapi spec
+    """
+    # W0603(global-statement
+    # pylint: disable=W0603
+    global _EXIT_STATUS
+    specobj = build_openapi_spec(openapi,
+                                 schemafile,
+                                 openapidir,
+                                 family,
+                                 outfmt,
+                                 inputmodule,
+                                 defaults)
+    if specobj:
+        emit_spec(specobj, schemafile, artifacts)
+        if specobj.error:
+            _EXIT_STATUS = 1
+
+
+def emit_spec(specobj, schemafile, artifacts=None):
+    """
+    Validate the component schemas of a built spec object once and
+    emit its artifacts, none are emitted if the spec has errors
+    """
+    if not specobj.error and \
+            utils.validate_schema(specobj.openapi, schemafile):
+        specobj.error = 1
+    if artifacts is None:
+        artifacts = [emitters.OpenapiEmitter()]
+    for emitter in artifacts:
+        if specobj.error:
+            break
+        emitter.emit(specobj)
+
+
+def build_openapi_spec(openapi, schemafile, openapidir,
+                       family, outfmt, inputmodule=None, defaults=None):
     """
-    Create openapi spec for each lone
+    Build openapi spec object for a lone without writing it.
+    defaults are the family defaults of resource schema options
     """
-    schema = open(schemafile).read()
     try:
-        value = yaml.load(schema)
+        value = utils.load_yaml_file(schemafile)
     except yaml.YAMLError as err:
         sys.exit("Yaml Error in {0}: {1}".format(schemafile, err))
     if 'rpconly' in value and value['rpconly']:
         utils.check_rpconlybasic_fields(value, schemafile)
     else:
         utils.check_basic_fields(value, schemafile)
+    if defaults:
+        utils.apply_family_defaults(value, defaults)
     extfamily = '_'.join(family.split('/'))
     mimetype = utils.create_mime_type(value, extfamily)
     version = '_'.join(mimetype.split('.')[-3::])
@@ -128,37 +318,19 @@ def create_openapi_spec(openapi, schemafile, openapidir,
         'description': 'openapi spec for this resource'
     }
     specfile = os.path.join(openapidir, mimetype)
-    # W0603(global-statement
-    # pylint: disable=W0603
-    global _EXIT_STATUS
-    if major_version == 'v3':
-        v3specobj = openapiv3.VersionV3(openapi,
-                                        specfile,
-                                        value,
-                                        outfmt,
-                                        mimetype,
-                                        version,
-                                        schemafile,
-                                        openapidir)
-        v3specobj.create_spec()
-        v3specobj.write()
-        if v3specobj.error:
-            _EXIT_STATUS = 1
-    elif inputmodule:
-        specclass = load_class_from_module(inputmodule, major_version)
-        if specclass:
-            specobj = specclass(openapi,
-                                specfile,
-                                value,
-                                outfmt,
-                                mimetype,
-                                version,
-                                schemafile,
-                                openapidir)
-            specobj.create_spec()
-            specobj.write()
-            if specobj.error:
-                _EXIT_STATUS = 1
-    else:
-        msg = '{0} is not supported'.format(major_version)
-        sys.exit(msg)
+    specclass = plugins.get_generator(major_version, inputmodule)
+    if not specclass:
+        if not inputmodule:
+            msg = '{0} is not supported'.format(major_version)
+            sys.exit(msg)
+        return None
+    specobj = specclass(openapi,
+                        specfile,
+                        value,
+                        outfmt,
+                        mimetype,
+                        version,
+                        schemafile,
+                        openapidir)
+    specobj.create_spec()
+    return specobj
@@ -7,20 +7,27 @@ for Openapi 3.0 version
 import copy
 import json
 import logging
+import re
 
 import yaml
 # pylint:W0611 Unused import jsonschema
 import jsonschema  # pylint: disable=W0611
 from jsonschema import RefResolver
 
+from . import ir
+from . import refcache
 from . import utils
 _LOG = logging.getLogger(__name__)
+_MEDIATYPE_SUFFIX = re.compile(r'^[a-z0-9][a-z0-9.-]*$')
 
 
 class VersionV3():
     """
     Version V3 - Openapi spec 3.0 with jsonschema validation
     """
+    # major versions of resource schemas generated by this class
+    VERSIONS = ['v3']
+
     def __init__(self, openapi, specfile,
                  schema, outfmt, mimetype, version,
                  schemafile, openapidir):
@@ -39,11 +46,18 @@ class VersionV3():
         self.inresponses = dict()
         self.delresponses = dict()
         base = "file://{0}/".format(openapidir)
-        handlers = {'file': utils.yaml_handler}
+        handlers = refcache.handlers()
         self.resolver = RefResolver(base_uri=base,
                                     referrer=schema,
                                     handlers=handlers)
         self.error = 0
+        self.pagination = dict(utils.PAGINATION)
+        # result schemas of async rpc verbs
+        self.asyncrpc = dict()
+        # propertylist names, in the order their paths are added
+        self.proplists = list()
+        # typed representation of resourcedef, see resource_ir
+        self.resourceir = None
         self.hasbody = 'type' in schema
         self.bodyreq = 'required' in schema
 
@@ -57,6 +71,11 @@ class VersionV3():
             self.openapi['components']["responses"] = resp_comp
             self.add_rpcverbs()
         else:
+            self.pagination = utils.pagination_options(self.resourcedef,
+                                                       self.schemafile)
+            if self.pagination is None:
+                self.error = 1
+                return
             self.add_responses()
             self.inresponses = copy.deepcopy(
                 utils.generate_default_response())
@@ -78,9 +97,19 @@ class VersionV3():
             if not err:
                 self.add_basepath()
                 self.add_pkpath()
+                self.add_batchpaths()
+                if self.resourcedef.get('changefeed'):
+                    self.add_changefeed()
                 if self.hasbody:
                     self.add_extrapaths()
+                if self.resourcedef.get('watch'):
+                    self.add_watchpaths()
+                if self.resourcedef.get('conditional'):
+                    self.add_conditional()
+                if 'cache' in self.resourcedef:
+                    self.add_cache()
             self.add_rpcverbs()
+        self.add_mediatypes()
 
     def add_definitions(self):
         """
@@ -203,6 +232,74 @@ class VersionV3():
                 }
             }
         }
+        if self.pagination['cursor'] == 'keyset':
+            for content in resp_comp["Ok_all"]["content"].values():
+                content['schema']['properties']['_page'] = {
+                    "type": "object",
+                    "description": (
+                        "keyset cursor, pass next_cursor as _cursor "
+                        "to get the page after last_key"
+                    ),
+                    "properties": {
+                        "next_cursor": {
+                            "type": "string"
+                        },
+                        "last_key": {
+                            "$ref": "#/components/schemas/primary_key"
+                        },
+                        "limit": {
+                            "type": "integer"
+                        },
+                        "has_more": {
+                            "type": "boolean"
+                        }
+                    },
+                    "required": ["has_more"]
+                }
+        if self.resourcedef.get('expand'):
+            self.openapi['components']['schemas']['expand-item'] = {
+                "type": "object",
+                "properties": {
+                    "primary_key": {
+                        "$ref": "#/components/schemas/primary_key"
+                    },
+                    "body": {
+                        "$ref": (
+                            "#/components/schemas/" +
+                            self.resourcedef['name']
+                        )
+                    }
+                },
+                "required": ["primary_key", "body"]
+            }
+            resp_comp["Ok_all_expand"] = copy.deepcopy(resp_comp["Ok_all"])
+            resp_comp["Ok_all_expand"]["description"] = (
+                "OK, primary keys or full resources with _view=full")
+            for content in resp_comp["Ok_all_expand"]["content"].values():
+                content['schema']['properties']['_elem']['items'] = {
+                    "anyOf": [
+                        {"$ref": "#/components/schemas/primary_key"},
+                        {"$ref": "#/components/schemas/expand-item"}
+                    ]
+                }
+        if self.resourcedef.get('fields'):
+            partialschema = {
+                "$ref": "#/components/schemas/partial-resource"
+            }
+            resp_comp["Ok_partial"] = {
+                "description": "OK, only the properties in _fields if given",
+                "content": {
+                    self.json_content: {
+                        'schema': partialschema
+                    },
+                    self.yaml_content: {
+                        'schema': partialschema
+                    }
+                }
+            }
+            if self.resourcedef.get('expand'):
+                self.openapi['components']['schemas']['expand-item'][
+                    'properties']['body'] = partialschema
         resp_comp["Ok"] = {
             "description": "OK",
             "content": {
@@ -264,6 +361,96 @@ class VersionV3():
         }
         self.openapi['components']["responses"] = resp_comp
 
+    def limit_schema(self):
+        """
+        Schema of _limit query parameter v3
+        """
+        return {
+            "type": "integer",
+            "minimum": self.pagination['minimum'],
+            "maximum": self.pagination['maximum'],
+            "default": self.pagination['default']
+        }
+
+    def view_parameter(self):
+        """
+        _view query parameter of get all operation v3
+        """
+        return {
+            "name": "_view",
+            "required": False,
+            "in": "query",
+            "style": "form",
+            "explode": False,
+            "description": (
+                "keys returns primary keys, full returns "
+                "primary keys with the resources"
+            ),
+            "schema": {
+                "type": "string",
+                "enum": ["keys", "full"],
+                "default": "keys"
+            }
+        }
+
+    def fields_parameter(self):
+        """
+        _fields query parameter of get operations v3
+        """
+        return {
+            "name": "_fields",
+            "required": False,
+            "in": "query",
+            "style": "form",
+            "explode": False,
+            "description": (
+                "comma separated property paths to return, "
+                "nested properties are dotted"
+            ),
+            "schema": {
+                "type": "array",
+                "items": {
+                    "$ref": "#/components/schemas/field-paths"
+                }
+            }
+        }
+
+    def resource_ir(self):
+        """
+        Typed representation of the resource schema, built once v3
+        """
+        if self.resourceir is None:
+            self.resourceir = ir.build(self.resourcedef, self.resolver,
+                                       self.schemafile)
+            if self.resourceir.error:
+                self.error = 1
+        return self.resourceir
+
+    def property_paths(self):
+        """
+        Top level and dotted nested paths of the properties v3
+        """
+        return ['.'.join(path) for path, _ in self.resource_ir().walk()
+                if len(path) <= utils.FIELDS_MAXDEPTH]
+
+    def add_fields(self):
+        """
+        Add property paths and partial resource schemas
+        of sparse fieldsets v3
+        """
+        schemas = self.openapi['components']['schemas']
+        paths = self.property_paths()
+        if not paths:
+            msg = 'fields -- resource has no properties in schema file %s'
+            _LOG.error(msg, self.schemafile)
+            self.error = 1
+            return
+        schemas['field-paths'] = {"type": "string", "enum": paths}
+        schemas['partial-resource'] = utils.partial_schema(
+            schemas[self.resourcedef['name']])
+        self.openapi['components']['parameters'][
+            'Fields'] = self.fields_parameter()
+
     def add_parameters(self):
         """
         Add parameters to components/parameters section of openapi spec v3
@@ -284,12 +471,7 @@ class VersionV3():
             "in": "query",
             "style": "form",
             "explode": False,
-            "schema": {
-                "type": "integer",
-                "minimum": 1,
-                "maximum": 30,
-                "default": 20
-            }
+            "schema": self.limit_schema()
         }
         para_comp["Pagination_cursor"] = {
             "name": "_cursor",
@@ -301,6 +483,8 @@ class VersionV3():
                 "type": "string"
             }
         }
+        if self.resourcedef.get('expand'):
+            para_comp["View"] = self.view_parameter()
         if 'search' in self.resourcedef:
             if not isinstance(self.resourcedef['search'], list):
                 msg = 'search field should be a list in schema %s'
@@ -348,8 +532,11 @@ class VersionV3():
         """
         resource = copy.deepcopy(self.resourcedef)
         resource.pop('name', None)
+        utils.pop_resource_options(resource)
         self.openapi['components']['schemas'][
             self.resourcedef['name']] = utils.jsonschema_compat(resource)
+        if self.resourcedef.get('fields'):
+            self.add_fields()
         self.openapi['paths']['/' + self.resourcedef['name']] = dict()
         operationid = self.resourcedef['name'] + "_get_all_" + self.version
         parameters = [
@@ -359,12 +546,7 @@ class VersionV3():
                 "in": "query",
                 "style": "form",
                 "explode": False,
-                "schema": {
-                    "type": "integer",
-                    "minimum": 1,
-                    "maximum": 30,
-                    "default": 20
-                }
+                "schema": self.limit_schema()
             },
             {
                 "name": "_cursor",
@@ -378,15 +560,24 @@ class VersionV3():
             }
         ]
 
+        searchparams = list()
         if 'search' in self.resourcedef:
             for search_by in self.resourcedef['search']:
-                parameters.append(self.openapi['components'][
+                searchparams.append(self.openapi['components'][
                     'parameters'][search_by['name']])
+        parameters.extend(searchparams)
         base_responses = copy.deepcopy(
             utils.generate_default_response())
         base_responses['200'] = {
             "$ref": "#/components/responses/Ok_all"
         }
+        if self.resourcedef.get('expand'):
+            parameters.append(self.view_parameter())
+            base_responses['200'] = {
+                "$ref": "#/components/responses/Ok_all_expand"
+            }
+            if self.resourcedef.get('fields'):
+                parameters.append(self.fields_parameter())
         opengapigetall = {
             'get': {
                 'tags': [self.resourcedef['name']],
@@ -398,6 +589,8 @@ class VersionV3():
         }
         self.openapi['paths']['/' + self.resourcedef['name']][
             'get'] = opengapigetall['get']
+        if self.resourcedef.get('stream'):
+            self.add_streampath(searchparams)
         operationid = self.resourcedef['name'] + '_post_' + self.version
         desc = 'create a {0}'.format(self.resourcedef['name'])
         reqbody = {
@@ -436,6 +629,230 @@ class VersionV3():
         self.openapi['paths']['/' + self.resourcedef['name']][
             'post'] = openapicreate['post']
 
+    def add_streampath(self, parameters):
+        """
+        Add get all operation streaming the resources
+        as newline delimited json v3
+        """
+        responses = copy.deepcopy(utils.generate_default_response())
+        responses['200'] = {
+            "description": "Resources, one json document per line",
+            "content": {
+                utils.NDJSON_CONTENT: {
+                    "schema": {
+                        "$ref": (
+                            "#/components/schemas/" +
+                            self.resourcedef['name']
+                        )
+                    }
+                }
+            }
+        }
+        self.openapi['paths']['/' + self.resourcedef['name'] + ':stream'] = {
+            'get': {
+                'tags': [self.resourcedef['name']],
+                'description': "Stream all the resources",
+                'operationId': (self.resourcedef['name'] + '_stream_' +
+                                self.version),
+                'parameters': parameters,
+                'responses': responses
+            }
+        }
+
+    def add_changefeed(self):
+        """
+        Add change feed of the resources changed
+        after a since watermark v3
+        """
+        name = self.resourcedef['name']
+        schemas = self.openapi['components']['schemas']
+        schemas['change-record'] = {
+            "type": "object",
+            "properties": {
+                "op": {
+                    "type": "string",
+                    "enum": ["create", "update", "delete"]
+                },
+                "primary_key": {
+                    "$ref": "#/components/schemas/primary_key"
+                },
+                "version": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "version of the resource after the change"
+                },
+                "body": {
+                    "$ref": "#/components/schemas/" + name
+                }
+            },
+            "required": ["op", "primary_key", "version"]
+        }
+        responses = self.openapi['components']['responses']
+        response = copy.deepcopy(responses['Ok_all'])
+        for content in response['content'].values():
+            properties = content['schema']['properties']
+            properties['_elem']['items'] = {
+                "$ref": "#/components/schemas/change-record"
+            }
+            properties['_watermark'] = {
+                "type": "string",
+                "description": "pass as since to get the later changes"
+            }
+            content['schema']['required'] = ['_elem', '_watermark']
+        responses['Ok_changes'] = response
+        changeresponses = copy.deepcopy(utils.generate_default_response())
+        changeresponses['200'] = {
+            "$ref": "#/components/responses/Ok_changes"
+        }
+        self.openapi['paths']['/' + name + ':changes'] = {
+            'get': {
+                'tags': [name],
+                'description': "Get the changes after a watermark",
+                'operationId': name + '_changes_' + self.version,
+                'parameters': [
+                    {
+                        "name": "since",
+                        "required": False,
+                        "in": "query",
+                        "style": "form",
+                        "explode": False,
+                        "description": (
+                            "watermark of a previous response, "
+                            "all changes when missing"
+                        ),
+                        "schema": {
+                            "type": "string"
+                        }
+                    },
+                    {"$ref": "#/components/parameters/Pagination_limit"},
+                    {"$ref": "#/components/parameters/Pagination_cursor"}
+                ],
+                'responses': changeresponses
+            }
+        }
+
+    def watch_event(self, events, dataschema):
+        """
+        Server-sent event with data of dataschema v3
+        """
+        return {
+            "type": "object",
+            "properties": {
+                "id": {
+                    "type": "string"
+                },
+                "event": {
+                    "type": "string",
+                    "enum": events
+                },
+                "retry": {
+                    "type": "integer",
+                    "minimum": 0
+                },
+                "data": {
+                    "$ref": "#/components/schemas/" + dataschema
+                }
+            },
+            "required": ["event", "data"]
+        }
+
+    def add_watchpaths(self):
+        """
+        Add server-sent events streams of the changes of
+        all resources and of a resource v3
+        """
+        name = self.resourcedef['name']
+        components = self.openapi['components']
+        schemas = components['schemas']
+        schemas['watch-resource'] = {
+            "type": "object",
+            "properties": {
+                "primary_key": {
+                    "$ref": "#/components/schemas/primary_key"
+                },
+                "body": {
+                    "$ref": "#/components/schemas/" + name
+                }
+            },
+            "required": ["primary_key"]
+        }
+        events = [self.watch_event(["created", "updated", "deleted"],
+                                   'watch-resource')]
+        if self.proplists:
+            schemas['watch-row'] = {
+                "type": "object",
+                "properties": {
+                    "primary_key": {
+                        "$ref": "#/components/schemas/primary_key"
+                    },
+                    "property": {
+                        "type": "string",
+                        "enum": list(self.proplists)
+                    },
+                    "keys": {
+                        "anyOf": [
+                            {"$ref": "#/components/schemas/" + p + "_keys"}
+                            for p in self.proplists
+                        ]
+                    },
+                    "row": {
+                        "anyOf": [
+                            {"$ref": "#/components/schemas/" + p}
+                            for p in self.proplists
+                        ]
+                    }
+                },
+                "required": ["primary_key", "property", "keys"]
+            }
+            events.append(self.watch_event(["row-upserted", "row-deleted"],
+                                           'watch-row'))
+        schemas['watch-event'] = {
+            "description": "fields of a server-sent event",
+            "oneOf": events
+        }
+        components['parameters']['LastEventId'] = {
+            "name": "Last-Event-ID",
+            "in": "header",
+            "required": False,
+            "description": "resume the stream after this event id",
+            "schema": {
+                "type": "string"
+            }
+        }
+        responses = copy.deepcopy(utils.generate_default_response())
+        responses['200'] = {
+            "description": "Stream of change events",
+            "content": {
+                utils.EVENT_STREAM_CONTENT: {
+                    "schema": {
+                        "$ref": "#/components/schemas/watch-event"
+                    }
+                }
+            }
+        }
+        lastevent = {"$ref": "#/components/parameters/LastEventId"}
+        self.openapi['paths']['/' + name + ':watch'] = {
+            'get': {
+                'tags': [name],
+                'description': "Watch the changes of all the resources",
+                'operationId': name + '_watch_' + self.version,
+                'parameters': [lastevent],
+                'responses': responses
+            }
+        }
+        self.openapi['paths']['/' + name + '/{primary_key}:watch'] = {
+            'get': {
+                'tags': [name],
+                'description': 'Watch the changes of a {0}'.format(name),
+                'operationId': name + '_pk_watch_' + self.version,
+                'parameters': [
+                    {"$ref": "#/components/parameters/PrimaryKeyParm"},
+                    lastevent
+                ],
+                'responses': copy.deepcopy(responses)
+            }
+        }
+
     def add_pkpath(self):
         """
         Add primary key path to openapi spec v3
@@ -481,6 +898,12 @@ class VersionV3():
                 'responses': responses
             }
         }
+        if self.resourcedef.get('fields'):
+            openapiget['get']['parameters'] = (
+                parameters + [self.fields_parameter()])
+            responses["200"] = {
+                "$ref": "#/components/responses/Ok_partial"
+            }
         self.openapi['paths'][
             '/' + self.resourcedef['name'] + '/{primary_key}'][
                 'get'] = openapiget['get']
@@ -522,6 +945,270 @@ class VersionV3():
             '/' + self.resourcedef['name'] + '/{primary_key}'][
                 'put'] = openapicreate['put']
 
+    def add_batchpaths(self):
+        """
+        Add batch get/upsert/delete paths to openapi spec v3
+        when the resource schema enables batch
+        """
+        maxitems = utils.batch_maxitems(self.resourcedef, self.schemafile)
+        if maxitems is None:
+            return
+        if not maxitems:
+            self.error = 1
+            return
+        name = self.resourcedef['name']
+        keyschema = {"$ref": "#/components/schemas/primary_key"}
+        bodyschema = {"$ref": "#/components/schemas/" + name}
+        schemas = self.openapi['components']['schemas']
+        schemas['batch-keys'] = {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": maxitems,
+            "items": keyschema
+        }
+        upsertitem = {
+            "type": "object",
+            "properties": {
+                "primary_key": keyschema
+            },
+            "required": ["primary_key"],
+            "additionalProperties": False
+        }
+        if self.hasbody:
+            upsertitem['properties']['body'] = bodyschema
+            if self.bodyreq:
+                upsertitem['required'].append('body')
+        schemas['batch-items'] = {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": maxitems,
+            "items": upsertitem
+        }
+        statusitem = {
+            "type": "object",
+            "properties": {
+                "primary_key": keyschema,
+                "status": {
+                    "type": "integer"
+                },
+                "error": {
+                    "type": "string"
+                }
+            },
+            "required": ["primary_key", "status"]
+        }
+        if self.hasbody:
+            statusitem['properties']['body'] = bodyschema
+        schemas['batch-status'] = {
+            "type": "object",
+            "properties": {
+                "_elem": {
+                    "type": "array",
+                    "items": statusitem
+                }
+            },
+            "required": ["_elem"]
+        }
+        statusschema = {"$ref": "#/components/schemas/batch-status"}
+        self.openapi['components']['responses']['Ok_batch'] = {
+            "description": "Status of each item of the batch",
+            "content": {
+                self.yaml_content: {
+                    'schema': statusschema
+                },
+                self.json_content: {
+                    'schema': statusschema
+                }
+            }
+        }
+        self.openapi['components']['responses']['PayloadTooLarge'] = {
+            "description": "More than {0} items in batch".format(maxitems)
+        }
+        batchdefs = [
+            ('batchGet', 'get', 'get a batch of {0}', 'batch-keys'),
+            ('batchUpsert', 'upsert', 'create or replace a batch of {0}',
+             'batch-items'),
+            ('batchDelete', 'delete', 'delete a batch of {0}', 'batch-keys')
+        ]
+        for verb, opname, desc, reqschema in batchdefs:
+            newschema = {"$ref": "#/components/schemas/" + reqschema}
+            responses = copy.deepcopy(utils.generate_default_response())
+            responses["200"] = {
+                "$ref": "#/components/responses/Ok_batch"
+            }
+            responses["413"] = {
+                "$ref": "#/components/responses/PayloadTooLarge"
+            }
+            self.openapi['paths']['/' + name + ':' + verb] = {
+                'post': {
+                    'tags': [name],
+                    'description': desc.format(name),
+                    'operationId': (
+                        name + '_batch_' + opname + '_' + self.version
+                    ),
+                    'parameters': [],
+                    'requestBody': {
+                        "required": True,
+                        "content": {
+                            self.yaml_content: {
+                                "schema": newschema
+                            },
+                            self.json_content: {
+                                "schema": newschema
+                            }
+                        }
+                    },
+                    'responses': responses
+                }
+            }
+
+    def add_cache(self):
+        """
+        Add Cache-Control headers and x-cache extension
+        to get operations v3
+        """
+        options = utils.cache_options(self.resourcedef, self.schemafile)
+        if options is None:
+            self.error = 1
+            return
+        policy, overrides = options
+        suffix = '_' + self.version
+        unused = set(overrides)
+        responses = self.openapi['components']['responses']
+        for path in sorted(self.openapi['paths']):
+            operation = self.openapi['paths'][path].get('get')
+            if operation is None or '200' not in operation['responses']:
+                continue
+            opname = operation['operationId']
+            if opname.endswith(suffix):
+                opname = opname[:-len(suffix)]
+            response = operation['responses']['200']
+            if '$ref' in response:
+                response = responses[response['$ref'].rsplit('/', 1)[1]]
+            if utils.EVENT_STREAM_CONTENT in response.get('content', {}):
+                continue
+            unused.discard(opname)
+            effective = dict(policy)
+            effective.update(overrides.get(opname, {}))
+            control = utils.cache_control(effective, self.schemafile)
+            if control is None:
+                self.error = 1
+                return
+            response = copy.deepcopy(response)
+            response.setdefault('headers', dict())['Cache-Control'] = {
+                "description": "Cache policy of the response",
+                "schema": {
+                    "type": "string",
+                    "enum": [control]
+                }
+            }
+            # responses dicts are shared between operations
+            operation['responses'] = dict(operation['responses'])
+            operation['responses']['200'] = response
+            operation['x-cache'] = effective
+        if unused:
+            msg = 'cache operations %s are not get operations in %s'
+            _LOG.error(msg, sorted(unused), self.schemafile)
+            self.error = 1
+
+    def add_mediatypes(self):
+        """
+        Add the media types of the mediatypes option,
+        eg [msgpack, cbor], to every content block v3
+        """
+        suffixes = self.resourcedef.get('mediatypes')
+        if not suffixes:
+            return
+        if not isinstance(suffixes, list) or not all(
+                isinstance(m, str) and _MEDIATYPE_SUFFIX.match(m)
+                for m in suffixes):
+            msg = 'mediatypes should be a list of suffixes like %s in %s'
+            _LOG.error(msg, ['msgpack', 'cbor'], self.schemafile)
+            self.error = 1
+            return
+        mediatypes = ['application/{0}+{1}'.format(self.mimetype, m)
+                      for m in suffixes]
+        blocks = list()
+        for pathitem in self.openapi['paths'].values():
+            for operation in pathitem.values():
+                blocks.append(operation.get('requestBody', {}))
+                blocks.extend(operation.get('responses', {}).values())
+        blocks.extend(self.openapi['components'].get(
+            'responses', {}).values())
+        for block in blocks:
+            content = block.get('content', {})
+            if self.json_content not in content:
+                continue
+            for mediatype in mediatypes:
+                if mediatype not in content:
+                    content[mediatype] = copy.deepcopy(
+                        content[self.json_content])
+
+    def add_conditional(self):
+        """
+        Add ETag headers, If-None-Match/If-Match parameters and
+        304/412 responses to primary key and nested property paths v3
+        """
+        components = self.openapi['components']
+        components.setdefault('headers', dict())['ETag'] = {
+            "description": "Entity tag of the current resource",
+            "schema": {
+                "type": "string"
+            }
+        }
+        etag = {"ETag": {"$ref": "#/components/headers/ETag"}}
+        components['parameters']['IfNoneMatch'] = {
+            "name": "If-None-Match",
+            "in": "header",
+            "required": False,
+            "description": "answer 304 if the resource has this ETag",
+            "schema": {
+                "type": "string"
+            }
+        }
+        components['parameters']['IfMatch'] = {
+            "name": "If-Match",
+            "in": "header",
+            "required": False,
+            "description": "answer 412 unless the resource has this ETag",
+            "schema": {
+                "type": "string"
+            }
+        }
+        for name, response in components['responses'].items():
+            # rows and row of propertylists and arrays, see add_collectionget
+            if name in ['Ok', 'Created', 'Ok_partial'] or \
+                    name.startswith(('Ok_rows-', 'Ok_row-')):
+                response['headers'] = etag
+        components['responses']['NotModified'] = {
+            "description": "Not Modified",
+            "headers": etag
+        }
+        components['responses']['PreconditionFailed'] = {
+            "description": "Precondition Failed"
+        }
+        pkpath = '/' + self.resourcedef['name'] + '/{primary_key}'
+        for path, pathitem in self.openapi['paths'].items():
+            if path != pkpath and not path.startswith(pkpath + '/'):
+                continue
+            for method, operation in pathitem.items():
+                if method == 'get':
+                    parameter, status, response = (
+                        'IfNoneMatch', '304', 'NotModified')
+                elif method in ['put', 'delete', 'patch']:
+                    parameter, status, response = (
+                        'IfMatch', '412', 'PreconditionFailed')
+                else:
+                    continue
+                # parameters and responses are shared between operations
+                operation['parameters'] = operation['parameters'] + [{
+                    "$ref": "#/components/parameters/" + parameter
+                }]
+                operation['responses'] = dict(operation['responses'])
+                operation['responses'][status] = {
+                    "$ref": "#/components/responses/" + response
+                }
+
     def add_extrapaths(self):
         """
         Add extended paths v3
@@ -680,35 +1367,15 @@ class VersionV3():
         # patch
         openapimutablehash['description'] = (
             "bulk insert/remove part of resource")
-        openapimutablehash['operationId'] = operationid + '_patch'
-        oplist = ["insert", "remove"]
-        jsonpatchdoc = {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "op": {
-                        "type": "string",
-                        "enum": oplist
-                    },
-                    "value": replaceschema
-                }
-            }
-        }
-        reqbody = {
-            "required": True,
-            "content": {
-                self.yaml_content: {
-                    "schema": jsonpatchdoc
-                },
-                self.json_content: {
-                    "schema": jsonpatchdoc
-                }
-            }
-        }
-        openapimutablehash['requestBody'] = reqbody
-        # self.openapi['paths'][replacepath][
-        #    'patch'] = copy.deepcopy(openapimutablehash)
+        openapimutablehash['operationId'] = (
+            operationid +
+            '_patch_' +
+            self.version
+        )
+        self.add_bulkpatch(replacepath,
+                           openapimutablehash,
+                           replaceschema,
+                           {"type": "array", "items": removeschema})
 
     # R0915: Too many statements (51/50)
     # pylint: disable=R0915
@@ -733,6 +1400,8 @@ class VersionV3():
         if itemval == 1:
             self.error = 1
             return
+        if propname not in self.proplists:
+            self.proplists.append(propname)
         value = utils.jsonschema_compat(itemval)
         value.pop('key', None)
         items = {"type": "object", "required": keys, "properties": {}}
@@ -868,35 +1537,23 @@ class VersionV3():
             'put'] = copy.deepcopy(openapiproplist)
         # patch
         openapiproplist['description'] = "bulk insert/remove part of resource"
-        openapiproplist['operationId'] = operationid + '_patch'
-        oplist = ["insert", "remove"]
-        jsonpatchdoc = {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "op": {
-                        "type": "string",
-                        "enum": oplist
-                    },
-                    "value": newschema
-                }
-            }
-        }
-        reqbody = {
-            "required": True,
-            "content": {
-                self.yaml_content: {
-                    "schema": jsonpatchdoc
-                },
-                self.json_content: {
-                    "schema": jsonpatchdoc
-                }
-            }
-        }
-        openapiproplist['requestBody'] = reqbody
-        # self.openapi['paths'][replacepath][
-        #     'patch'] = copy.deepcopy(openapiproplist)
+        openapiproplist['operationId'] = (
+            operationid +
+            '_patch_' +
+            self.version
+        )
+        self.add_bulkpatch(replacepath,
+                           openapiproplist,
+                           newschema,
+                           proplist_schema)
+        self.add_collectionget(propname,
+                               operationid,
+                               tagname,
+                               replacepath,
+                               parameters,
+                               newpath,
+                               insertparameters + parameters,
+                               proplist_schema)
         for k in keys:
             if k not in itemval['properties']:
                 msg = '%s -- is not defined in the properties: %s and %r'
@@ -1026,25 +1683,115 @@ class VersionV3():
 
         # patch
         openapiarray['description'] = "bulk insert/remove part of resource"
-        openapiarray['operationId'] = operationid + '_patch'
-        oplist = ["insert", "remove"]
+        openapiarray['operationId'] = (
+            operationid +
+            '_patch_' +
+            self.version
+        )
         patchschema = {
             "$ref": "#/components/schemas/" + propname
         }
-        jsonpatchdoc = {
-            "type": "array",
-            "items": {
+        self.add_bulkpatch(replacepath,
+                           openapiarray,
+                           patchschema,
+                           patchschema)
+        self.add_collectionget(propname,
+                               operationid,
+                               tagname,
+                               replacepath,
+                               parameters,
+                               newpath,
+                               parameters + insertparameters,
+                               patchschema)
+
+    # R0913: Too many arguments
+    # pylint: disable=R0913
+    def add_collectionget(self, propname, operationid, tagname,
+                          path, parameters, keypath, keyparameters,
+                          keyschema):
+        """
+        Add paginated get of the rows of a propertylist or array
+        and get of a row by its keys v3
+        """
+        rowschema = {"$ref": "#/components/schemas/" + propname}
+        responses = self.openapi['components']['responses']
+        listresponse = copy.deepcopy(responses['Ok_all'])
+        for content in listresponse['content'].values():
+            properties = content['schema']['properties']
+            properties['_elem']['items'] = rowschema
+            if '_page' in properties:
+                properties['_page']['properties']['last_key'] = keyschema
+        responses['Ok_rows-' + propname] = listresponse
+        responses['Ok_row-' + propname] = {
+            "description": "OK",
+            "content": {
+                self.yaml_content: {
+                    'schema': rowschema
+                },
+                self.json_content: {
+                    'schema': rowschema
+                }
+            }
+        }
+        getresponses = copy.deepcopy(utils.generate_default_response())
+        getresponses['200'] = {
+            "$ref": "#/components/responses/Ok_rows-" + propname
+        }
+        self.openapi['paths'][path]['get'] = {
+            'tags': [tagname],
+            'description': 'get {0} of a {1}'.format(
+                propname, self.resourcedef['name']),
+            'operationId': operationid + '_get_' + self.version,
+            'parameters': parameters + [
+                {"$ref": "#/components/parameters/Pagination_limit"},
+                {"$ref": "#/components/parameters/Pagination_cursor"}
+            ],
+            'responses': getresponses
+        }
+        getresponses = copy.deepcopy(getresponses)
+        getresponses['200'] = {
+            "$ref": "#/components/responses/Ok_row-" + propname
+        }
+        self.openapi['paths'][keypath]['get'] = {
+            'tags': [tagname],
+            'description': 'get {0} of a {1} by key'.format(
+                propname, self.resourcedef['name']),
+            'operationId': (operationid + '_' + propname[:3] + '_get_' +
+                            self.version),
+            'parameters': list(keyparameters),
+            'responses': getresponses
+        }
+
+    def add_bulkpatch(self, path, operation, insertschema, removeschema):
+        """
+        Add bulk insert/remove patch operation to a collection path
+        when the resource schema enables bulkpatch v3
+        """
+        if not self.resourcedef.get('bulkpatch'):
+            return
+        patchops = list()
+        for opname, valueschema in [('insert', insertschema),
+                                    ('remove', removeschema)]:
+            patchops.append({
                 "type": "object",
                 "properties": {
                     "op": {
                         "type": "string",
-                        "enum": oplist
+                        "enum": [opname]
                     },
-                    "value": patchschema
-                }
+                    "value": valueschema
+                },
+                "required": ["op", "value"],
+                "additionalProperties": False
+            })
+        jsonpatchdoc = {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "oneOf": patchops
             }
         }
-        reqbody = {
+        operation['requestBody'] = {
             "required": True,
             "content": {
                 self.yaml_content: {
@@ -1055,9 +1802,7 @@ class VersionV3():
                 }
             }
         }
-        openapiarray['requestBody'] = reqbody
-        # self.openapi['paths'][replacepath][
-        #    'patch'] = copy.deepcopy(openapiarray)
+        self.openapi['paths'][path]['patch'] = copy.deepcopy(operation)
 
     # R0912: Too many branches (14/12)
     # pylint: disable=R0912
@@ -1286,6 +2031,8 @@ class VersionV3():
             basepath = '/' + self.resourcedef['name']
             for rpcdef in self.resourcedef['rpc']:
                 self.addrpcdef(rpcdef, tags, basepath)
+            if self.asyncrpc:
+                self.add_operationpaths(tags, basepath)
         return error_flag
 
     def addrpcdef(self, rpcdef, tags, basepath):
@@ -1340,6 +2087,11 @@ class VersionV3():
             }
             responses.update(copy.deepcopy(
                 utils.generate_create_response()))
+            if val.get('async'):
+                self.asyncrpc[verb] = rpcresponse
+                responses['202'] = {
+                    "$ref": "#/components/responses/OperationAccepted"
+                }
             rpcpost = {
                 'tags': tags,
                 'description': desc,
@@ -1351,17 +2103,142 @@ class VersionV3():
                 rpcpost['requestBody'] = reqbody
             self.openapi['paths'][newpath] = {'post': rpcpost}
 
+    def add_operationpaths(self, tags, basepath):
+        """
+        Add operations sub-resource polled by clients
+        of async rpc verbs v3
+        """
+        components = self.openapi['components']
+        headers = components.setdefault('headers', dict())
+        headers['Location'] = {
+            "description": "URL of the operation status",
+            "schema": {
+                "type": "string"
+            }
+        }
+        headers['Retry-After'] = {
+            "description": "Seconds to wait before polling the operation",
+            "schema": {
+                "type": "integer",
+                "minimum": 0
+            }
+        }
+        results = list()
+        for verb in sorted(self.asyncrpc):
+            components['schemas']['operation-result-' + verb] = (
+                self.asyncrpc[verb])
+            results.append({
+                "$ref": "#/components/schemas/operation-result-" + verb
+            })
+        components['schemas']['operation-status'] = {
+            "type": "object",
+            "properties": {
+                "op_id": {
+                    "type": "string"
+                },
+                "verb": {
+                    "type": "string",
+                    "enum": sorted(self.asyncrpc)
+                },
+                "state": {
+                    "type": "string",
+                    "enum": [
+                        "pending", "running", "succeeded",
+                        "failed", "cancelled"
+                    ]
+                },
+                "progress": {
+                    "type": "number",
+                    "minimum": 0,
+                    "maximum": 100
+                },
+                "result": {
+                    "anyOf": results
+                },
+                "error": {
+                    "type": "object",
+                    "properties": {
+                        "code": {
+                            "type": "integer"
+                        },
+                        "message": {
+                            "type": "string"
+                        }
+                    }
+                }
+            },
+            "required": ["op_id", "verb", "state"]
+        }
+        statusschema = {"$ref": "#/components/schemas/operation-status"}
+        statuscontent = {
+            self.yaml_content: {
+                'schema': statusschema
+            },
+            self.json_content: {
+                'schema': statusschema
+            }
+        }
+        components['responses']['OperationAccepted'] = {
+            "description": "Accepted, poll the operation at Location",
+            "headers": {
+                "Location": {"$ref": "#/components/headers/Location"},
+                "Retry-After": {"$ref": "#/components/headers/Retry-After"}
+            },
+            "content": statuscontent
+        }
+        components['responses']['OperationStatus'] = {
+            "description": "Status of the operation",
+            "headers": {
+                "Retry-After": {"$ref": "#/components/headers/Retry-After"}
+            },
+            "content": copy.deepcopy(statuscontent)
+        }
+        parameters = [{
+            "name": "op_id",
+            "in": "path",
+            "required": True,
+            "schema": {
+                "type": "string"
+            }
+        }]
+        components.setdefault('parameters', dict())[
+            'OperationIdParm'] = parameters[0]
+        responses = copy.deepcopy(utils.generate_default_response())
+        responses['200'] = {
+            "$ref": "#/components/responses/OperationStatus"
+        }
+        self.openapi['paths'][basepath + '/operations/{op_id}'] = {
+            'get': {
+                'tags': tags,
+                'description': 'get status of an rpc operation',
+                'operationId': 'rpc_operation_get_' + self.version,
+                'parameters': parameters,
+                'responses': responses
+            }
+        }
+        responses = copy.deepcopy(responses)
+        responses['409'] = {
+            "$ref": "#/components/responses/Conflict"
+        }
+        self.openapi['paths'][basepath + '/operations/{op_id}:cancel'] = {
+            'post': {
+                'tags': tags,
+                'description': 'cancel an rpc operation',
+                'operationId': 'rpc_operation_cancel_' + self.version,
+                'parameters': parameters,
+                'responses': responses
+            }
+        }
+
     def write(self):
         """
-        Write openapi spec to output file v3
+        Write openapi spec to output file v3,
+        the spec is validated by openapiconverter.emit_spec
         """
         # W0603(global-statement
         # pylint: disable=W0603
         if self.error:
             return
-        if utils.validate_schema(self.openapi, self.schemafile):
-            self.error = 1
-            return
         if self.outfmt == 'yaml':
             with open(self.specfile, 'w') as outfile:
                 yaml.dump(self.openapi, outfile, default_flow_style=False)
@@ -0,0 +1,129 @@
+"""
+Registry of spec generator classes by major version.
+Generators are registered explicitly, from the resourcemodel.generators
+entry point group or from a module file. Loaded classes are cached per
+process, so building many resources or running in worker processes
+loads each plugin once
+"""
+import importlib.util
+import logging
+import os
+import re
+import sys
+import zlib
+
+from . import openapiv3
+
+try:
+    from importlib import metadata
+except ImportError:  # pragma: no cover
+    metadata = None
+
+_LOG = logging.getLogger(__name__)
+ENTRY_POINT_GROUP = 'resourcemodel.generators'
+# major version -> generator class
+_REGISTRY = dict()
+# absolute module file -> module
+_MODULES = dict()
+_STATE = {'entry_points': False}
+_LEGACY_MODULE = re.compile(r'^openapi(v[0-9]+)$')
+
+
+def register(specclass, versions=None):
+    """
+    Register generator class for versions,
+    by default the versions of its VERSIONS attribute
+    """
+    if versions is None:
+        versions = getattr(specclass, 'VERSIONS', None)
+    if not versions:
+        raise ValueError(
+            '{0} does not declare VERSIONS'.format(specclass.__name__))
+    for version in versions:
+        current = _REGISTRY.get(version)
+        if current is not None and current is not specclass:
+            _LOG.info('%s replaces %s for %s',
+                      specclass.__name__, current.__name__, version)
+        _REGISTRY[version] = specclass
+    return specclass
+
+
+def registered():
+    """
+    Registered versions and their generator classes
+    """
+    return dict(_REGISTRY)
+
+
+def load_entry_points():
+    """
+    Register generators of the resourcemodel.generators
+    entry points once per process
+    """
+    if _STATE['entry_points'] or metadata is None:
+        return
+    _STATE['entry_points'] = True
+    entrypoints = metadata.entry_points()
+    if hasattr(entrypoints, 'select'):
+        entrypoints = entrypoints.select(group=ENTRY_POINT_GROUP)
+    else:  # pragma: no cover
+        entrypoints = entrypoints.get(ENTRY_POINT_GROUP, [])
+    for entrypoint in entrypoints:
+        try:
+            register(entrypoint.load())
+        except (ImportError, AttributeError, ValueError) as err:
+            _LOG.error('%s -- can not load generator plugin: %s',
+                       entrypoint.name, err)
+
+
+def load_module(modulefile):
+    """
+    Load module file once and register its generator classes,
+    classes declaring VERSIONS or VersionVN of an openapivN.py file
+    """
+    modulefile = os.path.abspath(modulefile)
+    if modulefile in _MODULES:
+        return _MODULES[modulefile]
+    basename = os.path.splitext(os.path.basename(modulefile))[0]
+    # unique name so classes of the module can be pickled
+    modulename = 'resourcemodel_plugin_{0}_{1:x}'.format(
+        re.sub(r'\W', '_', basename), zlib.crc32(modulefile.encode()))
+    modulespec = importlib.util.spec_from_file_location(modulename,
+                                                        modulefile)
+    if modulespec is None:
+        raise ImportError('{0} is not a python module'.format(modulefile))
+    module = importlib.util.module_from_spec(modulespec)
+    sys.modules[modulename] = module
+    try:
+        modulespec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[modulename]
+        raise
+    _MODULES[modulefile] = module
+    found = False
+    for value in list(vars(module).values()):
+        if isinstance(value, type) and getattr(value, 'VERSIONS', None) \
+                and value.__module__ == modulename:
+            register(value)
+            found = True
+    result = _LEGACY_MODULE.match(basename)
+    if not found and result:
+        version = result.groups()[0]
+        specclass = getattr(module, 'Version' + version.upper(), None)
+        if specclass is not None:
+            register(specclass, [version])
+    return module
+
+
+def get_generator(major_version, modulefile=None):
+    """
+    Generator class of major version, None if no plugin handles it
+    """
+    if modulefile:
+        load_module(modulefile)
+    if major_version not in _REGISTRY:
+        load_entry_points()
+    return _REGISTRY.get(major_version)
+
+
+register(openapiv3.VersionV3)
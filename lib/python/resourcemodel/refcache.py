@@ -0,0 +1,296 @@
+"""
+Cache of http and https references of resource schemas.
+Fetched documents are kept on disk and revalidated with their ETag
+once older than the ttl. In offline mode references are only served
+from the cache, the vendor command fills the cache beforehand
+"""
+import concurrent.futures
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import yaml
+from . import utils
+
+_LOG = logging.getLogger(__name__)
+CACHE_ENV = 'RESOURCEMODEL_REF_CACHE'
+DEFAULT_TTL = 3600
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONCURRENCY = 4
+ACCEPT = 'application/json, application/yaml;q=0.9, */*;q=0.1'
+_CACHE = None
+
+
+class RefCacheError(Exception):
+    """
+    Reference which can not be fetched,
+    or is not cached in offline mode
+    """
+
+
+class RefCache():
+    """
+    On disk cache of remote references in cachedir. At most
+    concurrency requests are made at a time, each with a timeout
+    """
+    # R0913: Too many arguments
+    # pylint: disable=R0913
+    def __init__(self, cachedir=None, ttl=DEFAULT_TTL, offline=False,
+                 timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY):
+        self.cachedir = cachedir or default_cachedir()
+        self.ttl = ttl
+        self.offline = offline
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._documents = dict()
+
+    def settings(self):
+        """
+        Arguments of configure to set up an equal cache,
+        eg in worker processes
+        """
+        return {'cachedir': self.cachedir,
+                'ttl': self.ttl,
+                'offline': self.offline,
+                'timeout': self.timeout,
+                'concurrency': self.concurrency}
+
+    def _files(self, url):
+        """
+        Metadata and content files of url
+        """
+        key = os.path.join(self.cachedir,
+                           hashlib.sha1(url.encode('utf-8')).hexdigest())
+        return key + '.json', key + '.body'
+
+    def cached(self, url):
+        """
+        (metadata, content) of url, None if not cached
+        """
+        metafile, bodyfile = self._files(url)
+        try:
+            with open(metafile) as fh:
+                meta = json.load(fh)
+            with open(bodyfile, 'rb') as fh:
+                content = fh.read()
+        except (OSError, ValueError) as _:
+            return None
+        return meta, content
+
+    def store(self, url, content, etag=None):
+        """
+        Cache content of url
+        """
+        metafile, bodyfile = self._files(url)
+        os.makedirs(self.cachedir, exist_ok=True)
+        meta = {'url': url, 'etag': etag, 'fetched': time.time()}
+        _write(bodyfile, content)
+        _write(metafile, json.dumps(meta, indent=4,
+                                    sort_keys=True).encode('utf-8'))
+
+    def fetch(self, url, refresh=False):
+        """
+        Content of url, from the cache if fetched within ttl.
+        refresh revalidates cached content whatever its age
+        """
+        url = urldefrag(url)[0]
+        cached = self.cached(url)
+        if cached and not refresh and \
+                (self.offline or
+                 time.time() - cached[0]['fetched'] < self.ttl):
+            return cached[1]
+        if self.offline:
+            raise RefCacheError('{0} is not cached, vendor it or run '
+                                'without offline mode'.format(url))
+        headers = {'Accept': ACCEPT}
+        if cached and cached[0].get('etag'):
+            headers['If-None-Match'] = cached[0]['etag']
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with self._semaphore:
+                with urllib.request.urlopen(request,
+                                            timeout=self.timeout) as resp:
+                    content = resp.read()
+                    etag = resp.headers.get('ETag')
+        except urllib.error.HTTPError as err:
+            if err.code == 304 and cached:
+                self.store(url, cached[1], cached[0].get('etag'))
+                return cached[1]
+            raise RefCacheError('{0}: {1}'.format(url, err)) from err
+        except (urllib.error.URLError, OSError) as err:
+            if cached:
+                _LOG.warning('%s -- using stale cache, %s', url, err)
+                return cached[1]
+            raise RefCacheError('{0}: {1}'.format(url, err)) from err
+        self.store(url, content, etag)
+        return content
+
+    def document(self, url, refresh=False):
+        """
+        Parsed json or yaml document of url, parsed once per process.
+        Callers get their own copy to modify
+        """
+        url = urldefrag(url)[0]
+        if refresh or url not in self._documents:
+            content = self.fetch(url, refresh)
+            self._documents[url] = utils.parse_spec(content.decode('utf-8'))
+        return copy.deepcopy(self._documents[url])
+
+    def handler(self, uri):
+        """
+        RefResolver handler of http and https references
+        """
+        return self.document(uri)
+
+    def vendor(self, urls):
+        """
+        Fetch urls and the remote references in them into the cache,
+        returns the vendored and the failed urls
+        """
+        vendored = list()
+        failed = list()
+        seen = set(urldefrag(url)[0] for url in urls)
+        pending = sorted(seen)
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency) as pool:
+            while pending:
+                futures = [(url, pool.submit(self.document, url, True))
+                           for url in pending]
+                pending = list()
+                for url, future in futures:
+                    try:
+                        document = future.result()
+                    except (RefCacheError, ValueError,
+                            yaml.YAMLError) as err:
+                        _LOG.error('%s -- can not vendor, %s', url, err)
+                        failed.append(url)
+                        continue
+                    vendored.append(url)
+                    for ref in remote_refs(document, url):
+                        if ref not in seen:
+                            seen.add(ref)
+                            pending.append(ref)
+        return vendored, failed
+
+
+def _write(filename, content):
+    """
+    Write a file atomically
+    """
+    tmpfile = '{0}.{1}.{2}.tmp'.format(filename, os.getpid(),
+                                       threading.get_ident())
+    with open(tmpfile, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmpfile, filename)
+
+
+def remote_refs(document, base=None):
+    """
+    http and https urls referenced in document, relative references
+    are resolved against base, the url of the document
+    """
+    refs = set()
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str):
+                url = urldefrag(urljoin(base, ref) if base else ref)[0]
+                if urlparse(url).scheme in ['http', 'https']:
+                    refs.add(url)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return sorted(refs)
+
+
+def default_cachedir():
+    """
+    Cache directory from environment or in the user cache
+    """
+    if os.environ.get(CACHE_ENV):
+        return os.environ[CACHE_ENV]
+    return os.path.join(os.path.expanduser('~'), '.cache',
+                        'resourcemodel', 'refs')
+
+
+def configure(cachedir=None, ttl=DEFAULT_TTL, offline=False,
+              timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Set the cache used by the reference handlers
+    """
+    # R0913: Too many arguments
+    # pylint: disable=R0913
+    # W0603(global-statement
+    # pylint: disable=W0603
+    global _CACHE
+    _CACHE = RefCache(cachedir, ttl, offline, timeout, concurrency)
+    return _CACHE
+
+
+def get_cache():
+    """
+    Cache used by the reference handlers
+    """
+    if _CACHE is None:
+        configure()
+    return _CACHE
+
+
+def handlers():
+    """
+    RefResolver handlers of file references and cached
+    http and https references
+    """
+    cache = get_cache()
+    return {'file': utils.yaml_handler,
+            'http': cache.handler,
+            'https': cache.handler}
+
+
+def schema_files(basedir, lones=None):
+    """
+    Resource schemas of lones, all if None,
+    and the common schemas of the family in basedir
+    """
+    schemadir = os.path.join(basedir, 'apischemas', 'rschemas')
+    if lones is None:
+        lones = sorted(name for name in os.listdir(schemadir)
+                       if os.path.isfile(os.path.join(schemadir, name)))
+    files = [os.path.join(schemadir, lone) for lone in lones]
+    for root, _, names in os.walk(os.path.join(schemadir, 'common')):
+        files.extend(os.path.join(root, name) for name in sorted(names))
+    return files
+
+
+def main(args):
+    """
+    Main function of vendor command
+    """
+    cache = get_cache()
+    if cache.offline:
+        sys.exit('vendor fetches references, run without --offline')
+    urls = list(args.urls)
+    if args.basedir:
+        lones = args.lones.split(',') if args.lones else None
+        for schemafile in schema_files(args.basedir, lones):
+            try:
+                urls.extend(remote_refs(utils.load_yaml_file(schemafile)))
+            except (OSError, yaml.YAMLError) as err:
+                sys.exit('Error in {0}: {1}'.format(schemafile, err))
+    if not urls:
+        _LOG.info('No http references to vendor')
+        return
+    vendored, failed = cache.vendor(urls)
+    _LOG.info('Vendored %d references to %s', len(vendored), cache.cachedir)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,219 @@
+"""
+Compiled route-matching index for generated openapi paths
+"""
+import gzip
+import json
+import logging
+import os
+
+from . import utils
+
+_LOG = logging.getLogger(__name__)
+ROUTES_FORMAT_VERSION = 1
+# node layout: [static children, templated children, methods]
+_STATIC = 0
+_TEMPLATED = 1
+_METHODS = 2
+
+
+def _new_node():
+    """
+    Empty trie node
+    """
+    return [dict(), list(), dict()]
+
+
+def _split(path):
+    """
+    Split path into segments
+    """
+    return path.strip('/').split('/')
+
+
+def parse_segment(segment):
+    """
+    Return (name, suffix) of a templated segment
+    {primary_key} or {op_id}:cancel, None for static segments
+    """
+    if not segment.startswith('{'):
+        return None
+    end = segment.find('}')
+    if end < 0:
+        return None
+    return segment[1:end], segment[end + 1:]
+
+
+class Router():
+    """
+    Trie of path segments with O(path length) lookup.
+    Static segments are dict lookups, templated segments
+    capture the segment without an optional :verb suffix
+    """
+    def __init__(self, routes=None, trie=None):
+        """
+        Initialize router, routes are
+        [operationId, method, path template, spec]
+        """
+        self.routes = routes if routes is not None else list()
+        self.trie = trie if trie is not None else _new_node()
+
+    def add(self, path, method, operationid, spec=''):
+        """
+        Add operation for path template
+        """
+        node = self.trie
+        for segment in _split(path):
+            template = parse_segment(segment)
+            if template is None:
+                node = node[_STATIC].setdefault(segment, _new_node())
+                continue
+            name, suffix = template
+            for child in node[_TEMPLATED]:
+                if child[0] == suffix and child[1] == name:
+                    node = child[2]
+                    break
+            else:
+                child = [suffix, name, _new_node()]
+                node[_TEMPLATED].append(child)
+                # longest suffix is tried first
+                node[_TEMPLATED].sort(key=lambda c: -len(c[0]))
+                node = child[2]
+        node[_METHODS][method.upper()] = len(self.routes)
+        self.routes.append([operationid, method.upper(), path, spec])
+
+    def add_spec(self, spec, specname='', prefix=True):
+        """
+        Add all operations of a generated spec
+        """
+        base = ''
+        servers = spec.get('servers')
+        if prefix and servers:
+            base = servers[0]['url'].rstrip('/')
+        for path, pathitem in spec.get('paths', {}).items():
+            for method, operation in pathitem.items():
+                if method in utils.HTTP_METHODS:
+                    self.add(base + path,
+                             method,
+                             operation.get('operationId'),
+                             specname)
+
+    def lookup(self, path, method=None):
+        """
+        Return methods of path keyed by http method and
+        path parameters, (None, None) for unknown paths.
+        With method only paths supporting it are matched
+        """
+        params = dict()
+        node = _lookup(self.trie, _split(path), 0, params, method)
+        if node is None:
+            return None, None
+        return node[_METHODS], params
+
+    def match(self, method, path):
+        """
+        Return route and path parameters of a request,
+        (None, None) if path or method is unknown
+        """
+        methods, params = self.lookup(path, method)
+        if methods is None:
+            return None, None
+        return self.routes[methods[method]], params
+
+    def dump(self, filename):
+        """
+        Write compact route file, gzip compressed for .gz files
+        """
+        content = json.dumps({'version': ROUTES_FORMAT_VERSION,
+                              'routes': self.routes,
+                              'trie': self.trie},
+                             separators=(',', ':'))
+        if filename.endswith('.gz'):
+            with gzip.open(filename, 'wb') as outfile:
+                outfile.write(content.encode('utf-8'))
+        else:
+            with open(filename, 'w') as outfile:
+                outfile.write(content)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load compiled route file
+        """
+        if filename.endswith('.gz'):
+            with gzip.open(filename, 'rb') as infile:
+                content = json.loads(infile.read().decode('utf-8'))
+        else:
+            with open(filename) as infile:
+                content = json.load(infile)
+        if content.get('version') != ROUTES_FORMAT_VERSION:
+            raise ValueError(
+                'Unsupported routes format in {0}'.format(filename))
+        return cls(content['routes'], content['trie'])
+
+
+def _lookup(node, segments, index, params, method):
+    """
+    Walk the trie, static segments win over templated ones
+    """
+    if index == len(segments):
+        if method is None:
+            return node if node[_METHODS] else None
+        return node if method in node[_METHODS] else None
+    segment = segments[index]
+    child = node[_STATIC].get(segment)
+    if child is not None:
+        found = _lookup(child, segments, index + 1, params, method)
+        if found is not None:
+            return found
+    for suffix, name, child in node[_TEMPLATED]:
+        if suffix:
+            if not segment.endswith(suffix):
+                continue
+            value = segment[:-len(suffix)]
+        else:
+            value = segment
+        if not value:
+            continue
+        found = _lookup(child, segments, index + 1, params, method)
+        if found is not None:
+            params[name] = value
+            return found
+    return None
+
+
+def compile_specs(specfiles, prefix=True):
+    """
+    Compile router from spec files
+    """
+    router = Router()
+    for specfile in specfiles:
+        router.add_spec(utils.load_spec(specfile),
+                        os.path.basename(specfile),
+                        prefix)
+    return router
+
+
+def expand_specs(paths):
+    """
+    Spec files of files and openapi directories
+    """
+    specfiles = list()
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.isfile(os.path.join(path, name)):
+                    specfiles.append(os.path.join(path, name))
+        else:
+            specfiles.append(path)
+    return specfiles
+
+
+def main(args):
+    """
+    Main function of routes command
+    """
+    specfiles = expand_specs(args.specs)
+    router = compile_specs(specfiles, not args.noprefix)
+    router.dump(args.output)
+    _LOG.info('Compiled %d routes of %d specs to %s',
+              len(router.routes), len(specfiles), args.output)
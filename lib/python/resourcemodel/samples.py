@@ -0,0 +1,375 @@
+"""
+Generate schema-valid sample values from generated openapi spec schemas
+"""
+import datetime
+import logging
+import random
+import re
+import string
+try:
+    # parser of the re module, moved from sre_parse in 3.11
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse  # pylint: disable=W4901
+
+_LOG = logging.getLogger(__name__)
+FORMATS = {
+    'date-time': '2019-01-01T00:00:00Z',
+    'date': '2019-01-01',
+    'email': 'user@example.com',
+    'hostname': 'host.example.com',
+    'ipv4': '10.0.0.1',
+    'ipv6': '::1',
+    'uri': 'http://example.com/'
+}
+# values of formats unique per index, used for keys
+FORMAT_KEYS = {
+    'date-time': lambda index: (
+        datetime.datetime(2019, 1, 1) +
+        datetime.timedelta(seconds=index)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    'date': lambda index: (
+        datetime.date(2019, 1, 1) +
+        datetime.timedelta(days=index)).isoformat(),
+    'email': 'user{0}@example.com'.format,
+    'hostname': 'host{0}.example.com'.format,
+    'ipv4': lambda index: '10.{0}.{1}.{2}'.format(
+        (index >> 16) & 0xff, (index >> 8) & 0xff, index & 0xff),
+    'ipv6': lambda index: 'fd00::{0:x}:{1:x}'.format(
+        (index >> 16) & 0xffff, index & 0xffff),
+    'uri': 'http://example.com/key{0}'.format
+}
+
+
+class SampleGenerator():
+    """
+    Sample values for jsonschemas of a spec,
+    references are resolved with the spec validators
+    """
+    def __init__(self, specvalidators, seed=None,
+                 optional_rate=1.0, maxdepth=6):
+        """
+        Initialize generator.
+        optional_rate is the probability an optional property is set
+        """
+        self.specvalidators = specvalidators
+        self.random = random.Random(seed)
+        self.optional_rate = optional_rate
+        self.maxdepth = maxdepth
+
+    def resolve(self, schema):
+        """
+        Follow $ref until a schema definition
+        """
+        while isinstance(schema, dict) and '$ref' in schema:
+            ref = schema['$ref']
+            if ref.startswith('#/'):
+                schema = self.specvalidators.resolve_pointer(ref)
+            else:
+                schema = self.specvalidators.resolver.resolve(ref)[1]
+        return schema
+
+    def sample(self, schema, depth=0):
+        """
+        Random value valid against schema
+        """
+        # R0911: Too many return statements
+        # R0912: Too many branches
+        # pylint: disable=R0911,R0912
+        schema = self.resolve(schema)
+        if not isinstance(schema, dict):
+            return None
+        if 'example' in schema:
+            return schema['example']
+        if 'default' in schema:
+            return schema['default']
+        if 'enum' in schema:
+            return self.random.choice(schema['enum'])
+        if 'allOf' in schema:
+            value = dict()
+            for subschema in schema['allOf']:
+                part = self.sample(subschema, depth)
+                if not isinstance(part, dict):
+                    return part
+                value.update(part)
+            return value
+        for keyword in ['oneOf', 'anyOf']:
+            if keyword in schema:
+                return self.sample(schema[keyword][0], depth)
+        stype = schema.get('type')
+        if isinstance(stype, list):
+            stype = stype[0]
+        if stype is None:
+            stype = 'object' if 'properties' in schema else 'string'
+        if stype == 'object':
+            return self.sample_object(schema, depth)
+        if stype == 'array':
+            if depth >= self.maxdepth:
+                return []
+            low = schema.get('minItems', 1)
+            high = max(low, min(schema.get('maxItems', 3), low + 2))
+            count = self.random.randint(low, high)
+            items = schema.get('items', {})
+            return [self.sample(items, depth + 1) for _ in range(count)]
+        if stype == 'integer':
+            low, high = bounds(schema, 0, 1000)
+            return self.random.randint(int(low), int(high))
+        if stype == 'number':
+            low, high = bounds(schema, 0.0, 1000.0)
+            return self.random.uniform(low, high)
+        if stype == 'boolean':
+            return self.random.random() < 0.5
+        if stype == 'null':
+            return None
+        return self.sample_string(schema)
+
+    def sample_object(self, schema, depth):
+        """
+        Random object with required and some optional properties
+        """
+        value = dict()
+        required = schema.get('required', [])
+        for propname, propschema in schema.get('properties', {}).items():
+            if propname not in required:
+                if depth >= self.maxdepth:
+                    continue
+                if self.random.random() >= self.optional_rate:
+                    continue
+            value[propname] = self.sample(propschema, depth + 1)
+        return value
+
+    def sample_string(self, schema):
+        """
+        Random string respecting length and format
+        """
+        if schema.get('format') in FORMATS:
+            return FORMATS[schema['format']]
+        low = schema.get('minLength', 1)
+        high = max(low, min(schema.get('maxLength', low + 8), low + 8))
+        if 'pattern' in schema:
+            value = sample_pattern(schema['pattern'], self.random,
+                                   schema.get('minLength', 0),
+                                   schema.get('maxLength'))
+            if value is not None:
+                return value
+        length = self.random.randint(low, high)
+        return ''.join(self.random.choice(string.ascii_lowercase)
+                       for _ in range(length))
+
+    def sample_key(self, schema, index):
+        """
+        Deterministic value unique per index, used for keys
+        """
+        return key_value(schema, index, self.resolve)
+
+
+def key_value(schema, index, resolve=None):
+    """
+    Deterministic value unique per index, used for keys.
+    resolve follows the references of schema
+    """
+    # R0911: Too many return statements
+    # pylint: disable=R0911
+    if resolve is not None:
+        schema = resolve(schema)
+    if 'enum' in schema:
+        return schema['enum'][index % len(schema['enum'])]
+    stype = schema.get('type')
+    if stype is None and 'properties' in schema:
+        stype = 'object'
+    if stype == 'object':
+        return dict((k, key_value(v, index, resolve))
+                    for k, v in schema.get('properties', {}).items())
+    if stype in ['integer', 'number']:
+        low, high = bounds(schema, 0, 0)
+        value = int(low) + index
+        if 'maximum' in schema:
+            value = int(low) + index % (int(high - low) + 1)
+        return value if stype == 'integer' else float(value)
+    if stype == 'boolean':
+        return bool(index % 2)
+    return string_key(schema, index)
+
+
+def string_key(schema, index):
+    """
+    String unique per index, following the format, pattern
+    and length of schema. Values of different indexes repeat
+    once the format, pattern or maxLength has no more values
+    """
+    if schema.get('format') in FORMAT_KEYS:
+        return FORMAT_KEYS[schema['format']](index)
+    minlength = schema.get('minLength', 0)
+    maxlength = schema.get('maxLength')
+    if 'pattern' in schema:
+        value = sample_pattern(schema['pattern'], IndexChoices(index),
+                               minlength, tries=1)
+        if value is not None and maxlength is not None:
+            value = value[:maxlength]
+            if not re.search(schema['pattern'], value):
+                value = None
+        if value is not None:
+            return value
+        _LOG.debug('%s -- no key of pattern', schema['pattern'])
+    value = 'key' + str(index).zfill(minlength - 3)
+    if maxlength is not None and len(value) > maxlength:
+        value = str(index).zfill(minlength)[-maxlength:]
+    return value
+
+
+class IndexChoices():
+    """
+    Stand-in of random.Random for sample_pattern whose choices are
+    the digits of index, so different indexes give different strings
+    """
+    def __init__(self, index):
+        """
+        Initialize choices of index
+        """
+        self.index = index
+
+    def digit(self, base):
+        """
+        Next digit of index in base
+        """
+        digit = self.index % base
+        self.index //= base
+        return digit
+
+    def choice(self, seq):
+        """
+        Item of seq
+        """
+        return seq[self.digit(len(seq))]
+
+    def randint(self, low, high):
+        """
+        Largest integer in [low, high], repeats take no digit
+        so all the digits of index go to characters
+        """
+        return max(low, high)
+
+
+# characters of sampled pattern classes and wildcards
+_ALPHABET = string.ascii_letters + string.digits + '_-. '
+_CATEGORIES = {
+    'CATEGORY_DIGIT': lambda c: c.isdigit(),
+    'CATEGORY_NOT_DIGIT': lambda c: not c.isdigit(),
+    'CATEGORY_SPACE': lambda c: c.isspace(),
+    'CATEGORY_NOT_SPACE': lambda c: not c.isspace(),
+    'CATEGORY_WORD': lambda c: c.isalnum() or c == '_',
+    'CATEGORY_NOT_WORD': lambda c: not (c.isalnum() or c == '_')
+}
+
+
+class UnsupportedPattern(Exception):
+    """
+    Pattern construct which is not sampled, eg backreferences
+    """
+
+
+def sample_pattern(pattern, rnd, minlength=0, maxlength=None, tries=10):
+    """
+    Random string with a match of pattern within the length
+    bounds, None if no such string is found
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as _:
+        return None
+    for _ in range(tries):
+        try:
+            value = _sample_parsed(parsed, rnd)
+        except (UnsupportedPattern, TypeError, ValueError) as err:
+            # the parse tree is not a public api, unknown shapes
+            # are treated as unsupported patterns
+            _LOG.debug('%s -- pattern not sampled, %s', pattern, err)
+            return None
+        if len(value) < minlength:
+            continue
+        if maxlength is not None and len(value) > maxlength:
+            continue
+        if re.search(pattern, value):
+            return value
+    _LOG.debug('%s -- no sample of pattern', pattern)
+    return None
+
+
+def _sample_parsed(parsed, rnd):
+    """
+    Random match of a parsed pattern
+    """
+    # R0911: Too many return statements
+    # R0912: Too many branches
+    # pylint: disable=R0911,R0912
+    value = ''
+    for opcode, argument in parsed:
+        opname = _name(opcode)
+        if opname == 'LITERAL':
+            value += chr(argument)
+        elif opname == 'NOT_LITERAL':
+            value += rnd.choice([c for c in _ALPHABET
+                                 if c != chr(argument)])
+        elif opname == 'ANY':
+            value += rnd.choice(string.ascii_lowercase)
+        elif opname == 'IN':
+            chars = [c for c in _ALPHABET if _in_class(c, argument)]
+            if not chars:
+                raise UnsupportedPattern(argument)
+            value += rnd.choice(chars)
+        elif opname in ['MAX_REPEAT', 'MIN_REPEAT']:
+            low, high, subpattern = argument
+            count = rnd.randint(low, max(low, min(high, low + 3)))
+            for _ in range(count):
+                value += _sample_parsed(subpattern, rnd)
+        elif opname == 'SUBPATTERN':
+            value += _sample_parsed(argument[-1], rnd)
+        elif opname == 'BRANCH':
+            value += _sample_parsed(rnd.choice(argument[1]), rnd)
+        elif opname != 'AT':
+            raise UnsupportedPattern(opname)
+    return value
+
+
+def _name(constant):
+    """
+    Upper case name of a parser constant, constants are
+    lower case strings before python 3.5 and named ints after
+    """
+    return str(getattr(constant, 'name', constant)).upper()
+
+
+def _in_class(char, items):
+    """
+    Character matches the items of a parsed character class
+    """
+    negate = False
+    matched = False
+    for opcode, argument in items:
+        opname = _name(opcode)
+        if opname == 'NEGATE':
+            negate = True
+        elif opname == 'LITERAL':
+            matched = matched or char == chr(argument)
+        elif opname == 'RANGE':
+            matched = matched or argument[0] <= ord(char) <= argument[1]
+        elif opname == 'CATEGORY':
+            category = _CATEGORIES.get(_name(argument))
+            if category is None:
+                raise UnsupportedPattern(argument)
+            matched = matched or category(char)
+        else:
+            raise UnsupportedPattern(opname)
+    return matched != negate
+
+
+def bounds(schema, low, high):
+    """
+    Range of a numeric schema
+    """
+    low = schema.get('minimum', low)
+    high = schema.get('maximum', max(high, low + high))
+    if schema.get('exclusiveMinimum'):
+        low += 1
+    if schema.get('exclusiveMaximum'):
+        high -= 1
+    return low, max(low, high)
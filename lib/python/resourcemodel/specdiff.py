@@ -0,0 +1,582 @@
+"""
+Semantic diff between generated openapi specs
+"""
+import copy
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from . import openapiconverter
+from . import utils
+
+_LOG = logging.getLogger(__name__)
+
+# Keywords which only document a schema
+DOC_KEYWORDS = [
+    'description', 'title', 'example', 'examples', 'deprecated'
+]
+# Constraints which reject more values when they grow
+LOWER_BOUNDS = ['minimum', 'minLength', 'minItems', 'minProperties']
+# Constraints which reject more values when they shrink
+UPPER_BOUNDS = ['maximum', 'maxLength', 'maxItems', 'maxProperties']
+_SPECFILE_REGEX = re.compile(r'^(.+)\.v[0-9]+\.[0-9]+\.[0-9]+$')
+
+
+class Change():
+    """
+    Added, removed or changed item of an openapi spec
+    """
+    def __init__(self, location, kind, breaking=False, details=None):
+        """
+        Initialize change object
+        """
+        self.location = location
+        self.kind = kind
+        self.breaking = breaking
+        self.details = details or list()
+
+    def to_dict(self):
+        """
+        Dictionary form of the change for json output
+        """
+        return {
+            'location': self.location,
+            'change': self.kind,
+            'breaking': self.breaking,
+            'details': self.details
+        }
+
+    def __str__(self):
+        """
+        Text form of the change
+        """
+        lines = ['{0:<13} {1:<8} {2}'.format(
+            'BREAKING' if self.breaking else 'non-breaking',
+            self.kind,
+            self.location)]
+        for detail in self.details:
+            lines.append('    ' + detail)
+        return '\n'.join(lines)
+
+
+def normalize_spec(spec):
+    """
+    Replace the resource version embedded in operationIds
+    and media types, so a version bump alone is not a change
+    """
+    version = spec.get('info', {}).get('version')
+    if not version:
+        return spec
+    stringspec = json.dumps(spec)
+    stringspec = stringspec.replace(
+        '.v{0}+'.format(version), '.v{version}+')
+    stringspec = stringspec.replace(
+        'v{0}"'.format(version.replace('.', '_')), 'v{version}"')
+    return json.loads(stringspec)
+
+
+def index_spec(spec):
+    """
+    Index spec by paths/<path>/<method> and
+    components/<section>/<name>
+    """
+    index = dict()
+    for path, pathitem in spec.get('paths', {}).items():
+        for method, operation in pathitem.items():
+            if method in utils.HTTP_METHODS:
+                index['paths' + path + '/' + method] = operation
+    for section, components in spec.get('components', {}).items():
+        for name, value in components.items():
+            index['components/' + section + '/' + name] = value
+    return index
+
+
+def _format(value):
+    """
+    Short text form of a schema value
+    """
+    return json.dumps(value, sort_keys=True)
+
+
+def _is_breaking(direction, breaking_for):
+    """
+    Check if a change breaking for request or response
+    payloads is breaking for the given direction
+    """
+    return direction == 'both' or direction in breaking_for
+
+
+def diff_schema(old, new, direction, pointer='#'):
+    """
+    Compare two jsonschemas. direction is request, response
+    or both and decides which changes break clients.
+    Returns list of (detail, breaking)
+    """
+    changes = list()
+    if old == new:
+        return changes
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        changes.append(('{0}: {1} -> {2}'.format(
+            pointer, _format(old), _format(new)), True))
+        return changes
+    for keyword in ['$ref', 'type']:
+        if old.get(keyword) != new.get(keyword):
+            changes.append(('{0}: {1} {2} -> {3}'.format(
+                pointer, keyword,
+                old.get(keyword), new.get(keyword)), True))
+    changes.extend(_diff_properties(old, new, direction, pointer))
+    changes.extend(_diff_required(old, new, direction, pointer))
+    changes.extend(_diff_enum(old, new, direction, pointer))
+    changes.extend(_diff_bounds(old, new, direction, pointer))
+    changes.extend(_diff_additional(old, new, direction, pointer))
+    if 'items' in old or 'items' in new:
+        changes.extend(diff_schema(old.get('items'), new.get('items'),
+                                   direction, pointer + '/items'))
+    handled = set(['$ref', 'type', 'properties', 'required', 'enum',
+                   'additionalProperties', 'items'] +
+                  LOWER_BOUNDS + UPPER_BOUNDS)
+    for keyword in sorted((set(old) | set(new)) - handled):
+        if old.get(keyword) == new.get(keyword):
+            continue
+        msg = '{0}: {1} {2} -> {3}'.format(
+            pointer, keyword,
+            _format(old.get(keyword)), _format(new.get(keyword)))
+        changes.append((msg, keyword not in DOC_KEYWORDS))
+    return changes
+
+
+def _diff_properties(old, new, direction, pointer):
+    """
+    Removed, added and changed properties
+    """
+    changes = list()
+    oldprops = old.get('properties', {})
+    newprops = new.get('properties', {})
+    for prop in sorted(set(oldprops) - set(newprops)):
+        changes.append(('{0}/properties/{1}: removed'.format(
+            pointer, prop), True))
+    for prop in sorted(set(newprops) - set(oldprops)):
+        changes.append(('{0}/properties/{1}: added'.format(
+            pointer, prop), False))
+    for prop in sorted(set(oldprops) & set(newprops)):
+        changes.extend(diff_schema(oldprops[prop], newprops[prop],
+                                   direction,
+                                   pointer + '/properties/' + prop))
+    return changes
+
+
+def _diff_required(old, new, direction, pointer):
+    """
+    Properties which became required or optional
+    """
+    changes = list()
+    oldreq = set(old.get('required', []))
+    newreq = set(new.get('required', []))
+    for prop in sorted(newreq - oldreq):
+        changes.append(('{0}: {1} became required'.format(
+            pointer, prop), _is_breaking(direction, ['request'])))
+    for prop in sorted(oldreq - newreq):
+        changes.append(('{0}: {1} became optional'.format(
+            pointer, prop), _is_breaking(direction, ['response'])))
+    return changes
+
+
+def _diff_enum(old, new, direction, pointer):
+    """
+    Removed and added enum values
+    """
+    changes = list()
+    if 'enum' not in old and 'enum' not in new:
+        return changes
+    oldenum = old.get('enum', [])
+    newenum = new.get('enum', [])
+    removed = [e for e in oldenum if e not in newenum]
+    added = [e for e in newenum if e not in oldenum]
+    if removed:
+        msg = '{0}: enum values removed {1}'.format(
+            pointer, _format(removed))
+        changes.append((msg, _is_breaking(direction, ['request'])))
+    if added:
+        msg = '{0}: enum values added {1}'.format(
+            pointer, _format(added))
+        changes.append((msg, _is_breaking(direction, ['response'])))
+    return changes
+
+
+def _diff_bounds(old, new, direction, pointer):
+    """
+    Narrowed and widened bounds
+    """
+    changes = list()
+    for keyword in LOWER_BOUNDS + UPPER_BOUNDS:
+        oldval = old.get(keyword)
+        newval = new.get(keyword)
+        if oldval == newval:
+            continue
+        if keyword in LOWER_BOUNDS:
+            narrowed = oldval is None or (
+                newval is not None and newval > oldval)
+        else:
+            narrowed = oldval is None or (
+                newval is not None and newval < oldval)
+        msg = '{0}: {1} {2} -> {3}'.format(pointer, keyword, oldval, newval)
+        changes.append((msg, _is_breaking(
+            direction, ['request'] if narrowed else ['response'])))
+    return changes
+
+
+def _diff_additional(old, new, direction, pointer):
+    """
+    Changed additionalProperties
+    """
+    changes = list()
+    oldval = old.get('additionalProperties', True)
+    newval = new.get('additionalProperties', True)
+    if oldval == newval:
+        return changes
+    if isinstance(oldval, bool) and isinstance(newval, bool):
+        msg = '{0}: additionalProperties {1} -> {2}'.format(
+            pointer, oldval, newval)
+        changes.append((msg, _is_breaking(
+            direction, ['request'] if oldval else ['response'])))
+    else:
+        changes.extend(diff_schema(
+            oldval, newval, direction,
+            pointer + '/additionalProperties'))
+    return changes
+
+
+def _parameter_key(parameter):
+    """
+    Parameters are identified by location and name or by reference
+    """
+    if '$ref' in parameter:
+        return parameter['$ref']
+    return '{0}:{1}'.format(parameter.get('in'), parameter.get('name'))
+
+
+def diff_parameter(old, new, name):
+    """
+    Compare a parameter definition
+    """
+    changes = list()
+    if old == new:
+        return changes
+    if '$ref' in old or '$ref' in new:
+        changes.append(('parameter {0}: {1} -> {2}'.format(
+            name, old.get('$ref'), new.get('$ref')), True))
+        return changes
+    if not old.get('required', False) and new.get('required', False):
+        changes.append(('parameter {0}: became required'.format(name),
+                        True))
+    if old.get('required', False) and not new.get('required', False):
+        changes.append(('parameter {0}: became optional'.format(name),
+                        False))
+    for keyword in ['style', 'explode']:
+        if old.get(keyword) != new.get(keyword):
+            changes.append(('parameter {0}: {1} {2} -> {3}'.format(
+                name, keyword, old.get(keyword), new.get(keyword)), True))
+    for detail, breaking in diff_schema(old.get('schema', {}),
+                                        new.get('schema', {}),
+                                        'request'):
+        changes.append(('parameter {0}: schema {1}'.format(name, detail),
+                        breaking))
+    return changes
+
+
+def diff_parameters(oldparams, newparams):
+    """
+    Compare parameter lists of an operation
+    """
+    changes = list()
+    old = dict((_parameter_key(p), p) for p in oldparams)
+    new = dict((_parameter_key(p), p) for p in newparams)
+    for key in sorted(set(old) - set(new)):
+        changes.append(('parameter {0}: removed'.format(key), True))
+    for key in sorted(set(new) - set(old)):
+        required = new[key].get('required', False)
+        changes.append(('parameter {0}: added{1}'.format(
+            key, ' (required)' if required else ''), required))
+    for key in sorted(set(old) & set(new)):
+        changes.extend(diff_parameter(old[key], new[key], key))
+    return changes
+
+
+def diff_content(old, new, direction, name):
+    """
+    Compare content sections keyed by media type
+    """
+    changes = list()
+    for mediatype in sorted(set(old) - set(new)):
+        changes.append(('{0} {1}: removed'.format(name, mediatype), True))
+    for mediatype in sorted(set(new) - set(old)):
+        changes.append(('{0} {1}: added'.format(name, mediatype), False))
+    for mediatype in sorted(set(old) & set(new)):
+        for detail, breaking in diff_schema(
+                old[mediatype].get('schema', {}),
+                new[mediatype].get('schema', {}),
+                direction):
+            changes.append(('{0} {1}: {2}'.format(
+                name, mediatype, detail), breaking))
+    return changes
+
+
+def diff_requestbody(old, new):
+    """
+    Compare request bodies of an operation
+    """
+    changes = list()
+    if old == new:
+        return changes
+    if old is None:
+        required = new.get('required', False)
+        changes.append(('requestBody: added{0}'.format(
+            ' (required)' if required else ''), required))
+        return changes
+    if new is None:
+        changes.append(('requestBody: removed', True))
+        return changes
+    if not old.get('required', False) and new.get('required', False):
+        changes.append(('requestBody: became required', True))
+    changes.extend(diff_content(old.get('content', {}),
+                                new.get('content', {}),
+                                'request', 'requestBody'))
+    return changes
+
+
+def diff_response(old, new, name):
+    """
+    Compare a response definition
+    """
+    changes = list()
+    if old == new:
+        return changes
+    if '$ref' in old or '$ref' in new:
+        changes.append(('{0}: {1} -> {2}'.format(
+            name, old.get('$ref'), new.get('$ref')), True))
+        return changes
+    changes.extend(diff_content(old.get('content', {}),
+                                new.get('content', {}),
+                                'response', name))
+    oldheaders = old.get('headers', {})
+    newheaders = new.get('headers', {})
+    for header in sorted(set(oldheaders) - set(newheaders)):
+        changes.append(('{0} header {1}: removed'.format(name, header),
+                        True))
+    for header in sorted(set(newheaders) - set(oldheaders)):
+        changes.append(('{0} header {1}: added'.format(name, header),
+                        False))
+    return changes
+
+
+def diff_responses(old, new):
+    """
+    Compare responses of an operation keyed by status code
+    """
+    changes = list()
+    for status in sorted(set(old) - set(new)):
+        changes.append(('response {0}: removed'.format(status),
+                        status.startswith('2')))
+    for status in sorted(set(new) - set(old)):
+        changes.append(('response {0}: added'.format(status), False))
+    for status in sorted(set(old) & set(new)):
+        changes.extend(diff_response(old[status], new[status],
+                                     'response ' + status))
+    return changes
+
+
+def diff_operation(old, new):
+    """
+    Compare two operations
+    """
+    changes = list()
+    if old.get('operationId') != new.get('operationId'):
+        changes.append(('operationId: {0} -> {1}'.format(
+            old.get('operationId'), new.get('operationId')), True))
+    changes.extend(diff_parameters(old.get('parameters', []),
+                                   new.get('parameters', [])))
+    changes.extend(diff_requestbody(old.get('requestBody'),
+                                    new.get('requestBody')))
+    changes.extend(diff_responses(old.get('responses', {}),
+                                  new.get('responses', {})))
+    for keyword in ['tags', 'description']:
+        if old.get(keyword) != new.get(keyword):
+            changes.append(('{0}: {1} -> {2}'.format(
+                keyword, _format(old.get(keyword)),
+                _format(new.get(keyword))), False))
+    return changes
+
+
+def diff_item(location, old, new):
+    """
+    Compare indexed item according to the kind of location
+    """
+    if location.startswith('paths'):
+        return diff_operation(old, new)
+    if location.startswith('components/schemas/'):
+        return diff_schema(old, new, 'both')
+    if location.startswith('components/parameters/'):
+        return diff_parameter(old, new, location.split('/')[-1])
+    if location.startswith('components/responses/'):
+        return diff_response(old, new, 'response')
+    return [('{0} -> {1}'.format(_format(old), _format(new)), False)]
+
+
+def diff_specs(oldspec, newspec):
+    """
+    Compare two generated specs and return list of changes
+    """
+    changes = list()
+    old = index_spec(normalize_spec(oldspec))
+    new = index_spec(normalize_spec(newspec))
+    for location in sorted(set(old) - set(new)):
+        changes.append(Change(location, 'removed', True))
+    for location in sorted(set(new) - set(old)):
+        changes.append(Change(location, 'added', False))
+    for location in sorted(set(old) & set(new)):
+        if old[location] == new[location]:
+            continue
+        details = diff_item(location, old[location], new[location])
+        if not details:
+            continue
+        changes.append(Change(location,
+                              'changed',
+                              any(b for _, b in details),
+                              [d for d, _ in details]))
+    return changes
+
+
+def _resource_of(specfile):
+    """
+    Resource part of a spec file name without the version
+    """
+    name = os.path.basename(specfile)
+    result = _SPECFILE_REGEX.match(name)
+    if result:
+        return result.groups()[0]
+    return name
+
+
+def _list_specs(specdir):
+    """
+    Spec files of an openapi directory keyed by resource
+    """
+    specs = dict()
+    for name in os.listdir(specdir):
+        specfile = os.path.join(specdir, name)
+        if os.path.isfile(specfile):
+            specs[_resource_of(specfile)] = specfile
+    return specs
+
+
+def diff_dirs(olddir, newdir):
+    """
+    Compare every spec of two openapi directories
+    """
+    result = dict()
+    oldspecs = _list_specs(olddir)
+    newspecs = _list_specs(newdir)
+    for resource in sorted(set(oldspecs) | set(newspecs)):
+        if resource not in newspecs:
+            result[resource] = [Change('spec', 'removed', True)]
+        elif resource not in oldspecs:
+            result[resource] = [Change('spec', 'added', False)]
+        else:
+            result[resource] = diff_specs(
+                utils.load_spec(oldspecs[resource]),
+                utils.load_spec(newspecs[resource]))
+    return result
+
+
+def generate_specs(basedir, lones, inputmodule=None):
+    """
+    Generate fresh specs in memory keyed by resource. References
+    are resolved from a temporary copy of the common schemas, the
+    openapi directory of the family is left alone
+    """
+    family = utils.get_family(basedir)
+    defaults = utils.get_family_defaults(basedir)
+    openapidir = tempfile.mkdtemp()
+    try:
+        utils.dump_file_to_openapidir(basedir, openapidir)
+        openapiglobal = openapiconverter.create_openapi_global(family)
+        schemadir = os.path.join(basedir, 'apischemas', 'rschemas')
+        specs = dict()
+        for lone in lones:
+            schemafile = os.path.join(schemadir, lone)
+            if not os.path.isfile(schemafile):
+                sys.exit('{0} -- Resource does not exist'.format(lone))
+            specobj = openapiconverter.build_openapi_spec(
+                copy.deepcopy(openapiglobal),
+                schemafile,
+                openapidir,
+                family,
+                'json',
+                inputmodule,
+                defaults)
+            if specobj is None or specobj.error:
+                sys.exit('Failed to generate spec for {0}'.format(lone))
+            specs[_resource_of(specobj.specfile)] = specobj.openapi
+    finally:
+        shutil.rmtree(openapidir)
+    return specs
+
+
+def report(result, outfmt):
+    """
+    Print changes per resource, return True for breaking changes
+    """
+    breaking = False
+    if outfmt == 'json':
+        output = dict()
+        for resource, changes in result.items():
+            output[resource] = [c.to_dict() for c in changes]
+        print(json.dumps(output, indent=4, sort_keys=True))
+    for resource in sorted(result):
+        changes = result[resource]
+        breaking = breaking or any(c.breaking for c in changes)
+        if outfmt == 'json':
+            continue
+        print('{0}: {1} change(s)'.format(resource, len(changes)))
+        for change in changes:
+            print(str(change))
+    return breaking
+
+
+def main(args):
+    """
+    Main function of diff command
+    """
+    if args.new and os.path.isdir(args.old) != os.path.isdir(args.new):
+        sys.exit('Enter two spec files or two openapi directories')
+    if args.new and os.path.isdir(args.old):
+        result = diff_dirs(args.old, args.new)
+    elif args.new:
+        result = {
+            _resource_of(args.new): diff_specs(
+                utils.load_spec(args.old), utils.load_spec(args.new))
+        }
+    else:
+        if not args.basedir or not args.lones:
+            sys.exit('Enter new spec or basedir and lones')
+        fresh = generate_specs(args.basedir,
+                               args.lones.split(','),
+                               args.module)
+        if os.path.isdir(args.old):
+            oldspecs = _list_specs(args.old)
+        else:
+            oldspecs = {_resource_of(args.old): args.old}
+        result = dict()
+        for resource, newspec in fresh.items():
+            if resource in oldspecs:
+                result[resource] = diff_specs(
+                    utils.load_spec(oldspecs[resource]), newspec)
+            else:
+                result[resource] = [Change('spec', 'added', False)]
+    breaking = report(result, args.outfmt)
+    if breaking and args.fail_on_breaking:
+        sys.exit(1)
@@ -0,0 +1,86 @@
+"""Unit test for request corpus generator
+"""
+
+import collections
+import copy
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import corpus
+from resourcemodel import middleware
+from resourcemodel.tests import middleware_test
+
+
+class CorpusTest(unittest.TestCase):
+    """Test request corpus generation.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.specfile = os.path.join(self.tmpdir, 'vnd.ms.test.todo.v3.0.1')
+        with open(self.specfile, 'w') as fh:
+            json.dump(middleware_test.SPEC, fh)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_mix(self):
+        """Records per operation follow the mix.
+        """
+        generator = corpus.CorpusGenerator([self.specfile], count=10,
+                                           mix='get=2,put=0.5', seed=1)
+        counts = collections.Counter(r['method'] for r in generator)
+        self.assertEqual(counts, {'GET': 20, 'PUT': 5})
+        generator = corpus.CorpusGenerator([self.specfile], count=10,
+                                           mix='GET=2,Put=0.5', seed=1)
+        counts = collections.Counter(r['method'] for r in generator)
+        self.assertEqual(counts, {'GET': 20, 'PUT': 5})
+        with self.assertRaises(ValueError):
+            corpus.CorpusGenerator([self.specfile], mix='get=1,todo_gett=1')
+
+    def test_records(self):
+        """Path parameters are filled and bodies are generated.
+        """
+        generator = corpus.CorpusGenerator([self.specfile], count=3,
+                                           mix='put=1', seed=1, keys=5)
+        outfile = io.StringIO()
+        self.assertEqual(corpus.write_corpus(generator, outfile), 3)
+        for line in outfile.getvalue().splitlines():
+            record = json.loads(line)
+            self.assertRegex(
+                record['path'],
+                r'^/test/todo/key[0-4]/employees/'
+                r'fname=key[0-4],lname=key[0-4]$')
+            self.assertIsInstance(record['body'], dict)
+
+    def test_constrained_keys(self):
+        """Path parameters follow the pattern and length of their schema.
+        """
+        spec = copy.deepcopy(middleware_test.SPEC)
+        operation = spec['paths'][
+            '/todo/{primary_key}/employees/{employees_keys}']['put']
+        operation['parameters'][0]['schema'] = {
+            'type': 'string', 'pattern': '^T[0-9]{3}$'}
+        operation['parameters'][1]['schema']['properties'] = {
+            'fname': {'type': 'string', 'maxLength': 2},
+            'lname': {'type': 'string', 'format': 'email'}
+        }
+        with open(self.specfile, 'w') as fh:
+            json.dump(spec, fh)
+        validator = middleware.RequestValidator([self.specfile])
+        generator = corpus.CorpusGenerator([self.specfile], count=20,
+                                           mix='put=1', seed=1, keys=50)
+        for record in generator:
+            found, pathparams = validator.match(record['method'],
+                                                record['path'])
+            validator.validate(found, pathparams, '',
+                               record['headers']['Content-Type'],
+                               json.dumps(record['body']).encode('utf-8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""Unit test for bulk resource instance generator
+"""
+
+import copy
+import io
+import json
+import unittest
+
+import jsonschema
+
+from resourcemodel import datagen
+
+RESOURCE = {
+    'name': 'todo',
+    'version': '3.0.1',
+    'key': {'type': 'string'},
+    'type': 'object',
+    'properties': {
+        'text': {'type': 'string', 'maxLength': 4},
+        'state': {'enum': ['open', 'closed']},
+        'prio': {'type': 'integer', 'minimum': 1, 'maximum': 3},
+        'labels': {
+            'type': 'mutablehash',
+            'properties': {'color': {'type': 'string'}}
+        },
+        'employees': {
+            'type': 'propertylist',
+            'key': ['fname', 'role'],
+            'items': {'$ref': '#/definitions/employee'}
+        }
+    },
+    'required': ['text'],
+    'definitions': {
+        'employee': {
+            'type': 'object',
+            'properties': {
+                'fname': {'type': 'string'},
+                'role': {'enum': ['dev', 'ops']},
+                'tags': {'type': 'array', 'items': {'type': 'string'}}
+            }
+        }
+    }
+}
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'text': {'type': 'string', 'maxLength': 4},
+        'state': {'enum': ['open', 'closed']},
+        'prio': {'type': 'integer', 'minimum': 1, 'maximum': 3},
+        'labels': {'type': 'object'},
+        'employees': {
+            'type': 'array',
+            'maxItems': 2,
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'fname': {'type': 'string'},
+                    'role': {'enum': ['dev', 'ops']},
+                    'tags': {'type': 'array',
+                             'items': {'type': 'string'}}
+                },
+                'required': ['fname', 'role']
+            }
+        }
+    },
+    'required': ['text'],
+    'additionalProperties': False
+}
+
+
+class DatagenTest(unittest.TestCase):
+    """Test generated instances.
+    """
+
+    def _generate(self, usenumpy):
+        """Instances written as json lines.
+        """
+        generator = datagen.ResourceGenerator(RESOURCE, '.', seed=5,
+                                              usenumpy=usenumpy)
+        outfile = io.StringIO()
+        written = datagen.write_instances(generator.batches(50, 16),
+                                          outfile)
+        self.assertEqual(written, 50)
+        return [json.loads(line)
+                for line in outfile.getvalue().splitlines()]
+
+    def test_valid(self):
+        """Instances are valid and propertylist keys are unique.
+        """
+        for usenumpy in [True, False]:
+            records = self._generate(usenumpy)
+            self.assertEqual([r['primary_key'] for r in records],
+                             ['key{0}'.format(i) for i in range(50)])
+            for record in records:
+                jsonschema.validate(record['body'], SCHEMA)
+                keys = [(e['fname'], e['role'])
+                        for e in record['body'].get('employees', [])]
+                self.assertEqual(len(keys), len(set(keys)))
+
+    def test_seed(self):
+        """Same seed generates same instances.
+        """
+        self.assertEqual(self._generate(False), self._generate(False))
+        if datagen.numpy is not None:
+            self.assertEqual(self._generate(True), self._generate(True))
+
+    def test_key_scopes(self):
+        """Referenced key schemas leave no resolution scope pushed.
+        """
+        resourcedef = copy.deepcopy(RESOURCE)
+        resourcedef['key'] = {'$ref': '#/definitions/key'}
+        resourcedef['definitions']['key'] = {'type': 'integer'}
+        resourcedef['definitions']['employee']['properties']['fname'] = {
+            '$ref': '#/definitions/name'}
+        resourcedef['definitions']['name'] = {'type': 'string'}
+        generator = datagen.ResourceGenerator(resourcedef, '.', seed=5)
+        self.assertEqual(generator.resolver.resolution_scope,
+                         generator.resolver.base_uri)
+        keys, _ = next(generator.batches(2))
+        self.assertEqual(keys, [0, 1])
+
+    def test_keywords(self):
+        """Pattern, multipleOf and uniqueItems are followed.
+        """
+        properties = {
+            'code': {'type': 'string', 'pattern': '^[A-Z]{3}[0-9]{2}$'},
+            'price': {'type': 'number', 'minimum': 0, 'maximum': 10,
+                      'multipleOf': 0.05},
+            'qty': {'type': 'integer', 'maximum': 100, 'multipleOf': 12},
+            'tags': {'type': 'array', 'minItems': 3, 'maxItems': 4,
+                     'uniqueItems': True,
+                     'items': {'enum': ['a', 'b', 'c', 'd']}}
+        }
+        resourcedef = {
+            'name': 'item',
+            'version': '3.0.1',
+            'key': {'type': 'string', 'pattern': '^IT-[0-9]{4}$'},
+            'type': 'object',
+            'properties': properties,
+            'required': sorted(properties)
+        }
+        schema = {'type': 'object', 'properties': properties,
+                  'required': sorted(properties)}
+        for usenumpy in [True, False]:
+            generator = datagen.ResourceGenerator(resourcedef, '.', seed=5,
+                                                  usenumpy=usenumpy)
+            checker = datagen.BatchChecker(
+                jsonschema.Draft4Validator(resourcedef['key']),
+                jsonschema.Draft4Validator(schema))
+            for keys, _ in checker.check(generator.batches(200, 64)):
+                self.assertEqual(len(set(keys)), len(keys))
+            self.assertEqual(checker.invalid, 0)
+        checker = datagen.BatchChecker(
+            jsonschema.Draft4Validator(resourcedef['key']),
+            jsonschema.Draft4Validator(schema))
+        list(checker.check([(['IT-0001', 'x'], [{}, {}])]))
+        self.assertEqual(checker.invalid, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
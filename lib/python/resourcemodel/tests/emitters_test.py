@@ -0,0 +1,88 @@
+"""Unit test for artifact emitters
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+import jsonschema
+
+from resourcemodel import emitters
+from resourcemodel import openapiconverter
+from resourcemodel import openapiv3
+from resourcemodel import router
+from resourcemodel.tests.openapiv3_test import MIMETYPE, RESOURCE
+
+
+class EmittersTest(unittest.TestCase):
+    """Test artifacts of a built spec object.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.openapidir = os.path.join(self.tmpdir, 'openapi')
+        os.makedirs(self.openapidir)
+        openapi = openapiconverter.create_openapi_global('test')
+        openapi['info'] = {'title': 'todo', 'version': '3.0.1'}
+        self.specobj = openapiv3.VersionV3(
+            openapi, os.path.join(self.openapidir, MIMETYPE),
+            copy.deepcopy(RESOURCE), 'json', MIMETYPE, 'v3_0_1', 'todo',
+            self.openapidir)
+        self.specobj.create_spec()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_bundle(self):
+        """Jsonschema bundle validates resources.
+        """
+        bundle = emitters.jsonschema_bundle(self.specobj.openapi)
+        self.assertEqual(bundle['title'], 'todo')
+        self.assertEqual(
+            bundle['definitions']['employees_keys']['properties']['fname'],
+            {'$ref': '#/definitions/fname'})
+        validator = jsonschema.Draft4Validator(bundle)
+        self.assertTrue(validator.is_valid(
+            {'text': 'a', 'employees': [{'fname': 'b'}]}))
+        self.assertFalse(validator.is_valid({'tags': ['a']}))
+
+    def test_emit(self):
+        """All artifacts from one spec object.
+        """
+        artifacts = emitters.get_emitters('openapi3, jsonschema,routes',
+                                          self.openapidir)
+        for emitter in artifacts:
+            emitter.emit(self.specobj)
+        for emitter in artifacts:
+            emitter.finish()
+        self.assertTrue(os.path.isfile(os.path.join(self.openapidir,
+                                                    MIMETYPE)))
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.tmpdir, 'jsonschema', MIMETYPE + '.json')))
+        routes = router.Router.load(os.path.join(self.tmpdir,
+                                                 'routes.json'))
+        route, params = routes.match('GET', '/test/todo/t1')
+        self.assertEqual(route[0], 'todo_pk_get_v3_0_1')
+        self.assertEqual(params, {'primary_key': 't1'})
+        with self.assertRaises(ValueError):
+            emitters.get_emitters('openapi2', self.openapidir)
+
+    def test_invalid_spec(self):
+        """Nothing is emitted for a spec with invalid schemas.
+        """
+        self.specobj.openapi['components']['schemas']['text'] = {
+            'type': 'text'}
+        artifacts = emitters.get_emitters('jsonschema,routes,openapi3',
+                                          self.openapidir)
+        openapiconverter.emit_spec(self.specobj, 'todo', artifacts)
+        for emitter in artifacts:
+            emitter.finish()
+        self.assertTrue(self.specobj.error)
+        self.assertEqual(os.listdir(self.openapidir), [])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['openapi'])
+
+
+if __name__ == '__main__':
+    unittest.main()
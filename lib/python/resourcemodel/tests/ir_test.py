@@ -0,0 +1,112 @@
+"""Unit test for typed representation of resource schemas
+"""
+
+import copy
+import unittest
+
+from jsonschema import RefResolver
+
+from resourcemodel import ir
+
+RESOURCE = {
+    'name': 'todo',
+    'description': 'todo lone',
+    'version': '3.0.1',
+    'key': {'type': 'string'},
+    'type': 'object',
+    'properties': {
+        'text': {'type': 'string'},
+        'state': {'enum': ['open', 'closed']},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'labels': {
+            'type': 'mutablehash',
+            'properties': {'color': {'type': 'string'}}
+        },
+        'employees': {
+            'type': 'propertylist',
+            'key': ['fname'],
+            'items': {'$ref': '#/definitions/employee'}
+        }
+    },
+    'required': ['text'],
+    'definitions': {
+        'employee': {
+            'type': 'object',
+            'properties': {
+                'fname': {'type': 'string'},
+                'lhost': {'type': 'string'}
+            }
+        }
+    },
+    'search': [{'name': 'findbytext', 'schema': {'type': 'string'}}],
+    'rpc': [{
+        'start': {
+            'request': {'type': 'object'},
+            'response': {'type': 'string'},
+            'async': True
+        }
+    }],
+    'expand': True
+}
+
+
+def _build(resourcedef):
+    """Representation of resourcedef.
+    """
+    resolver = RefResolver('', referrer=resourcedef)
+    return ir.build(resourcedef, resolver, 'todo')
+
+
+class IrTest(unittest.TestCase):
+    """Test representation nodes.
+    """
+
+    def test_resource(self):
+        """Properties by kind with resolved references.
+        """
+        resource = _build(RESOURCE)
+        self.assertFalse(resource.error)
+        self.assertEqual(
+            [('.'.join(path), prop.kind) for path, prop in resource.walk()],
+            [('employees', 'propertylist'),
+             ('employees.fname', 'scalar'),
+             ('employees.lhost', 'scalar'),
+             ('labels', 'mutablehash'),
+             ('labels.color', 'scalar'),
+             ('state', 'scalar'),
+             ('tags', 'array'),
+             ('text', 'scalar')])
+        employees = resource.find('employees')
+        self.assertEqual([k.name for k in employees.keys], ['fname'])
+        self.assertEqual(resource.find('tags').items.kind, 'scalar')
+        self.assertTrue(resource.find('text').required)
+        self.assertIsNone(resource.find('labels.size'))
+        self.assertEqual([s.name for s in resource.search], ['findbytext'])
+        verb = resource.rpc[0]
+        self.assertEqual((verb.name, verb.isasync), ('start', True))
+        self.assertEqual(resource.options, {'expand': True})
+        with self.assertRaises(AttributeError):
+            resource.extra = 1
+
+    def test_errors(self):
+        """Invalid fields are reported and skipped.
+        """
+        resourcedef = copy.deepcopy(RESOURCE)
+        resourcedef['properties']['employees']['key'] = ['lname']
+        resourcedef['properties']['size'] = {'type': 'float'}
+        resourcedef['rpc'][0]['start'].pop('response')
+        resource = _build(resourcedef)
+        self.assertTrue(resource.error)
+        self.assertIsNone(resource.find('employees'))
+        self.assertIsNone(resource.find('size'))
+        self.assertEqual(resource.rpc, ())
+        resourcedef = copy.deepcopy(RESOURCE)
+        resourcedef['properties']['employees']['items'] = {
+            '$ref': '#/definitions/missing'}
+        resource = _build(resourcedef)
+        self.assertTrue(resource.error)
+        self.assertIsNone(resource.find('employees'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Unit test for reference media type codecs
+"""
+
+import unittest
+
+from resourcemodel import mediacodecs
+
+VALUES = [
+    None, True, False, 0, 127, 128, -32, -33, 255, 65536, -129,
+    2 ** 63 - 1, -2 ** 63, 2 ** 64 - 1, 1.5, -0.0, 1e300, '', 'x' * 40,
+    'café', 'y' * 70000, [], list(range(20)), {}, {'a': [1, {'b': None}]},
+    dict(('k{0}'.format(i), i) for i in range(20))
+]
+
+
+class MediaCodecsTest(unittest.TestCase):
+    """Test msgpack and cbor reference codecs.
+    """
+
+    def test_roundtrip(self):
+        """Decoded values are identical to encoded values.
+        """
+        for name in ['json', 'msgpack', 'cbor']:
+            codec = mediacodecs.get_codec(name, native=False)
+            for value in VALUES:
+                if name == 'json' and value == 2 ** 64 - 1:
+                    continue
+                self.assertTrue(
+                    mediacodecs.identical(codec.decode(codec.encode(value)),
+                                          value),
+                    '{0} {1!r}'.format(name, value)[:80])
+
+    def test_encoding(self):
+        """Encodings of the msgpack and cbor specifications.
+        """
+        self.assertEqual(
+            mediacodecs.msgpack_encode({'compact': True, 'schema': 0}),
+            b'\x82\xa7compact\xc3\xa6schema\x00')
+        self.assertEqual(mediacodecs.cbor_encode(1000000),
+                         bytes.fromhex('1a000f4240'))
+        self.assertEqual(mediacodecs.cbor_encode(-1000),
+                         bytes.fromhex('3903e7'))
+        self.assertEqual(mediacodecs.cbor_encode([1, [2, 3]]),
+                         bytes.fromhex('8201820203'))
+        self.assertEqual(mediacodecs.cbor_encode(1.1),
+                         bytes.fromhex('fb3ff199999999999a'))
+        self.assertEqual(mediacodecs.cbor_decode(bytes.fromhex('f93e00')),
+                         1.5)
+        self.assertEqual(mediacodecs.cbor_decode(bytes.fromhex('f90001')),
+                         2.0 ** -24)
+        self.assertEqual(mediacodecs.cbor_decode(bytes.fromhex('f9fc00')),
+                         float('-inf'))
+
+    def test_errors(self):
+        """Values outside the json data model are rejected.
+        """
+        for encode in [mediacodecs.msgpack_encode, mediacodecs.cbor_encode]:
+            self.assertRaises(mediacodecs.CodecError, encode, 2 ** 64)
+            self.assertRaises(mediacodecs.CodecError, encode, {1: 'a'})
+            self.assertRaises(mediacodecs.CodecError, encode, b'bytes')
+        self.assertRaises(mediacodecs.CodecError,
+                          mediacodecs.msgpack_decode, b'\x92\x01')
+        self.assertRaises(mediacodecs.CodecError,
+                          mediacodecs.cbor_decode, b'\x01\x02')
+        self.assertFalse(mediacodecs.identical(1, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Unit test for validation middleware
+"""
+
+import copy
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import middleware
+
+CONTENT = 'application/vnd.ms.test.todo.v3.0.1+json'
+SPEC = {
+    'servers': [{'url': '/test'}],
+    'paths': {
+        '/todo': {
+            'get': {
+                'operationId': 'todo_get_all_v3_0_1',
+                'parameters': [{
+                    'name': '_limit',
+                    'in': 'query',
+                    'schema': {'type': 'integer', 'maximum': 30}
+                }],
+                'responses': {}
+            }
+        },
+        '/todo/{primary_key}/employees/{employees_keys}': {
+            'put': {
+                'operationId': 'todo_pk_employees_emp_put_v3_0_1',
+                'parameters': [{
+                    'name': 'primary_key',
+                    'in': 'path',
+                    'required': True,
+                    'schema': {'type': 'string'}
+                }, {
+                    'name': 'employees_keys',
+                    'in': 'path',
+                    'required': True,
+                    'style': 'simple',
+                    'explode': True,
+                    'schema': {
+                        'type': 'object',
+                        'required': ['fname', 'lname'],
+                        'properties': {
+                            'fname': {'type': 'string'},
+                            'lname': {'type': 'string'}
+                        }
+                    }
+                }],
+                'requestBody': {
+                    'required': True,
+                    'content': {
+                        CONTENT: {
+                            'schema': {
+                                'type': 'object',
+                                'properties': {'age': {'type': 'integer'}}
+                            }
+                        }
+                    }
+                },
+                'responses': {}
+            }
+        }
+    }
+}
+
+
+def _app(environ, start_response):
+    """Echo app.
+    """
+    start_response('200 OK', [])
+    return [environ['wsgi.input'].read()]
+
+
+class MiddlewareTest(unittest.TestCase):
+    """Test WSGI validation middleware.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        specfile = os.path.join(self.tmpdir, 'vnd.ms.test.todo.v3.0.1')
+        with open(specfile, 'w') as fh:
+            json.dump(SPEC, fh)
+        self.app = middleware.ValidationMiddleware(_app, [specfile])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _call(self, method, path, query='', body=b''):
+        """Call middleware and return status and body.
+        """
+        status = []
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': CONTENT,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body)
+        }
+        result = self.app(environ, lambda s, h: status.append(s))
+        return status[0], b''.join(result)
+
+    def test_query_parameters(self):
+        """Query parameters are coerced and validated.
+        """
+        self.assertEqual(self._call('GET', '/test/todo', '_limit=10')[0],
+                         '200 OK')
+        self.assertEqual(self._call('GET', '/test/todo', '_limit=31')[0],
+                         '400 Bad Request')
+
+    def test_path_and_body(self):
+        """Exploded path keys and bodies are validated.
+        """
+        path = '/test/todo/t1/employees/fname=a,lname=b'
+        status, body = self._call('PUT', path, body=b'{"age": 3}')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'{"age": 3}')
+        status, _ = self._call('PUT', path, body=b'{"age": "x"}')
+        self.assertEqual(status, '400 Bad Request')
+        status, _ = self._call('PUT', '/test/todo/t1/employees/fname=a',
+                               body=b'{"age": 3}')
+        self.assertEqual(status, '400 Bad Request')
+        status, _ = self._call('PUT', path)
+        self.assertEqual(status, '400 Bad Request')
+
+    def test_unknown_and_stats(self):
+        """Unknown paths pass through, counters are kept per operation.
+        """
+        self.assertEqual(self._call('GET', '/other')[0], '200 OK')
+        self.assertEqual(self._call('DELETE', '/test/todo')[0],
+                         '405 Method Not Allowed')
+        self._call('GET', '/test/todo', '_limit=31')
+        stats = self.app.validator.snapshot()[
+            ('vnd.ms.test.todo.v3.0.1', 'todo_get_all_v3_0_1')]
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['rejected'], 1)
+
+    def test_stats_per_spec(self):
+        """Counters of an operationid in two specs are kept apart.
+        """
+        other = copy.deepcopy(SPEC)
+        other['servers'] = [{'url': '/other'}]
+        specfiles = [os.path.join(self.tmpdir, 'vnd.ms.test.todo.v3.0.1')]
+        specfiles.append(os.path.join(self.tmpdir, 'vnd.ms.other.todo.v3.0.1'))
+        with open(specfiles[1], 'w') as fh:
+            json.dump(other, fh)
+        self.app = middleware.ValidationMiddleware(_app, specfiles)
+        self._call('GET', '/other/todo')
+        stats = self.app.validator.snapshot()
+        self.assertEqual(stats[('vnd.ms.other.todo.v3.0.1',
+                                'todo_get_all_v3_0_1')]['count'], 1)
+        self.assertEqual(stats[('vnd.ms.test.todo.v3.0.1',
+                                'todo_get_all_v3_0_1')]['count'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+"""Unit test for mock server
+"""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import mockserver
+from resourcemodel import openapiconverter
+from resourcemodel import openapiv3
+from resourcemodel import validators
+from resourcemodel.tests import openapiv3_test
+
+CONTENT = 'application/vnd.ms.test.todo.v3.0.1+json'
+SPEC = {
+    'servers': [{'url': '/test'}],
+    'paths': {
+        '/todo': {
+            'get': {
+                'operationId': 'todo_get_all_v3_0_1',
+                'parameters': [{
+                    'name': '_limit',
+                    'in': 'query',
+                    'schema': {'type': 'integer', 'maximum': 30,
+                               'default': 2}
+                }],
+                'responses': {
+                    '200': {'$ref': '#/components/responses/Ok_all'}
+                }
+            }
+        },
+        '/todo:stream': {
+            'get': {
+                'operationId': 'todo_stream_v3_0_1',
+                'responses': {
+                    '200': {
+                        'description': 'OK',
+                        'content': {'application/x-ndjson': {'schema': {
+                            '$ref': '#/components/schemas/todo'
+                        }}}
+                    }
+                }
+            }
+        },
+        '/todo/{primary_key}': {
+            'get': {
+                'operationId': 'todo_pk_get_v3_0_1',
+                'responses': {
+                    '200': {'$ref': '#/components/responses/Ok'}
+                }
+            },
+            'delete': {
+                'operationId': 'todo_pk_delete_v3_0_1',
+                'responses': {'204': {'description': 'No Content'}}
+            }
+        }
+    },
+    'components': {
+        'responses': {
+            'Ok_all': {
+                'description': 'OK',
+                'content': {CONTENT: {'schema': {
+                    'type': 'object',
+                    'properties': {
+                        '_elem': {
+                            'type': 'array',
+                            'items': {
+                                '$ref': '#/components/schemas/primary_key'
+                            }
+                        },
+                        '_links': {'type': 'object'}
+                    }
+                }}}
+            },
+            'Ok': {
+                'description': 'OK',
+                'content': {CONTENT: {'schema': {
+                    '$ref': '#/components/schemas/todo'
+                }}}
+            }
+        },
+        'schemas': {
+            'primary_key': {'type': 'string'},
+            'todo': {
+                'type': 'object',
+                'properties': {
+                    'text': {'type': 'string', 'maxLength': 4},
+                    'code': {'type': 'string',
+                             'pattern': '^[A-Z]{2}-[0-9]{4}$'},
+                    'state': {'enum': ['open', 'closed']},
+                    'prio': {'type': 'integer', 'minimum': 1,
+                             'maximum': 3}
+                },
+                'required': ['text', 'code']
+            }
+        }
+    }
+}
+
+
+def _body(response):
+    """Json body of serialized response.
+    """
+    return json.loads(response.split(b'\r\n\r\n', 1)[1].decode('utf-8'))
+
+
+class MockServerTest(unittest.TestCase):
+    """Test mock responses.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        specfile = os.path.join(self.tmpdir, 'vnd.ms.test.todo.v3.0.1')
+        with open(specfile, 'w') as fh:
+            json.dump(SPEC, fh)
+        self.server = mockserver.MockServer([specfile], seed=1,
+                                            collection_size=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_synthesized(self):
+        """Synthesized bodies follow the schema.
+        """
+        response = self.server.respond('GET', '/test/todo/t1')
+        self.assertTrue(response.startswith(b'HTTP/1.1 200 OK'))
+        body = _body(response)
+        self.assertLessEqual(len(body['text']), 4)
+        self.assertRegex(body['code'], '^[A-Z]{2}-[0-9]{4}$')
+        self.assertIn(body.get('state', 'open'), ['open', 'closed'])
+        response = self.server.respond('DELETE', '/test/todo/t1')
+        self.assertTrue(response.startswith(b'HTTP/1.1 204'))
+        response = self.server.respond('PUT', '/test/todo/t1')
+        self.assertTrue(response.startswith(b'HTTP/1.1 405'))
+
+    def test_canned(self):
+        """Canned responses keyed by spec win over operationId.
+        """
+        specfiles = [os.path.join(self.tmpdir, 'vnd.ms.test.todo.v3.0.1')]
+        specfiles.append(os.path.join(self.tmpdir, 'vnd.ms.test2.todo.v3.0.1'))
+        spec = copy.deepcopy(SPEC)
+        spec['servers'] = [{'url': '/test2'}]
+        with open(specfiles[1], 'w') as fh:
+            json.dump(spec, fh)
+        canned = mockserver.canned_responses({
+            'todo_pk_get_v3_0_1': {'body': {'text': 'any'}},
+            'vnd.ms.test2.todo.v3.0.1/todo_pk_get_v3_0_1': {
+                'status': 201, 'body': {'text': 'two'}}})
+        server = mockserver.MockServer(specfiles, seed=1, canned=canned)
+        self.assertEqual(_body(server.respond('GET', '/test/todo/t1')),
+                         {'text': 'any'})
+        response = server.respond('GET', '/test2/todo/t1')
+        self.assertTrue(response.startswith(b'HTTP/1.1 201'))
+        self.assertEqual(_body(response), {'text': 'two'})
+
+    def test_pagination(self):
+        """Get all pages through keys with _next cursors.
+        """
+        keys = []
+        target = '/test/todo'
+        while target:
+            body = _body(self.server.respond('GET', target))
+            keys.extend(body['_elem'])
+            target = body['_links'].get('_next', {}).get('href')
+        self.assertEqual(keys, ['key0', 'key1', 'key2', 'key3', 'key4'])
+
+    def test_stream(self):
+        """Stream returns a resource per line.
+        """
+        response = self.server.respond('GET', '/test/todo:stream')
+        self.assertIn(b'Content-Type: application/x-ndjson', response)
+        lines = response.split(b'\r\n\r\n', 1)[1].splitlines()
+        self.assertEqual(len(lines), 5)
+        for line in lines:
+            self.assertIn('text', json.loads(line.decode('utf-8')))
+
+    def test_generated_pages(self):
+        """Pages of change records and rows follow the generated spec.
+        """
+        resourcedef = copy.deepcopy(openapiv3_test.RESOURCE)
+        resourcedef['changefeed'] = True
+        openapi = openapiconverter.create_openapi_global('test')
+        specobj = openapiv3.VersionV3(openapi, None, resourcedef, 'json',
+                                      openapiv3_test.MIMETYPE, 'v3_0_1',
+                                      'todo', self.tmpdir)
+        specobj.create_spec()
+        specfile = os.path.join(self.tmpdir, openapiv3_test.MIMETYPE)
+        with open(specfile, 'w') as fh:
+            json.dump(specobj.openapi, fh)
+        server = mockserver.MockServer([specfile], seed=1,
+                                       collection_size=5)
+        specvalidators = validators.load_validators(specfile)
+        mediatype = 'application/{0}+json'.format(openapiv3_test.MIMETYPE)
+        for target, opid in [('/test/todo:changes', 'todo_changes_v3_0_1'),
+                             ('/test/todo/t1/employees',
+                              'todo_pk_employees_get_v3_0_1')]:
+            body = _body(server.respond('GET', target))
+            self.assertTrue(body['_elem'])
+            specvalidators.validate_response(opid, 200, body, mediatype)
+
+
+if __name__ == '__main__':
+    unittest.main()
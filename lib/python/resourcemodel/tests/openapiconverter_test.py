@@ -0,0 +1,88 @@
+"""Unit test for building several families
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import openapiconverter
+from resourcemodel import refcache
+from resourcemodel import utils
+
+
+class FamiliesTest(unittest.TestCase):
+    """Test manifests and multi-family builds.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for name in ['one', 'two', 'nofamily']:
+            os.makedirs(os.path.join(self.tmpdir, name, 'apischemas',
+                                     'rschemas'))
+        for name in ['one', 'two']:
+            os.makedirs(os.path.join(self.tmpdir, name, 'etc'))
+            with open(os.path.join(self.tmpdir, name,
+                                   utils.FAMILY_FILE), 'w') as fh:
+                fh.write(name + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_manifest(self):
+        """Basedirs are relative to the manifest.
+        """
+        manifest = os.path.join(self.tmpdir, 'manifest.yaml')
+        with open(manifest, 'w') as fh:
+            fh.write('families:\n'
+                     '- basedir: one\n'
+                     '  lones: todo,zone\n'
+                     '- basedir: two\n'
+                     '  family: cookbook\n')
+        families = openapiconverter.load_manifest(manifest)
+        self.assertEqual(families, [
+            {'basedir': os.path.join(self.tmpdir, 'one'),
+             'lones': ['todo', 'zone']},
+            {'basedir': os.path.join(self.tmpdir, 'two'),
+             'family': 'cookbook'}])
+        with open(manifest, 'w') as fh:
+            fh.write('families:\n- lones: todo\n')
+        with self.assertRaises(SystemExit):
+            openapiconverter.load_manifest(manifest)
+
+    def test_build_families(self):
+        """A failing family does not stop the other families.
+        """
+        families = [
+            {'basedir': os.path.join(self.tmpdir, 'one'), 'lones': None},
+            {'basedir': os.path.join(self.tmpdir, 'nofamily')}]
+        self.assertEqual(
+            openapiconverter.build_families(families, 'json', jobs=2), 1)
+        self.assertTrue(os.path.isdir(os.path.join(
+            self.tmpdir, 'one', 'apischemas', 'openapi')))
+        families = [
+            {'basedir': os.path.join(self.tmpdir, 'one')},
+            {'basedir': os.path.join(self.tmpdir, 'two')}]
+        self.assertEqual(
+            openapiconverter.build_families(families, 'json'), 0)
+        families[1]['lones'] = ['todo']
+        self.assertEqual(
+            openapiconverter.build_families(families, 'json'), 1)
+
+    def test_worker_settings(self):
+        """Workers take the reference cache settings of the parent.
+        """
+        settings = refcache.RefCache(self.tmpdir, ttl=5,
+                                     offline=True).settings()
+        try:
+            self.assertEqual(openapiconverter._build_family_def(
+                {'basedir': os.path.join(self.tmpdir, 'one')}, 'json',
+                None, 'openapi3', (settings, logging.INFO)), 0)
+            self.assertEqual(refcache.get_cache().settings(), settings)
+        finally:
+            refcache.configure()
+
+
+if __name__ == '__main__':
+    unittest.main()
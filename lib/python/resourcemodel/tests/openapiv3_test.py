@@ -0,0 +1,384 @@
+"""Unit test for openapi v3 spec generation
+"""
+
+import copy
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import openapiconverter
+from resourcemodel import openapiv3
+from resourcemodel import utils
+
+RESOURCE = {
+    'name': 'todo',
+    'description': 'todo lone',
+    'version': '3.0.1',
+    'key': {'type': 'string'},
+    'type': 'object',
+    'properties': {
+        'text': {'type': 'string'},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'labels': {
+            'type': 'mutablehash',
+            'properties': {'color': {'type': 'string'}}
+        },
+        'employees': {
+            'type': 'propertylist',
+            'key': ['fname'],
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'fname': {'type': 'string'},
+                    'lhost': {'type': 'string'}
+                }
+            }
+        }
+    },
+    'required': ['text']
+}
+MIMETYPE = 'vnd.ms.test.todo.v3.0.1'
+
+
+class OpenapiV3Test(unittest.TestCase):
+    """Test generated spec.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _build(self, **options):
+        """Spec object of RESOURCE with resource schema options.
+        """
+        resourcedef = copy.deepcopy(RESOURCE)
+        resourcedef.update(options)
+        openapi = openapiconverter.create_openapi_global('test')
+        specobj = openapiv3.VersionV3(openapi, None, resourcedef, 'json',
+                                      MIMETYPE, 'v3_0_1', 'todo',
+                                      self.tmpdir)
+        specobj.create_spec()
+        return specobj
+
+    def test_default(self):
+        """Opt-in operations are not generated by default.
+        """
+        specobj = self._build()
+        self.assertFalse(specobj.error)
+        self.assertNotIn('/todo:batchGet', specobj.openapi['paths'])
+
+    def test_collection_get(self):
+        """Paginated get of propertylist and array rows and get by key.
+        """
+        openapi = self._build(pagination={'cursor': 'keyset'}).openapi
+        paths = openapi['paths']
+        for propname, keyschema in [('employees', 'employees_keys'),
+                                    ('tags', 'tags')]:
+            operation = paths['/todo/{primary_key}/' + propname]['get']
+            self.assertEqual(operation['operationId'],
+                             'todo_pk_{0}_get_v3_0_1'.format(propname))
+            self.assertEqual(
+                [p.get('name', p.get('$ref')) for p in
+                 operation['parameters']],
+                ['primary_key', '#/components/parameters/Pagination_limit',
+                 '#/components/parameters/Pagination_cursor'])
+            response = openapi['components']['responses'][
+                'Ok_rows-' + propname]
+            for content in response['content'].values():
+                properties = content['schema']['properties']
+                self.assertEqual(properties['_elem']['items']['$ref'],
+                                 '#/components/schemas/' + propname)
+                self.assertEqual(
+                    properties['_page']['properties']['last_key']['$ref'],
+                    '#/components/schemas/' + keyschema)
+        operation = paths['/todo/{primary_key}/employees/{employees_keys}'][
+            'get']
+        self.assertEqual(operation['operationId'],
+                         'todo_pk_employees_emp_get_v3_0_1')
+        self.assertEqual(operation['responses']['200']['$ref'],
+                         '#/components/responses/Ok_row-employees')
+        self.assertEqual(
+            openapi['paths']['/todo/{primary_key}/employees'][
+                'put']['parameters'],
+            [operation['parameters'][1]])
+
+    def test_batch(self):
+        """Batch operations with the maximum batch size.
+        """
+        specobj = self._build(batch={'maxitems': 50})
+        self.assertFalse(specobj.error)
+        openapi = specobj.openapi
+        schemas = openapi['components']['schemas']
+        self.assertNotIn('batch', schemas['todo'])
+        self.assertEqual(schemas['batch-keys']['maxItems'], 50)
+        self.assertEqual(schemas['batch-items']['items']['required'],
+                         ['primary_key', 'body'])
+        for verb, opname in [('batchGet', 'get'),
+                             ('batchUpsert', 'upsert'),
+                             ('batchDelete', 'delete')]:
+            operation = openapi['paths']['/todo:' + verb]['post']
+            self.assertEqual(operation['operationId'],
+                             'todo_batch_{0}_v3_0_1'.format(opname))
+            self.assertEqual(operation['responses']['200']['$ref'],
+                             '#/components/responses/Ok_batch')
+        self.assertTrue(self._build(batch={'maxitems': 0}).error)
+
+    def test_bulkpatch(self):
+        """Bulk patch on mutablehash, propertylist and array paths.
+        """
+        paths = self._build().openapi['paths']
+        self.assertNotIn('patch', paths['/todo/{primary_key}/employees'])
+        paths = self._build(bulkpatch=True).openapi['paths']
+        for propname, removeref in [('labels', None),
+                                    ('employees', 'employees_keys'),
+                                    ('tags', 'tags')]:
+            operation = paths['/todo/{primary_key}/' + propname]['patch']
+            self.assertEqual(operation['operationId'],
+                             'todo_pk_{0}_patch_v3_0_1'.format(propname))
+            schema = operation['requestBody']['content'][
+                'application/' + MIMETYPE + '+json']['schema']
+            insert, remove = schema['items']['oneOf']
+            self.assertEqual(insert['properties']['op']['enum'], ['insert'])
+            self.assertEqual(insert['properties']['value']['$ref'],
+                             '#/components/schemas/' + propname)
+            if removeref:
+                self.assertEqual(remove['properties']['value']['$ref'],
+                                 '#/components/schemas/' + removeref)
+
+    def test_pagination(self):
+        """Pagination bounds from family defaults and resource schema.
+        """
+        resourcedef = {'pagination': {'default': 50, 'cursor': 'keyset'}}
+        utils.apply_family_defaults(
+            resourcedef, {'pagination': {'maximum': 500, 'default': 100}})
+        openapi = self._build(**resourcedef).openapi
+        limit = openapi['paths']['/todo']['get']['parameters'][0]
+        self.assertEqual(limit['schema'], {'type': 'integer', 'minimum': 1,
+                                           'maximum': 500, 'default': 50})
+        self.assertEqual(
+            openapi['components']['parameters']['Pagination_limit'],
+            limit)
+        for content in openapi['components']['responses'][
+                'Ok_all']['content'].values():
+            self.assertIn('_page', content['schema']['properties'])
+        self.assertTrue(self._build(pagination={'maximum': 0}).error)
+
+    def test_expand(self):
+        """Get all with _view=full returns full resources.
+        """
+        openapi = self._build(expand=True).openapi
+        operation = openapi['paths']['/todo']['get']
+        self.assertEqual(operation['parameters'][-1]['name'], '_view')
+        self.assertEqual(operation['responses']['200']['$ref'],
+                         '#/components/responses/Ok_all_expand')
+        response = openapi['components']['responses']['Ok_all_expand']
+        for content in response['content'].values():
+            items = content['schema']['properties']['_elem']['items']
+            self.assertEqual(items['anyOf'][1]['$ref'],
+                             '#/components/schemas/expand-item')
+        item = openapi['components']['schemas']['expand-item']
+        self.assertEqual(item['properties']['body']['$ref'],
+                         '#/components/schemas/todo')
+
+    def test_fields(self):
+        """Property paths of _fields and partial responses.
+        """
+        openapi = self._build(fields=True, expand=True).openapi
+        schemas = openapi['components']['schemas']
+        self.assertEqual(schemas['field-paths']['enum'],
+                         ['employees', 'employees.fname',
+                          'employees.lhost', 'labels', 'labels.color',
+                          'tags', 'text'])
+        self.assertNotIn('required', schemas['partial-resource'])
+        self.assertEqual(schemas['expand-item']['properties']['body'],
+                         {'$ref': '#/components/schemas/partial-resource'})
+        operation = openapi['paths']['/todo/{primary_key}']['get']
+        self.assertEqual([p['name'] for p in operation['parameters']],
+                         ['primary_key', '_fields'])
+        self.assertEqual(operation['responses']['200']['$ref'],
+                         '#/components/responses/Ok_partial')
+        operation = openapi['paths']['/todo']['get']
+        self.assertEqual(operation['parameters'][-1]['name'], '_fields')
+
+    def test_conditional(self):
+        """Conditional headers on primary key and nested paths.
+        """
+        openapi = self._build(conditional=True).openapi
+        components = openapi['components']
+        self.assertIn('ETag', components['headers'])
+        self.assertIn('ETag', components['responses']['Ok']['headers'])
+        pkpath = openapi['paths']['/todo/{primary_key}']
+        self.assertEqual(pkpath['get']['parameters'][-1]['$ref'],
+                         '#/components/parameters/IfNoneMatch')
+        self.assertIn('304', pkpath['get']['responses'])
+        for method in ['put', 'delete']:
+            self.assertEqual(pkpath[method]['parameters'][-1]['$ref'],
+                             '#/components/parameters/IfMatch')
+            self.assertIn('412', pkpath[method]['responses'])
+        operation = openapi['paths']['/todo/{primary_key}/text']['put']
+        self.assertEqual(len(operation['parameters']), 2)
+        self.assertIn('412', operation['responses'])
+        self.assertNotIn('412', openapi['paths']['/todo']['post'][
+            'responses'])
+
+    def test_conditional_rows(self):
+        """Rows and row gets return the ETag to revalidate with.
+        """
+        openapi = self._build(conditional=True).openapi
+        responses = openapi['components']['responses']
+        for name in ['Ok_rows-employees', 'Ok_row-employees']:
+            self.assertEqual(responses[name]['headers']['ETag'],
+                             {'$ref': '#/components/headers/ETag'})
+        operation = openapi['paths']['/todo/{primary_key}/employees']['get']
+        self.assertEqual(operation['parameters'][-1]['$ref'],
+                         '#/components/parameters/IfNoneMatch')
+        self.assertNotIn('headers', self._build().openapi['components'][
+            'responses']['Ok_rows-employees'])
+
+    def test_cache(self):
+        """Cache-Control headers and x-cache on get operations.
+        """
+        cache = {'max-age': 60, 'stale-while-revalidate': 30,
+                 'operations': {'todo_get_all': {'scope': 'private',
+                                                 'max-age': 5}}}
+        openapi = self._build(cache=cache, conditional=True).openapi
+        operation = openapi['paths']['/todo/{primary_key}']['get']
+        self.assertEqual(operation['x-cache'],
+                         {'scope': 'public', 'max-age': 60,
+                          'stale-while-revalidate': 30})
+        headers = operation['responses']['200']['headers']
+        self.assertEqual(headers['Cache-Control']['schema']['enum'],
+                         ['public, max-age=60, stale-while-revalidate=30'])
+        self.assertIn('ETag', headers)
+        self.assertNotIn('Cache-Control',
+                         openapi['components']['responses']['Ok']['headers'])
+        operation = openapi['paths']['/todo']['get']
+        self.assertEqual(
+            operation['responses']['200']['headers']['Cache-Control'][
+                'schema']['enum'],
+            ['private, max-age=5, stale-while-revalidate=30'])
+        self.assertNotIn('x-cache', openapi['paths']['/todo']['post'])
+        self.assertTrue(self._build(cache={'scope': 'private'}).error)
+        self.assertTrue(self._build(
+            cache={'max-age': 1, 'operations': {'todo_put': {}}}).error)
+
+    def test_mediatypes(self):
+        """Extra media types in every content block.
+        """
+        openapi = self._build(mediatypes=['msgpack']).openapi
+        mediatype = 'application/' + MIMETYPE + '+msgpack'
+        content = openapi['paths']['/todo/{primary_key}']['put'][
+            'requestBody']['content']
+        self.assertEqual(content[mediatype],
+                         content['application/' + MIMETYPE + '+json'])
+        self.assertIn(mediatype,
+                      openapi['components']['responses']['Ok']['content'])
+        self.assertTrue(self._build(mediatypes=['Msg Pack']).error)
+
+    def test_stream(self):
+        """Streaming get all with the search parameters.
+        """
+        self.assertNotIn('/todo:stream', self._build().openapi['paths'])
+        openapi = self._build(stream=True).openapi
+        self.assertNotIn('stream', openapi['components']['schemas']['todo'])
+        operation = openapi['paths']['/todo:stream']['get']
+        self.assertEqual(operation['operationId'], 'todo_stream_v3_0_1')
+        self.assertEqual(operation['parameters'], [])
+        self.assertEqual(
+            operation['responses']['200']['content'],
+            {'application/x-ndjson': {
+                'schema': {'$ref': '#/components/schemas/todo'}}})
+
+    def test_changefeed(self):
+        """Change feed pages change records after a watermark.
+        """
+        self.assertNotIn('/todo:changes', self._build().openapi['paths'])
+        openapi = self._build(changefeed=True).openapi
+        operation = openapi['paths']['/todo:changes']['get']
+        self.assertEqual(operation['operationId'], 'todo_changes_v3_0_1')
+        self.assertEqual(operation['parameters'][0]['name'], 'since')
+        self.assertEqual(operation['parameters'][1]['$ref'],
+                         '#/components/parameters/Pagination_limit')
+        components = openapi['components']
+        self.assertEqual(components['schemas']['change-record']['required'],
+                         ['op', 'primary_key', 'version'])
+        for content in components['responses']['Ok_changes'][
+                'content'].values():
+            properties = content['schema']['properties']
+            self.assertEqual(properties['_elem']['items']['$ref'],
+                             '#/components/schemas/change-record')
+            self.assertIn('_links', properties)
+        self.assertNotIn('_watermark', components['responses']['Ok_all'][
+            'content']['application/' + MIMETYPE + '+json']['schema'][
+                'properties'])
+
+    def test_watch(self):
+        """Server-sent events of resource and propertylist row changes.
+        """
+        openapi = self._build(watch=True).openapi
+        paths = openapi['paths']
+        operation = paths['/todo:watch']['get']
+        self.assertEqual(operation['operationId'], 'todo_watch_v3_0_1')
+        content = operation['responses']['200']['content']
+        self.assertEqual(list(content), ['text/event-stream'])
+        operation = paths['/todo/{primary_key}:watch']['get']
+        self.assertEqual(operation['parameters'][0]['$ref'],
+                         '#/components/parameters/PrimaryKeyParm')
+        schemas = openapi['components']['schemas']
+        resource, row = schemas['watch-event']['oneOf']
+        self.assertEqual(resource['properties']['event']['enum'],
+                         ['created', 'updated', 'deleted'])
+        self.assertEqual(row['properties']['data']['$ref'],
+                         '#/components/schemas/watch-row')
+        self.assertEqual(schemas['watch-row']['properties']['property'],
+                         {'type': 'string', 'enum': ['employees']})
+        self.assertEqual(
+            schemas['watch-row']['properties']['keys']['anyOf'],
+            [{'$ref': '#/components/schemas/employees_keys'}])
+
+    def test_async_rpc(self):
+        """Async rpc verbs answer 202 and are polled on operations.
+        """
+        rpc = [{
+            'reindex': {
+                'request': {'type': 'object'},
+                'response': {'type': 'object',
+                             'properties': {'count': {'type': 'integer'}}},
+                'async': True
+            },
+            'ping': {
+                'request': {'type': 'object'},
+                'response': {'type': 'string'}
+            }
+        }]
+        openapi = self._build(rpc=rpc).openapi
+        paths = openapi['paths']
+        self.assertEqual(
+            paths['/todo:reindex']['post']['responses']['202']['$ref'],
+            '#/components/responses/OperationAccepted')
+        self.assertEqual(
+            paths['/todo:ping']['post']['responses']['202']['$ref'],
+            '#/components/responses/Accepted')
+        components = openapi['components']
+        accepted = components['responses']['OperationAccepted']
+        self.assertEqual(sorted(accepted['headers']),
+                         ['Location', 'Retry-After'])
+        status = components['schemas']['operation-status']
+        self.assertEqual(status['properties']['verb']['enum'], ['reindex'])
+        self.assertEqual(
+            components['schemas']['operation-result-reindex'][
+                'properties']['count'], {'type': 'integer'})
+        self.assertEqual(
+            paths['/todo/operations/{op_id}']['get']['operationId'],
+            'rpc_operation_get_v3_0_1')
+        self.assertIn(
+            '409',
+            paths['/todo/operations/{op_id}:cancel']['post']['responses'])
+        self.assertNotIn('/todo/operations/{op_id}', self._build(
+            rpc=[{'ping': rpc[0]['ping']}]).openapi['paths'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Unit test for spec generator plugin registry
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import openapiv3
+from resourcemodel import plugins
+
+PLUGIN = '''
+class Generator():
+    VERSIONS = ['v7', 'v8']
+'''
+LEGACY = '''
+class VersionV9():
+    pass
+'''
+
+
+class PluginsTest(unittest.TestCase):
+    """Test registry of generator classes.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.registry = dict(plugins._REGISTRY)  # pylint: disable=W0212
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        plugins._REGISTRY.clear()  # pylint: disable=W0212
+        plugins._REGISTRY.update(self.registry)  # pylint: disable=W0212
+
+    def _write(self, name, content):
+        """Write plugin module file.
+        """
+        modulefile = os.path.join(self.tmpdir, name)
+        with open(modulefile, 'w') as fh:
+            fh.write(content)
+        return modulefile
+
+    def test_builtin(self):
+        """Version v3 is generated by VersionV3.
+        """
+        self.assertIs(plugins.get_generator('v3'), openapiv3.VersionV3)
+        self.assertIsNone(plugins.get_generator('v99'))
+
+    def test_module(self):
+        """Module classes declaring VERSIONS are loaded once.
+        """
+        modulefile = self._write('custom.py', PLUGIN)
+        specclass = plugins.get_generator('v7', modulefile)
+        self.assertEqual(specclass.__name__, 'Generator')
+        self.assertIs(plugins.get_generator('v8'), specclass)
+        self.assertIs(plugins.load_module(modulefile),
+                      plugins.load_module(modulefile))
+        self.assertIs(pickle.loads(pickle.dumps(specclass)), specclass)
+
+    def test_legacy_module(self):
+        """VersionVN class of an openapivN.py module.
+        """
+        modulefile = self._write('openapiv9.py', LEGACY)
+        self.assertEqual(plugins.get_generator('v9', modulefile).__name__,
+                         'VersionV9')
+
+    def test_register(self):
+        """Explicit registration needs versions.
+        """
+        plugins.register(dict, ['v5'])
+        self.assertIs(plugins.get_generator('v5'), dict)
+        with self.assertRaises(ValueError):
+            plugins.register(list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Unit test for cached http references
+"""
+
+import http.server
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+from jsonschema import RefResolver
+
+from resourcemodel import refcache
+
+DOCUMENTS = {
+    '/common.json': {
+        'definitions': {
+            'name': {'type': 'string'},
+            'owner': {'$ref': 'people.json#/definitions/person'}
+        }
+    },
+    '/people.json': {
+        'definitions': {'person': {'type': 'string'}}
+    }
+}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serve DOCUMENTS with ETags.
+    """
+    requests = list()
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Document or not modified.
+        """
+        self.requests.append((self.path,
+                              self.headers.get('If-None-Match')))
+        if self.path not in DOCUMENTS:
+            self.send_error(404)
+            return
+        etag = '"{0}"'.format(self.path.strip('/'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        content = json.dumps(DOCUMENTS[self.path]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        """Quiet.
+        """
+
+
+class RefCacheTest(unittest.TestCase):
+    """Test cache against a local http server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.HTTPServer(('127.0.0.1', 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.base = 'http://127.0.0.1:{0}'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        del _Handler.requests[:]
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_fetch(self):
+        """Fetched within ttl from cache, then revalidated by ETag.
+        """
+        url = self.base + '/common.json'
+        cache = refcache.RefCache(self.cachedir)
+        content = cache.fetch(url + '#/definitions/name')
+        self.assertEqual(json.loads(content.decode('utf-8')),
+                         DOCUMENTS['/common.json'])
+        self.assertEqual(refcache.RefCache(self.cachedir).fetch(url),
+                         content)
+        self.assertEqual(refcache.RefCache(self.cachedir, ttl=0).fetch(url),
+                         content)
+        self.assertEqual(_Handler.requests,
+                         [('/common.json', None),
+                          ('/common.json', '"common.json"')])
+        with self.assertRaises(refcache.RefCacheError):
+            cache.fetch(self.base + '/missing.json')
+
+    def test_offline(self):
+        """Offline mode fails on cache misses without requests.
+        """
+        url = self.base + '/common.json'
+        cache = refcache.RefCache(self.cachedir, ttl=0, offline=True)
+        with self.assertRaises(refcache.RefCacheError):
+            cache.fetch(url)
+        refcache.RefCache(self.cachedir).fetch(url)
+        del _Handler.requests[:]
+        self.assertEqual(cache.document(url), DOCUMENTS['/common.json'])
+        self.assertEqual(_Handler.requests, [])
+
+    def test_vendor(self):
+        """Vendored references resolve offline.
+        """
+        cache = refcache.RefCache(self.cachedir)
+        vendored, failed = cache.vendor([self.base + '/common.json',
+                                         self.base + '/missing.json'])
+        self.assertEqual(vendored, [self.base + '/common.json',
+                                    self.base + '/people.json'])
+        self.assertEqual(failed, [self.base + '/missing.json'])
+        del _Handler.requests[:]
+        refcache.configure(self.cachedir, offline=True)
+        try:
+            resolver = RefResolver('', referrer={},
+                                   handlers=refcache.handlers())
+            url, schema = resolver.resolve(
+                self.base + '/people.json#/definitions/person')
+        finally:
+            refcache.configure()
+        self.assertEqual(url, self.base + '/people.json#/definitions/person')
+        self.assertEqual(schema, {'type': 'string'})
+        self.assertEqual(_Handler.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Unit test for route matching index
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from resourcemodel import router
+
+SPEC = {
+    'servers': [{'url': '/test'}],
+    'paths': {
+        '/todo': {'get': {'operationId': 'get_all'}},
+        '/todo/{primary_key}': {
+            'get': {'operationId': 'pk_get'},
+            'delete': {'operationId': 'pk_delete'}
+        },
+        '/todo/{primary_key}/mhash/key1': {'put': {'operationId': 'key1'}},
+        '/todo/{primary_key}/mhash/{mhash}': {
+            'delete': {'operationId': 'mhash_delete'}
+        },
+        '/todo:start': {'post': {'operationId': 'rpc_start'}},
+        '/todo/operations/{op_id}:cancel': {
+            'post': {'operationId': 'cancel'}
+        }
+    }
+}
+
+
+class RouterTest(unittest.TestCase):
+    """Test compiled router.
+    """
+
+    def setUp(self):
+        self.router = router.Router()
+        self.router.add_spec(SPEC, 'todo')
+
+    def test_match(self):
+        """Static, templated and rpc segments are matched.
+        """
+        route, params = self.router.match('GET', '/test/todo/t1')
+        self.assertEqual(route[0], 'pk_get')
+        self.assertEqual(params, {'primary_key': 't1'})
+        route, params = self.router.match('POST', '/test/todo:start')
+        self.assertEqual(route[0], 'rpc_start')
+        route, params = self.router.match('POST',
+                                          '/test/todo/operations/o1:cancel')
+        self.assertEqual(route[0], 'cancel')
+        self.assertEqual(params, {'op_id': 'o1'})
+        self.assertEqual(self.router.match('GET', '/test/other'),
+                         (None, None))
+
+    def test_static_before_templated(self):
+        """Static segments win and lookup backtracks to templates.
+        """
+        route, _ = self.router.match('PUT', '/test/todo/t1/mhash/key1')
+        self.assertEqual(route[0], 'key1')
+        route, params = self.router.match('DELETE',
+                                          '/test/todo/t1/mhash/key1')
+        self.assertEqual(route[0], 'mhash_delete')
+        self.assertEqual(params, {'primary_key': 't1', 'mhash': 'key1'})
+        methods, _ = self.router.lookup('/test/todo/t1')
+        self.assertEqual(sorted(methods), ['DELETE', 'GET'])
+
+    def test_dump_load(self):
+        """Route file round trips.
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for name in ['routes.json', 'routes.json.gz']:
+                filename = os.path.join(tmpdir, name)
+                self.router.dump(filename)
+                loaded = router.Router.load(filename)
+                self.assertEqual(loaded.routes, self.router.routes)
+                self.assertEqual(
+                    loaded.match('DELETE', '/test/todo/t1')[0][0],
+                    'pk_delete')
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
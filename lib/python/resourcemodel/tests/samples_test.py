@@ -0,0 +1,56 @@
+"""Unit test for sample values of schemas
+"""
+
+import random
+import unittest
+
+import jsonschema
+
+from resourcemodel import samples
+
+
+class SamplesTest(unittest.TestCase):
+    """Test sampled patterns and keys.
+    """
+
+    def test_pattern(self):
+        """Sampled strings match their pattern within the length.
+        """
+        rnd = random.Random(1)
+        for pattern in [r'^[A-Z]{2}-\d{4}$', r'^(ab|cd)+[^x]?\w*$',
+                        r'^\S+@\S+\.com$', r'^[a-f0-9]{3,}$']:
+            for _ in range(20):
+                value = samples.sample_pattern(pattern, rnd, 3, 12)
+                self.assertRegex(value, pattern)
+                self.assertTrue(3 <= len(value) <= 12)
+        self.assertIsNone(samples.sample_pattern(r'^(a)\1$', rnd))
+        self.assertIsNone(samples.sample_pattern('[', rnd))
+
+    def test_keys(self):
+        """Keys are unique per index and valid against their schema.
+        """
+        for schema in [{'type': 'string'},
+                       {'type': 'string', 'pattern': '^[A-Z]{2}-[0-9]{4}$'},
+                       {'type': 'string', 'pattern': '^[a-z]+$',
+                        'maxLength': 6},
+                       {'type': 'string', 'minLength': 8},
+                       {'type': 'string', 'maxLength': 4},
+                       {'type': 'string', 'format': 'date-time'},
+                       {'type': 'string', 'format': 'ipv4'},
+                       {'type': 'integer', 'minimum': 1}]:
+            validator = jsonschema.Draft4Validator(
+                schema, format_checker=jsonschema.FormatChecker())
+            keys = [samples.key_value(schema, index)
+                    for index in range(1000)]
+            self.assertEqual(len(set(keys)), len(keys))
+            for key in keys:
+                validator.validate(key)
+        self.assertEqual(samples.key_value({'type': 'string'}, 7), 'key7')
+        self.assertEqual(
+            [samples.key_value({'type': 'integer', 'minimum': 1,
+                                'maximum': 2}, index)
+             for index in range(3)], [1, 2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
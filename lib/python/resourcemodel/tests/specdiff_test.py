@@ -0,0 +1,140 @@
+"""Unit test for spec diff
+"""
+
+import argparse
+import copy
+import tempfile
+import unittest
+
+from resourcemodel import specdiff
+
+
+def _spec(version='3.0.1'):
+    """Minimal generated spec.
+    """
+    vtoken = 'v' + version.replace('.', '_')
+    content = 'application/vnd.ms.test.todo.v{0}+json'.format(version)
+    return {
+        'info': {'version': version, 'title': 'todo'},
+        'paths': {
+            '/todo': {
+                'get': {
+                    'operationId': 'todo_get_all_' + vtoken,
+                    'parameters': [{
+                        'name': '_limit',
+                        'in': 'query',
+                        'required': False,
+                        'schema': {'type': 'integer', 'maximum': 30}
+                    }],
+                    'responses': {
+                        '200': {'$ref': '#/components/responses/Ok_all'}
+                    }
+                },
+                'post': {
+                    'operationId': 'todo_post_' + vtoken,
+                    'requestBody': {
+                        'required': True,
+                        'content': {
+                            content: {
+                                'schema': {
+                                    '$ref': '#/components/schemas/todo'
+                                }
+                            }
+                        }
+                    },
+                    'responses': {}
+                }
+            }
+        },
+        'components': {
+            'schemas': {
+                'todo': {
+                    'type': 'object',
+                    'properties': {
+                        'text': {'type': 'string'},
+                        'state': {'enum': ['open', 'closed']}
+                    },
+                    'required': ['text']
+                }
+            }
+        }
+    }
+
+
+class SpecDiffTest(unittest.TestCase):
+    """Test semantic diff of generated specs.
+    """
+
+    def test_version_bump_only(self):
+        """A version bump alone is not a change.
+        """
+        changes = specdiff.diff_specs(_spec('3.0.1'), _spec('3.0.2'))
+        self.assertEqual(changes, [])
+
+    def test_removed_operation_breaks(self):
+        """Removing an operation breaks clients.
+        """
+        new = _spec()
+        del new['paths']['/todo']['post']
+        changes = specdiff.diff_specs(_spec(), new)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].location, 'paths/todo/post')
+        self.assertEqual(changes[0].kind, 'removed')
+        self.assertTrue(changes[0].breaking)
+
+    def test_added_optional_property(self):
+        """Adding an optional property is compatible.
+        """
+        new = _spec()
+        new['components']['schemas']['todo']['properties'][
+            'note'] = {'type': 'string'}
+        changes = specdiff.diff_specs(_spec(), new)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].location, 'components/schemas/todo')
+        self.assertFalse(changes[0].breaking)
+
+    def test_breaking_schema_changes(self):
+        """Narrowing request and response schemas breaks clients.
+        """
+        new = _spec()
+        todo = new['components']['schemas']['todo']
+        todo['required'].append('state')
+        todo['properties']['state']['enum'].append('blocked')
+        changes = specdiff.diff_specs(_spec(), new)
+        self.assertTrue(changes[0].breaking)
+        self.assertEqual(len(changes[0].details), 2)
+
+    def test_parameter_changes(self):
+        """Parameter changes are classified per parameter.
+        """
+        new = _spec()
+        getall = new['paths']['/todo']['get']
+        getall['parameters'][0]['schema']['maximum'] = 100
+        changes = specdiff.diff_specs(_spec(), new)
+        self.assertFalse(changes[0].breaking)
+        newer = copy.deepcopy(new)
+        newer['paths']['/todo']['get']['parameters'].append({
+            'name': 'owner', 'in': 'query', 'required': True,
+            'schema': {'type': 'string'}
+        })
+        changes = specdiff.diff_specs(new, newer)
+        self.assertTrue(changes[0].breaking)
+        self.assertEqual(changes[0].details,
+                         ['parameter query:owner: added (required)'])
+
+    def test_mixed_arguments(self):
+        """A spec file is not compared with a directory.
+        """
+        with tempfile.TemporaryDirectory() as specdir, \
+                tempfile.NamedTemporaryFile() as specfile:
+            args = argparse.Namespace(old=specdir, new=specfile.name,
+                                      outfmt='text', fail_on_breaking=False)
+            with self.assertRaises(SystemExit):
+                specdiff.main(args)
+            args.old, args.new = specfile.name, specdir
+            with self.assertRaises(SystemExit):
+                specdiff.main(args)
+
+
+if __name__ == '__main__':
+    unittest.main()
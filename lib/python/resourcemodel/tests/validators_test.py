@@ -0,0 +1,108 @@
+"""Unit test for precompiled validators
+"""
+
+import unittest
+
+import jsonschema
+
+from resourcemodel import validators
+
+CONTENT = 'application/vnd.ms.test.todo.v3.0.1+json'
+SPEC = {
+    'paths': {
+        '/todo/{primary_key}': {
+            'put': {
+                'operationId': 'todo_pk_put_v3_0_1',
+                'parameters': [{
+                    '$ref': '#/components/parameters/PrimaryKeyParm'
+                }],
+                'requestBody': {
+                    'required': True,
+                    'content': {
+                        CONTENT: {
+                            'schema': {'$ref': '#/components/schemas/todo'}
+                        }
+                    }
+                },
+                'responses': {
+                    '200': {'$ref': '#/components/responses/Ok'}
+                }
+            }
+        }
+    },
+    'components': {
+        'parameters': {
+            'PrimaryKeyParm': {
+                'name': 'primary_key',
+                'in': 'path',
+                'required': True,
+                'schema': {'$ref': '#/components/schemas/primary_key'}
+            }
+        },
+        'responses': {
+            'Ok': {
+                'description': 'OK',
+                'content': {
+                    CONTENT: {
+                        'schema': {'$ref': '#/components/schemas/todo'}
+                    }
+                }
+            }
+        },
+        'schemas': {
+            'primary_key': {'type': 'string'},
+            'text': {'type': 'string'},
+            'todo': {
+                'type': 'object',
+                'properties': {
+                    'text': {'$ref': '#/components/schemas/text'},
+                    'parent': {'$ref': '#/components/schemas/todo'}
+                },
+                'required': ['text']
+            }
+        }
+    }
+}
+
+
+class ValidatorsTest(unittest.TestCase):
+    """Test validators compiled from a spec.
+    """
+
+    def test_compile_operation(self):
+        """Refs are resolved while compiling.
+        """
+        specvalidators = validators.SpecValidators(SPEC)
+        operation = specvalidators.operations['todo_pk_put_v3_0_1']
+        self.assertTrue(operation.bodyrequired)
+        self.assertEqual(operation.parameters[0].name, 'primary_key')
+        self.assertEqual(operation.parameters[0].schema, {'type': 'string'})
+        self.assertIs(operation.body_validator(CONTENT),
+                      operation.response_validator(200, CONTENT))
+
+    def test_validate(self):
+        """Bodies are validated including recursive refs.
+        """
+        specvalidators = validators.SpecValidators(SPEC)
+        specvalidators.validate_request('todo_pk_put_v3_0_1',
+                                        {'text': 'a',
+                                         'parent': {'text': 'b'}})
+        with self.assertRaises(jsonschema.ValidationError):
+            specvalidators.validate_request('todo_pk_put_v3_0_1',
+                                            {'parent': {'text': 'b'}},
+                                            CONTENT)
+        with self.assertRaises(jsonschema.ValidationError):
+            specvalidators.validate_response('todo_pk_put_v3_0_1', 200,
+                                             {'text': 'a',
+                                              'parent': {'text': 1}})
+
+    def test_cache(self):
+        """Validators are cached by spec hash.
+        """
+        first = validators.get_validators(SPEC)
+        second = validators.get_validators(dict(SPEC))
+        self.assertIs(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ import copy
 # [E0611(no-name-in-module), ]
 # [E0401(import-error), ]
 import distutils.dir_util  # pylint: disable=E0611,E0401
+import hashlib
 import json
 import logging
 import os
@@ -16,7 +17,36 @@ import jsonschema  # pylint: disable=W0611
 from jsonschema import Draft4Validator
 
 FAMILY_FILE = 'etc/family'
+LOG_FORMAT = '[%(filename)s:%(lineno)d][%(levelname)s]: %(message)s'
+DEFAULTS_FILE = 'etc/defaults'
+NDJSON_CONTENT = 'application/x-ndjson'
+EVENT_STREAM_CONTENT = 'text/event-stream'
+HTTP_METHODS = [
+    'get', 'put', 'post', 'delete',
+    'options', 'head', 'patch', 'trace'
+]
+# top level options of a resource schema which are not jsonschema
+RESOURCE_OPTIONS = [
+    'batch', 'bulkpatch', 'pagination', 'expand', 'fields',
+    'conditional', 'mediatypes', 'stream', 'changefeed', 'watch', 'cache'
+]
+BATCH_MAXITEMS = 100
+# depth of nested property paths accepted by _fields
+FIELDS_MAXDEPTH = 4
+PAGINATION = {
+    'minimum': 1,
+    'maximum': 30,
+    'default': 20,
+    'cursor': 'offset'
+}
+CACHE_POLICY = {
+    'scope': 'public'
+}
 _LOG = logging.getLogger(__name__)
+# parsed yaml files by digest of their content and results of
+# schema checks, shared by all families built in a process
+_YAML_CACHE = dict()
+_SCHEMA_CHECKS = dict()
 
 
 def add_rpcresponses():
@@ -47,12 +77,25 @@ def add_rpcresponses():
 
 def check_jsonschema(schemadoc, filename):
     """
-    Check schema against jsonschema Draft4
+    Check schema against jsonschema Draft4,
+    results are cached by the content of the schema
     """
     error_flag = 0
     try:
-        Draft4Validator.check_schema(schemadoc)
-    except jsonschema.exceptions.SchemaError as err:
+        key = json.dumps(schemadoc, sort_keys=True, default=str)
+    except TypeError as _:
+        key = None
+    if key in _SCHEMA_CHECKS:
+        err = _SCHEMA_CHECKS[key]
+    else:
+        try:
+            Draft4Validator.check_schema(schemadoc)
+            err = None
+        except jsonschema.exceptions.SchemaError as schemaerr:
+            err = str(schemaerr)
+        if key is not None:
+            _SCHEMA_CHECKS[key] = err
+    if err is not None:
         _LOG.error('Schema error in %s\n%s', filename, err)
         error_flag = 1
     return error_flag
@@ -74,13 +117,12 @@ def dump_file_to_openapidir(basedir, openapidir, infile=None):
         for root, _, files in os.walk(outfiledir):
             for name in files:
                 filename = os.path.join(root, name)
-                with open(filename) as inputfile:
-                    try:
-                        value = yaml.load(inputfile)
-                    except yaml.YAMLError as err:
-                        sys.exit(
-                            "Yaml Error in {0}: {1}".format(filename, err)
-                        )
+                try:
+                    value = load_yaml_file(filename)
+                except yaml.YAMLError as err:
+                    sys.exit(
+                        "Yaml Error in {0}: {1}".format(filename, err)
+                    )
                 with open(filename, 'w') as outfile:
                     _str = json.dumps(value,
                                       indent=4,
@@ -95,8 +137,38 @@ def yaml_handler(path):  # pylint: disable=R1710
     Loading yaml reference files
     """
     if path.startswith('file://'):
-        with open(path[len('file://'):]) as f:
-            return yaml.load(f)
+        return load_yaml_file(path[len('file://'):])
+
+
+def load_yaml_file(filename):
+    """
+    Load a yaml file, files of the same content are parsed
+    once per process. Callers get their own copy to modify
+    """
+    with open(filename, 'rb') as fh:
+        content = fh.read()
+    key = hashlib.sha1(content).hexdigest()
+    if key not in _YAML_CACHE:
+        _YAML_CACHE[key] = yaml.safe_load(content)
+    return copy.deepcopy(_YAML_CACHE[key])
+
+
+def parse_spec(content):
+    """
+    Parse a generated openapi spec written in json or yaml
+    """
+    try:
+        return json.loads(content)
+    except ValueError:
+        return yaml.safe_load(content)
+
+
+def load_spec(specfile):
+    """
+    Load a generated openapi spec file
+    """
+    with open(specfile) as fh:
+        return parse_spec(fh.read())
 
 
 def validate_schema(openapi_doc, filename):
@@ -232,7 +304,16 @@ def resolve_reference(resolver, propkey, propval, filename):
         elif '$ref' in reference:
             refname = reference['$ref']
             if _check_valid_ref_file(refname):
-                reference1 = resolver.resolve(reference['$ref'])
+                try:
+                    reference1 = resolver.resolve(reference['$ref'])
+                except jsonschema.exceptions.RefResolutionError as err:
+                    msg = (
+                        "Unresolvable reference %s "
+                        "in schema file %s: %s"
+                    )
+                    _LOG.error(msg, refname, filename, err)
+                    error_flag = 1
+                    return error_flag
                 reference = reference1[1]
             else:
                 msg = (
@@ -525,6 +606,181 @@ def delete_keys_from_dict(dict_del):
     return dict_del
 
 
+def pop_resource_options(resourcedef):
+    """
+    Remove resource schema options before converting
+    the resource definition to jsonschema
+    """
+    for k in RESOURCE_OPTIONS:
+        resourcedef.pop(k, None)
+    return resourcedef
+
+
+def batch_maxitems(resourcedef, filename):
+    """
+    Maximum batch size of batch operations,
+    batch is true or {maxitems: N}.
+    Returns None if batch operations are disabled, 0 on error
+    """
+    batch = resourcedef.get('batch')
+    if not batch:
+        return None
+    if batch is True:
+        return BATCH_MAXITEMS
+    if isinstance(batch, dict):
+        maxitems = batch.get('maxitems', BATCH_MAXITEMS)
+        if isinstance(maxitems, int) and not isinstance(maxitems, bool) \
+                and maxitems > 0:
+            return maxitems
+    msg = 'batch should be true or {maxitems: <positive integer>} in %s'
+    _LOG.error(msg, filename)
+    return 0
+
+
+def pagination_options(resourcedef, filename):
+    """
+    Pagination bounds of get all operation, pagination is
+    {minimum: N, maximum: N, default: N, cursor: offset|keyset}.
+    Returns None on error
+    """
+    pagination = resourcedef.get('pagination') or dict()
+    if not isinstance(pagination, dict):
+        _LOG.error('pagination should be a dictionary in %s', filename)
+        return None
+    options = dict(PAGINATION)
+    options.update(pagination)
+    for k in ['minimum', 'maximum', 'default']:
+        if not isinstance(options[k], int) or isinstance(options[k], bool):
+            msg = 'pagination %s should be an integer in %s'
+            _LOG.error(msg, k, filename)
+            return None
+    if not 1 <= options['minimum'] <= options['default'] <= \
+            options['maximum']:
+        msg = 'pagination should be 1 <= minimum <= default <= maximum in %s'
+        _LOG.error(msg, filename)
+        return None
+    if options['cursor'] not in ['offset', 'keyset']:
+        msg = 'pagination cursor should be offset or keyset in %s'
+        _LOG.error(msg, filename)
+        return None
+    return options
+
+
+def cache_options(resourcedef, filename):
+    """
+    Cache policy of get operations and per operation overrides,
+    cache is {max-age: N, stale-while-revalidate: N,
+    scope: public|private, no-store: bool, operations: {...}}
+    with operations keyed by operationId without version.
+    Returns (policy, overrides), None on error
+    """
+    cache = copy.deepcopy(resourcedef.get('cache'))
+    if not isinstance(cache, dict):
+        _LOG.error('cache should be a dictionary in %s', filename)
+        return None
+    overrides = cache.pop('operations', None) or dict()
+    if not isinstance(overrides, dict) or not all(
+            isinstance(v, dict) for v in overrides.values()):
+        msg = 'cache operations should map operationIds to policies in %s'
+        _LOG.error(msg, filename)
+        return None
+    policy = dict(CACHE_POLICY)
+    policy.update(cache)
+    return policy, overrides
+
+
+def cache_control(policy, filename):
+    """
+    Cache-Control header value of a cache policy, None on error
+    """
+    unknown = set(policy) - set(['max-age', 'stale-while-revalidate',
+                                 'scope', 'no-store'])
+    if unknown:
+        msg = 'cache -- unknown keys %s in %s'
+        _LOG.error(msg, sorted(unknown), filename)
+        return None
+    if policy.get('no-store'):
+        return 'no-store'
+    if policy['scope'] not in ['public', 'private']:
+        _LOG.error('cache scope should be public or private in %s', filename)
+        return None
+    if 'max-age' not in policy:
+        _LOG.error('cache max-age is missing in %s', filename)
+        return None
+    directives = [policy['scope']]
+    for k in ['max-age', 'stale-while-revalidate']:
+        if k not in policy:
+            continue
+        if not isinstance(policy[k], int) or isinstance(policy[k], bool) \
+                or policy[k] < 0:
+            msg = 'cache %s should be a non negative integer in %s'
+            _LOG.error(msg, k, filename)
+            return None
+        directives.append('{0}={1}'.format(k, policy[k]))
+    return ', '.join(directives)
+
+
+def get_family_defaults(basedir):
+    """
+    Get family wide defaults of resource schema options
+    from the etc/defaults yaml file in basedir
+    """
+    defaults = dict()
+    if not basedir:
+        return defaults
+    defaultsfile = os.path.join(basedir, DEFAULTS_FILE)
+    try:
+        with open(defaultsfile) as fh:
+            defaults = yaml.safe_load(fh.read()) or dict()
+    except FileNotFoundError as _:
+        pass
+    except yaml.YAMLError as err:
+        sys.exit("Yaml Error in {0}: {1}".format(defaultsfile, err))
+    return defaults
+
+
+def apply_family_defaults(resourcedef, defaults):
+    """
+    Add family defaults of resource schema options,
+    options of the resource schema take precedence
+    """
+    for k in RESOURCE_OPTIONS:
+        if k not in defaults:
+            continue
+        if isinstance(defaults[k], dict) and \
+                isinstance(resourcedef.get(k), dict):
+            option = copy.deepcopy(defaults[k])
+            option.update(resourcedef[k])
+            resourcedef[k] = option
+        elif k not in resourcedef:
+            resourcedef[k] = copy.deepcopy(defaults[k])
+    return resourcedef
+
+
+def partial_schema(schema):
+    """
+    Copy of schema without required properties,
+    schema of sparse fieldset responses
+    """
+    partial = copy.deepcopy(schema)
+    _drop_required(partial)
+    return partial
+
+
+def _drop_required(schema):
+    """
+    Remove required lists from schema in place
+    """
+    if isinstance(schema, dict):
+        if isinstance(schema.get('required'), list):
+            del schema['required']
+        for val in schema.values():
+            _drop_required(val)
+    elif isinstance(schema, list):
+        for val in schema:
+            _drop_required(val)
+
+
 def get_family(basedir):
     """
     Get family name from the etc/family file in basedir
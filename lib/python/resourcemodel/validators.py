@@ -0,0 +1,260 @@
+"""
+Precompiled request/response validators from generated openapi spec
+"""
+import hashlib
+import json
+import logging
+import os
+
+# pylint:W0611 Unused import jsonschema
+import jsonschema  # pylint: disable=W0611
+from jsonschema import Draft4Validator
+from jsonschema import RefResolver
+
+from . import refcache
+from . import utils
+
+_LOG = logging.getLogger(__name__)
+# validators shared by the process keyed by spec hash
+_VALIDATORS_CACHE = dict()
+
+
+def spec_hash(content):
+    """
+    Hash of spec file content or of a loaded spec
+    """
+    if isinstance(content, dict):
+        content = json.dumps(content, sort_keys=True)
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def _unescape(token):
+    """
+    Unescape json pointer token
+    """
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+class ParameterValidator():
+    """
+    Compiled validator of a path, query or header parameter
+    """
+    def __init__(self, parameter, schema, validator):
+        """
+        Initialize parameter validator
+        """
+        self.name = parameter['name']
+        self.location = parameter['in']
+        self.required = parameter.get('required', False)
+        self.style = parameter.get('style')
+        self.explode = parameter.get('explode')
+        self.schema = schema
+        self.validator = validator
+
+
+class OperationValidator():
+    """
+    Compiled validators of one operation
+    """
+    def __init__(self, operationid, path, method):
+        """
+        Initialize operation validator
+        """
+        self.operationid = operationid
+        self.path = path
+        self.method = method
+        self.parameters = list()
+        self.bodyrequired = False
+        # mediatype -> validator
+        self.body = dict()
+        # status -> mediatype -> validator
+        self.responses = dict()
+
+    def body_validator(self, mediatype=None):
+        """
+        Validator of request body for media type
+        """
+        return _pick(self.body, mediatype)
+
+    def response_validator(self, status, mediatype=None):
+        """
+        Validator of response body for status and media type
+        """
+        content = self.responses.get(str(status))
+        if content is None:
+            content = self.responses.get('default', {})
+        return _pick(content, mediatype)
+
+
+def _pick(content, mediatype):
+    """
+    Lookup validator by media type, any media type
+    if not given since they share the schema
+    """
+    if mediatype is not None and mediatype in content:
+        return content[mediatype]
+    if mediatype is None and content:
+        return next(iter(content.values()))
+    return None
+
+
+class SpecValidators():
+    """
+    Validators for every operation of a generated spec.
+    References to the spec are resolved once while building,
+    validation is a dict lookup plus a compiled check
+    """
+    def __init__(self, spec, specdir=None):
+        """
+        Initialize and compile validators
+        """
+        self.spec = spec
+        if specdir is None:
+            specdir = os.getcwd()
+        base = "file://{0}/".format(os.path.abspath(specdir))
+        handlers = refcache.handlers()
+        self.resolver = RefResolver(base_uri=base,
+                                    referrer=spec,
+                                    handlers=handlers)
+        self.operations = dict()
+        self._resolved = dict()
+        self._compiled = dict()
+        self.compile()
+
+    def resolve_pointer(self, ref):
+        """
+        Resolve local reference #/a/b in spec
+        """
+        value = self.spec
+        for token in ref[2:].split('/'):
+            value = value[_unescape(token)]
+        return value
+
+    def dereference(self, schema, stack=()):
+        """
+        Inline local references, recursive references
+        are left to the resolver
+        """
+        if isinstance(schema, list):
+            return [self.dereference(s, stack) for s in schema]
+        if not isinstance(schema, dict):
+            return schema
+        ref = schema.get('$ref')
+        if ref is not None and ref.startswith('#/'):
+            if ref in stack:
+                return schema
+            if ref not in self._resolved:
+                self._resolved[ref] = self.dereference(
+                    self.resolve_pointer(ref), stack + (ref,))
+            return self._resolved[ref]
+        return dict((k, self.dereference(v, stack))
+                    for k, v in schema.items())
+
+    def compile_schema(self, schema):
+        """
+        Compile schema, identical schemas share a validator
+        """
+        schema = self.dereference(schema)
+        key = json.dumps(schema, sort_keys=True)
+        if key not in self._compiled:
+            self._compiled[key] = Draft4Validator(schema,
+                                                  resolver=self.resolver)
+        return self._compiled[key]
+
+    def compile_content(self, content):
+        """
+        Compile validators of content section keyed by media type
+        """
+        validators = dict()
+        for mediatype, media in content.items():
+            if 'schema' in media:
+                validators[mediatype] = self.compile_schema(media['schema'])
+        return validators
+
+    def compile_operation(self, path, method, operation, pathparameters):
+        """
+        Compile validators of an operation
+        """
+        opvalidator = OperationValidator(operation.get('operationId'),
+                                         path,
+                                         method)
+        parameters = list()
+        for parameter in pathparameters + operation.get('parameters', []):
+            parameters.append(self.dereference(parameter))
+        for parameter in parameters:
+            schema = self.dereference(parameter.get('schema', {}))
+            opvalidator.parameters.append(
+                ParameterValidator(parameter,
+                                   schema,
+                                   self.compile_schema(schema)))
+        if 'requestBody' in operation:
+            reqbody = self.dereference(operation['requestBody'])
+            opvalidator.bodyrequired = reqbody.get('required', False)
+            opvalidator.body = self.compile_content(
+                reqbody.get('content', {}))
+        for status, response in operation.get('responses', {}).items():
+            response = self.dereference(response)
+            opvalidator.responses[str(status)] = self.compile_content(
+                response.get('content', {}))
+        return opvalidator
+
+    def compile(self):
+        """
+        Compile validators of all operations in spec
+        """
+        for path, pathitem in self.spec.get('paths', {}).items():
+            pathparameters = pathitem.get('parameters', [])
+            for method, operation in pathitem.items():
+                if method not in utils.HTTP_METHODS:
+                    continue
+                opvalidator = self.compile_operation(path,
+                                                     method,
+                                                     operation,
+                                                     pathparameters)
+                self.operations[opvalidator.operationid] = opvalidator
+
+    def validate_request(self, operationid, body, mediatype=None):
+        """
+        Validate request body of operation,
+        raises jsonschema ValidationError
+        """
+        validator = self.operations[operationid].body_validator(mediatype)
+        if validator is not None:
+            validator.validate(body)
+
+    def validate_response(self, operationid, status, body, mediatype=None):
+        """
+        Validate response body of operation,
+        raises jsonschema ValidationError
+        """
+        validator = self.operations[operationid].response_validator(
+            status, mediatype)
+        if validator is not None:
+            validator.validate(body)
+
+
+def get_validators(spec, specdir=None, digest=None):
+    """
+    Get validators for loaded spec from the process cache
+    """
+    if digest is None:
+        digest = spec_hash(spec)
+    if digest not in _VALIDATORS_CACHE:
+        _VALIDATORS_CACHE[digest] = SpecValidators(spec, specdir)
+    return _VALIDATORS_CACHE[digest]
+
+
+def load_validators(specfile):
+    """
+    Load spec file and get its validators from the process cache
+    """
+    with open(specfile) as fh:
+        content = fh.read()
+    digest = spec_hash(content)
+    if digest in _VALIDATORS_CACHE:
+        return _VALIDATORS_CACHE[digest]
+    return get_validators(utils.parse_spec(content),
+                          os.path.dirname(os.path.abspath(specfile)),
+                          digest)